@@ -0,0 +1,351 @@
+"""
+Benchmarks for building, compiling and matching patterns.
+
+The workloads are modeled on ``examples/urls.py`` and ``examples/hex_codes.py``,
+run on text generated from a fixed seed so that every run measures the same work.
+Results are written as JSON, and can be compared against a saved baseline::
+
+    python benchmarks/bench.py --output baseline.json
+    python benchmarks/bench.py --baseline baseline.json --threshold 0.1
+
+Comparing exits with status 1 when a benchmark got slower than the threshold allows.
+Pass ``--quick`` for a short run on smaller inputs, and ``--filter`` to select benchmarks by name.
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import string
+import sys
+import timeit
+import typing as t
+
+from regexfactory import (
+    COMPILE_CACHE,
+    DIGIT,
+    WHITESPACE,
+    WORD,
+    Amount,
+    Group,
+    Multi,
+    NamedGroup,
+    NotSet,
+    Optional,
+    Or,
+    PatternSet,
+    Range,
+    RegexPattern,
+    Set,
+    __version__,
+    escape,
+    join,
+)
+
+# The seed of every generated input.
+SEED = 1234
+
+# Builds the function to time, with the size in bytes of the text it scans, if any.
+Setup = t.Callable[[int], t.Tuple[t.Callable[[], t.Any], t.Optional[int]]]
+
+BENCHMARKS: t.Dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> t.Callable[[Setup], Setup]:
+    """Registers a setup function, called with the scale of the inputs."""
+
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def url_pattern() -> RegexPattern:
+    """The pattern of ``examples/urls.py``."""
+    protocol = Amount(Range("a", "z"), 1, or_more=True)
+    host = Amount(Set(WORD, DIGIT, "."), 1, or_more=True)
+    port = Optional(Group(RegexPattern(":") + Amount(DIGIT, 1, or_more=True)))
+    path = Amount(
+        Group(
+            RegexPattern("/")
+            + Group(Amount(NotSet("/", "#", "?", "&", WHITESPACE), 0, or_more=True))
+        ),
+        0,
+        or_more=True,
+    )
+    return protocol + RegexPattern("://") + host + port + path
+
+
+def hex_pattern() -> RegexPattern:
+    """The pattern of ``examples/hex_codes.py``."""
+    return Optional("#") + Or(
+        Amount(Set(Range("0", "9"), Range("a", "f")), 6),
+        Amount(Set(Range("0", "9"), Range("A", "F")), 6),
+    )
+
+
+def log_pattern(fields: int) -> RegexPattern:
+    """A grammar for log lines of many named fields, built like generated grammars are."""
+    value = Or(url_pattern(), hex_pattern(), Multi(DIGIT), Multi(WORD))
+    items = [
+        NamedGroup(f"field{index}", escape(f"f{index}=") + value)
+        for index in range(fields)
+    ]
+    return join(*(Optional(item + Optional(" ")) for item in items))
+
+
+def words(count: int, rng: random.Random) -> t.List[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(count)
+    ]
+
+
+def text(size: int) -> str:
+    """Prose with URLs and hex colors in it, about :code:`size` characters long."""
+    rng = random.Random(SEED)
+    vocabulary = words(500, rng)
+    pieces: t.List[str] = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.05:
+            piece = f"https://{rng.choice(vocabulary)}.com:{rng.randint(1, 9999)}/{rng.choice(vocabulary)}/"
+        elif roll < 0.1:
+            piece = "#" + "".join(rng.choices("0123456789abcdef", k=6))
+        else:
+            piece = rng.choice(vocabulary)
+        pieces.append(piece)
+        length += len(piece) + 1
+    return " ".join(pieces)
+
+
+def fresh(pattern: RegexPattern) -> t.Callable[[], t.Any]:
+    """Compiles a copy of the pattern each time, bypassing every compile cache."""
+
+    def compile_fresh() -> t.Any:
+        COMPILE_CACHE.clear()
+        re.purge()
+        return RegexPattern(pattern.node).compile()
+
+    return compile_fresh
+
+
+@benchmark("construction.urls")
+def _construction_urls(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return url_pattern, None
+
+
+@benchmark("construction.hex_codes")
+def _construction_hex(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return hex_pattern, None
+
+
+@benchmark("construction.log_grammar")
+def _construction_grammar(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return lambda: log_pattern(10 * scale), None
+
+
+@benchmark("join.literals")
+def _join_literals(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    pieces = [escape(word) for word in words(1000 * scale, random.Random(SEED))]
+    return lambda: join(*pieces).regex, None
+
+
+@benchmark("join.patterns")
+def _join_patterns(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    pieces = [
+        hex_pattern() if index % 2 else url_pattern() for index in range(100 * scale)
+    ]
+    return lambda: join(*pieces).regex, None
+
+
+@benchmark("or.words")
+def _or_words(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    alternatives = words(1000 * scale, random.Random(SEED))
+    return lambda: Or(*alternatives).regex, None
+
+
+@benchmark("or.patterns")
+def _or_patterns(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    alternatives = [
+        escape(word) + Amount(DIGIT, index % 5 + 1)
+        for index, word in enumerate(words(100 * scale, random.Random(SEED)))
+    ]
+    return lambda: Or(*alternatives).regex, None
+
+
+@benchmark("compile.urls")
+def _compile_urls(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return fresh(url_pattern()), None
+
+
+@benchmark("compile.or_words")
+def _compile_or(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return fresh(Or(*words(1000 * scale, random.Random(SEED)))), None
+
+
+@benchmark("compile.log_grammar")
+def _compile_grammar(scale: int) -> t.Tuple[t.Callable[[], t.Any], None]:
+    return fresh(log_pattern(10 * scale)), None
+
+
+@benchmark("match.urls_findall")
+def _match_urls(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    pattern, content = url_pattern(), text(100_000 * scale)
+    return lambda: pattern.findall(content), len(content)
+
+
+@benchmark("match.hex_findall")
+def _match_hex(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    pattern, content = hex_pattern(), text(100_000 * scale)
+    return lambda: pattern.findall(content), len(content)
+
+
+@benchmark("match.hex_dfa_search")
+def _match_hex_dfa(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    compiled = (escape("#") + Amount(Set(Range("0", "9"), Range("a", "f")), 6)).compile(
+        engine="dfa"
+    )
+    content = text(10_000 * scale).replace("#", "")
+    return lambda: compiled.search(content), len(content)
+
+
+@benchmark("match.lines_test_many")
+def _match_lines(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    pattern = url_pattern()
+    lines = text(100_000 * scale).split(" ")
+    return lambda: pattern.search_many(lines, output="mask"), sum(map(len, lines))
+
+
+def rules(scale: int) -> t.Dict[str, RegexPattern]:
+    """Rules starting with a word, rules starting with a digit, and rules matching almost everywhere."""
+    vocabulary = words(50 * scale, random.Random(SEED + 1))
+    named = {
+        f"word{index}": escape(word) + DIGIT for index, word in enumerate(vocabulary)
+    }
+    named.update(
+        (f"digit{index}", DIGIT + escape(word)) for index, word in enumerate(vocabulary)
+    )
+    named.update(word=Multi(WORD), number=Multi(DIGIT))
+    return named
+
+
+@benchmark("match.patternset")
+def _match_patternset(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    patterns, content = PatternSet(rules(scale)), text(100_000 * scale)
+    return lambda: patterns.matches(content), len(content)
+
+
+@benchmark("match.patternset_naive")
+def _match_patternset_naive(scale: int) -> t.Tuple[t.Callable[[], t.Any], int]:
+    """The rules of ``match.patternset``, with one search per rule."""
+    compiled = [(name, rule.compile()) for name, rule in rules(scale).items()]
+    content = text(100_000 * scale)
+    return (
+        lambda: [name for name, rule in compiled if rule.search(content)],
+        len(content),
+    )
+
+
+def measure(setup: Setup, scale: int, repeat: int) -> t.Dict[str, t.Any]:
+    """Times a benchmark, in seconds per call, over :code:`repeat` rounds of automatically sized loops."""
+    function, size = setup(scale)
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    timings = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    best = min(timings)
+    return {
+        "best": best,
+        "median": statistics.median(timings),
+        "number": number,
+        "repeat": repeat,
+        "throughput": None if size is None else size / best,
+    }
+
+
+def environment() -> t.Dict[str, t.Any]:
+    return {
+        "regexfactory": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "seed": SEED,
+    }
+
+
+def compare(
+    results: t.Dict[str, t.Dict[str, t.Any]],
+    baseline: t.Dict[str, t.Dict[str, t.Any]],
+    threshold: float,
+) -> t.List[str]:
+    """Prints how each benchmark changed since the baseline, and returns the names of those that regressed."""
+    regressed = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:32} {'':>12} {result['best']:12.3e}  new")
+            continue
+        change = result["best"] / before["best"] - 1
+        status = ""
+        if change > threshold:
+            status = "slower"
+            regressed.append(name)
+        elif change < -threshold:
+            status = "faster"
+        print(
+            f"{name:32} {before['best']:12.3e} {result['best']:12.3e} {change:+8.1%} {status}"
+        )
+    return regressed
+
+
+def main(arguments: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--baseline", help="compare against results saved with --output"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown from the baseline counted as a regression (default 0.1)",
+    )
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks matching this regex"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="rounds of each benchmark (default 5)"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="smaller inputs and fewer rounds"
+    )
+    options = parser.parse_args(arguments)
+    scale, repeat = (1, 2) if options.quick else (5, options.repeat)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if re.search(options.filter, name):
+            results[name] = measure(setup, scale, repeat)
+            if not options.baseline:
+                throughput = results[name]["throughput"]
+                rate = f"{throughput / 1e6:10.1f} MB/s" if throughput else ""
+                print(f"{name:32} {results[name]['best']:12.3e} s {rate}")
+    document = {"environment": environment(), "scale": scale, "results": results}
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("scale") != scale:
+            print("The baseline was run at another scale, timings aren't comparable.")
+            return 2
+        return 1 if compare(results, saved["results"], options.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
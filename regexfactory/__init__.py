@@ -6,12 +6,39 @@ The regexfactory module documentation!
 
 .. automodule:: regexfactory.pattern
 
+.. automodule:: regexfactory.nodes
+
+.. automodule:: regexfactory.optimize
+
+.. automodule:: regexfactory.parser
+
+.. automodule:: regexfactory.backtracking
+
+.. automodule:: regexfactory.patternset
+
+.. automodule:: regexfactory.stream
+
+.. automodule:: regexfactory.parallel
+
+.. automodule:: regexfactory.dfa
+
+.. automodule:: regexfactory.library
+
+.. automodule:: regexfactory.observe
+
+.. automodule:: regexfactory.prefilter
+
 .. automodule:: regexfactory.patterns
 
 .. automodule:: regexfactory.chars
 
+.. automodule:: regexfactory.cache
+
+.. automodule:: regexfactory.charset
+
 """
 
+from .cache import COMPILE_CACHE, CacheInfo, CompileCache
 from .chars import (
     ANCHOR_END,
     ANCHOR_START,
@@ -23,7 +50,21 @@ from .chars import (
     WHITESPACE,
     WORD,
 )
-from .pattern import ESCAPED_CHARACTERS, RegexPattern, ValidPatternType, escape, join
+from .charset import CharSet
+from .library import PatternLibrary
+from .observe import Observer, PatternStats, Profiler
+from .pattern import (
+    ESCAPED_CHARACTERS,
+    PatternBuilder,
+    RegexPattern,
+    ValidPatternType,
+    escape,
+    interning,
+    join,
+    observing,
+    set_interning,
+    set_observer,
+)
 from .patterns import (
     Amount,
     Comment,
@@ -44,5 +85,6 @@ from .patterns import (
     Range,
     Set,
 )
+from .patternset import PatternSet
 
 __version__ = "1.0.1"
@@ -0,0 +1,498 @@
+"""
+Backtracking Analysis
+*********************
+
+Module for :meth:`RegexPattern.analyze_backtracking`,
+a static check for compositions that make :mod:`re`'s backtracking engine take
+polynomial or exponential time on adversarial inputs, like :code:`Multi(Multi(WORD) + Optional("-"))`.
+
+The pattern is turned into a position automaton, which is ambiguous exactly where the engine
+has several ways to match the same text and has to try all of them before failing.
+A loop that can match a string in two different ways is **exponential**,
+two loops that can both match the same repeated text one after the other are **polynomial**.
+The analysis ignores :data:`re.IGNORECASE`, backreferences and lookarounds.
+It looks at the pattern as it is compiled, so nested quantifiers that
+:func:`~regexfactory.optimize.simplify_quantifiers` merges, like :code:`Multi(Multi(WORD))`, aren't reported.
+
+.. exec_code::
+
+    from regexfactory import WORD, Amount, Multi, Optional, Or
+
+    for issue in Multi(Multi(WORD) + Optional("-")).analyze_backtracking():
+        print(issue.severity, issue.pattern)
+
+    for issue in (Amount(Or("a", "aa"), 1, or_more=True) + Multi(WORD)).analyze_backtracking():
+        print(issue.severity, issue.pattern)
+
+Strict mode checks every new pattern and raises :class:`CatastrophicBacktrackingError`
+when one is too slow, so problems are caught where the pattern is built.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, Multi, Optional
+    from regexfactory.backtracking import CatastrophicBacktrackingError, strict_mode
+
+    with strict_mode():
+        try:
+            Multi(Multi(DIGIT) + ",")
+            Multi(Multi(DIGIT) + Optional(","))
+        except CatastrophicBacktrackingError as error:
+            print(error)
+
+"""
+
+import contextlib
+import enum
+import re
+import threading
+import typing as t
+from functools import lru_cache
+
+from . import nodes
+from . import pattern as _pattern
+from .charset import CharSet
+
+#: Labels matching every character, used where the analysis can't be precise.
+_EVERYTHING = CharSet(negated=True)
+
+# Characters tried when checking whether two classes overlap,
+# besides the bounds of their intervals, covering the shorthand escapes.
+_SAMPLES = "\x00\t\n\r !-09:AZ_az\x7f\xa0\xe9٣ \U0001f600"
+
+# Bounded repetitions are unrolled into copies of their child holding at most this many positions in all.
+_UNROLL_LIMIT = 64
+
+
+class Severity(enum.Enum):
+    """How the matching time grows with the length of an adversarial input."""
+
+    POLYNOMIAL = "polynomial"
+    EXPONENTIAL = "exponential"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+#: Severities from the mildest to the worst.
+SEVERITIES = (Severity.POLYNOMIAL, Severity.EXPONENTIAL)
+
+
+class BacktrackingIssue(t.NamedTuple):
+    """An ambiguous part of a pattern, returned by :meth:`RegexPattern.analyze_backtracking`."""
+
+    #: How bad the backtracking can get.
+    severity: Severity
+    #: The smallest sub-pattern the ambiguity was found in.
+    pattern: "_pattern.RegexPattern"
+    #: A short explanation.
+    reason: str
+
+
+class CatastrophicBacktrackingError(ValueError):
+    """Raised in :func:`strict_mode` when a pattern is built with backtracking issues."""
+
+    def __init__(self, issues: t.List[BacktrackingIssue]) -> None:
+        self.issues = issues
+        details = "; ".join(
+            f"{issue.severity} in {issue.pattern.regex!r}" for issue in issues
+        )
+        super().__init__(f"Pattern can backtrack catastrophically: {details}.")
+
+
+@lru_cache(maxsize=4096)
+def _members(charset: CharSet) -> t.Callable[[str], t.Any]:
+    return re.compile(charset.render()).fullmatch
+
+
+@lru_cache(maxsize=65536)
+def _overlap(first: CharSet, second: CharSet) -> bool:
+    """Returns whether two classes have a character in common."""
+    candidates = set(_SAMPLES)
+    for charset in (first, second):
+        for low, high in charset.intervals:
+            candidates.update(
+                chr(code)
+                for code in (low - 1, low, high, high + 1)
+                if 0 <= code <= 0x10FFFF
+            )
+    first_members, second_members = _members(first), _members(second)
+    return any(first_members(char) and second_members(char) for char in candidates)
+
+
+_Fragment = t.Tuple[t.Set[int], t.Set[int], bool]
+_EMPTY: _Fragment = (set(), set(), True)
+
+
+class _Automaton:
+    """
+    The position automaton of a node tree, every character consumed by the pattern being a state.
+    Transitions are counted, so the nested loops of :code:`(?:a*)*` give two transitions from
+    :code:`a` to itself, like the two ways the engine has to repeat it.
+    """
+
+    def __init__(self, root: nodes.Node) -> None:
+        self.labels: t.List[CharSet] = []
+        self.ancestors: t.List[t.Tuple[nodes.Node, ...]] = []
+        self.follow: t.List[t.Dict[int, int]] = []
+        self._sizes: t.Dict[int, int] = {}
+        self._pairs: t.Dict[t.Tuple[int, int], t.List[t.Tuple[int, int]]] = {}
+        #: Whether the whole tree can match the empty string.
+        self.nullable = self._build(root, ())[2]
+
+    def _position(self, label: CharSet, ancestors: t.Tuple[nodes.Node, ...]) -> int:
+        self.labels.append(label)
+        self.ancestors.append(ancestors)
+        self.follow.append({})
+        return len(self.labels) - 1
+
+    def _link(self, sources: t.Iterable[int], targets: t.Iterable[int]) -> None:
+        targets = list(targets)
+        for source in sources:
+            follow = self.follow[source]
+            for target in targets:
+                follow[target] = follow.get(target, 0) + 1
+
+    def _concat(self, first: _Fragment, second: _Fragment) -> _Fragment:
+        self._link(first[1], second[0])
+        return (
+            first[0] | second[0] if first[2] else first[0],
+            second[1] | first[1] if second[2] else second[1],
+            first[2] and second[2],
+        )
+
+    def _size(self, node: nodes.Node) -> int:
+        """Counts the positions a node creates, without unrolling."""
+        if id(node) not in self._sizes:
+            if isinstance(node, nodes.Literal):
+                size = len(node.text)
+            elif isinstance(node, (nodes.CharClass, nodes.AnyChar)):
+                size = 1
+            else:
+                size = sum(map(self._size, node.children()))
+            self._sizes[id(node)] = size
+        return self._sizes[id(node)]
+
+    def _build(  # pylint: disable=too-many-return-statements
+        self, node: nodes.Node, ancestors: t.Tuple[nodes.Node, ...]
+    ) -> _Fragment:
+        ancestors += (node,)
+        if isinstance(node, nodes.Literal):
+            fragment = _EMPTY
+            for char in node.text:
+                code = ord(char)
+                position = self._position(CharSet(((code, code),)), ancestors)
+                fragment = self._concat(fragment, ({position}, {position}, False))
+            return fragment
+        if isinstance(node, (nodes.CharClass, nodes.AnyChar)):
+            label = (
+                node.charset
+                if isinstance(node, nodes.CharClass)
+                else CharSet((((10, 10),)), negated=True)
+            )
+            position = self._position(label, ancestors)
+            return ({position}, {position}, False)
+        if isinstance(node, nodes.Concat):
+            fragment = _EMPTY
+            for item in node.flatten():
+                fragment = self._concat(fragment, self._build(item, ancestors))
+            return fragment
+        if isinstance(node, (nodes.Alternation, nodes.Conditional)):
+            branches = [self._build(child, ancestors) for child in node.children()]
+            if isinstance(node, nodes.Conditional) and node.no is None:
+                branches.append(_EMPTY)
+            return (
+                set().union(*(branch[0] for branch in branches)),
+                set().union(*(branch[1] for branch in branches)),
+                not branches or any(branch[2] for branch in branches),
+            )
+        if isinstance(node, nodes.Repeat):
+            return self._repeat(node, ancestors)
+        if isinstance(node, nodes.Extension) and node.prefix == ">":
+            return self._atomic(node, ancestors)
+        if isinstance(node, (nodes.Group, nodes.Extension)):
+            return self._build(node.children()[0], ancestors)
+        # Assertions, backreferences and comments consume nothing the analysis knows about.
+        return _EMPTY
+
+    def _repeat(
+        self, node: nodes.Repeat, ancestors: t.Tuple[nodes.Node, ...]
+    ) -> _Fragment:
+        if node.max is None:
+            first, last, nullable = self._build(node.child, ancestors)
+            self._link(last, first)
+            return first, last, nullable or node.min == 0
+        # Large bounded repetitions are cut down to as many copies as fit, at least one,
+        # they never loop, so they can only be ambiguous inside a loop, which a few copies show.
+        high = max(1, min(node.max, _UNROLL_LIMIT // max(1, self._size(node.child))))
+        required = min(node.min, high)
+        copies = [self._build(node.child, ancestors) for _ in range(high)]
+        # x{1,3} is unrolled as x(?:x(?:x)?)?, which is no more ambiguous than the original.
+        optional = _EMPTY
+        for copy in reversed(copies[required:]):
+            first, last, _ = self._concat(copy, optional)
+            optional = (first, last, True)
+        fragment = _EMPTY
+        for copy in copies[:required]:
+            fragment = self._concat(fragment, copy)
+        return self._concat(fragment, optional)
+
+    def _atomic(
+        self, node: nodes.Extension, ancestors: t.Tuple[nodes.Node, ...]
+    ) -> _Fragment:
+        """Atomic groups never backtrack into their content, which becomes a single position."""
+        inner = _Automaton(node.child)
+        try:
+            label = CharSet().union(*inner.labels)
+        except ValueError:
+            label = _EVERYTHING
+        position = self._position(label, ancestors)
+        return ({position}, {position}, inner.nullable)
+
+    def pair_successors(self, pair: t.Tuple[int, int]) -> t.List[t.Tuple[int, int]]:
+        """
+        Successors of a pair of positions in the product of the automaton with itself,
+        the pair's positions both reading the same character.
+        """
+        successors = self._pairs.get(pair)
+        if successors is None:
+            first, second = pair
+            successors = [
+                (target, other)
+                for target in self.follow[first]
+                for other in self.follow[second]
+                if _overlap(self.labels[target], self.labels[other])
+            ]
+            self._pairs[pair] = successors
+        return successors
+
+
+_Vertex = t.TypeVar("_Vertex")
+
+
+def _components(
+    roots: t.Iterable[_Vertex], successors: t.Callable[[_Vertex], t.Iterable[_Vertex]]
+) -> t.Dict[_Vertex, int]:
+    """
+    Labels the strongly connected components of the vertices reachable from :code:`roots`,
+    with Tarjan's algorithm, without recursion.
+    """
+    index: t.Dict[_Vertex, int] = {}
+    low: t.Dict[_Vertex, int] = {}
+    component: t.Dict[_Vertex, int] = {}
+    stack: t.List[_Vertex] = []
+    for root in roots:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            vertex, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    work.append((child, iter(successors(child))))
+                elif child not in component:
+                    low[vertex] = min(low[vertex], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[vertex])
+            if low[vertex] == index[vertex]:
+                while True:
+                    member = stack.pop()
+                    component[member] = index[vertex]
+                    if member == vertex:
+                        break
+    return component
+
+
+def _cyclic(
+    component: t.Dict[_Vertex, int],
+    successors: t.Callable[[_Vertex], t.Iterable[_Vertex]],
+) -> t.Set[_Vertex]:
+    """Returns the vertices that are on a cycle."""
+    sizes: t.Dict[int, int] = {}
+    for label in component.values():
+        sizes[label] = sizes.get(label, 0) + 1
+    return {
+        vertex
+        for vertex, label in component.items()
+        if sizes[label] > 1 or vertex in successors(vertex)
+    }
+
+
+def _exponential(automaton: _Automaton) -> t.List[t.Set[int]]:
+    """
+    Returns sets of positions on which the automaton has an exponential degree of ambiguity,
+    that is a position with two different cycles reading the same text.
+    """
+    diagonal = [(position, position) for position in range(len(automaton.labels))]
+    component = _components(diagonal, automaton.pair_successors)
+    members: t.Dict[int, t.List[t.Tuple[int, int]]] = {}
+    for pair, label in component.items():
+        members.setdefault(label, []).append(pair)
+    found = [
+        {position for pair in pairs for position in pair}
+        for pairs in members.values()
+        if any(first == second for first, second in pairs)
+        and any(first != second for first, second in pairs)
+    ]
+    # Parallel transitions are different paths too, like the two loops of (?:a*)*.
+    for source, follow in enumerate(automaton.follow):
+        for target, count in follow.items():
+            if count > 1 and (
+                source == target
+                or component[source, source] == component[target, target]
+            ):
+                found.append({source, target})
+    return found
+
+
+def _polynomial(automaton: _Automaton) -> t.List[t.Set[int]]:
+    """
+    Returns pairs of positions on which the automaton has an infinite polynomial degree of ambiguity,
+    that is two different loops that can read the same text, the first one leading to the second.
+    """
+    positions = range(len(automaton.labels))
+    loops = _components(positions, lambda position: automaton.follow[position])
+    looping = _cyclic(loops, lambda position: automaton.follow[position])
+    diagonal = [(position, position) for position in positions]
+    component = _components(diagonal, automaton.pair_successors)
+    cyclic_pairs = _cyclic(component, automaton.pair_successors)
+    found = []
+    reachable: t.Dict[int, t.Set[t.Tuple[int, int]]] = {}
+    for first, second in cyclic_pairs:
+        if (
+            first == second
+            or first not in looping
+            or second not in looping
+            or loops[first] == loops[second]
+        ):
+            continue
+        if first not in reachable:
+            reachable[first] = _reach((first, first), automaton.pair_successors)
+        if (first, second) in reachable[first]:
+            found.append({first, second})
+    return found
+
+
+def _reach(
+    root: _Vertex, successors: t.Callable[[_Vertex], t.Iterable[_Vertex]]
+) -> t.Set[_Vertex]:
+    seen = {root}
+    stack = [root]
+    while stack:
+        for child in successors(stack.pop()):
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return seen
+
+
+def _common_ancestors(
+    automaton: _Automaton, positions: t.Iterable[int]
+) -> t.List[nodes.Node]:
+    """Returns the nodes containing all of the positions, from the root down."""
+    paths = [automaton.ancestors[position] for position in positions]
+    common = []
+    for ancestors in zip(*paths):
+        if any(node is not ancestors[0] for node in ancestors):
+            break
+        common.append(ancestors[0])
+    return common
+
+
+def _loops(node: nodes.Node) -> bool:
+    return isinstance(node, nodes.Repeat) and (node.max is None or node.max > 1)
+
+
+def analyze(pattern: "_pattern.RegexPattern") -> t.List[BacktrackingIssue]:
+    """
+    Finds the parts of a pattern that can backtrack catastrophically, the worst ones first.
+    Patterns containing regex strings are parsed with :func:`~regexfactory.parser.parse` first,
+    which raises :class:`re.error` if the pattern isn't valid.
+    """
+    from .parser import structured_node  # pylint: disable=import-outside-toplevel
+
+    automaton = _Automaton(structured_node(pattern))
+    found: t.Dict[nodes.Node, BacktrackingIssue] = {}
+    for positions in _exponential(automaton):
+        common = _common_ancestors(automaton, positions)
+        candidates = [node for node in reversed(common) if _loops(node)]
+        culprit = next(
+            (node for node in candidates if _exponential(_Automaton(node))),
+            candidates[-1] if candidates else common[-1],
+        )
+        found.setdefault(
+            culprit,
+            BacktrackingIssue(
+                Severity.EXPONENTIAL,
+                _pattern.RegexPattern(culprit),
+                "a repetition can match the same text in more than one way",
+            ),
+        )
+    for positions in _polynomial(automaton):
+        culprit = _common_ancestors(automaton, positions)[-1]
+        found.setdefault(
+            culprit,
+            BacktrackingIssue(
+                Severity.POLYNOMIAL,
+                _pattern.RegexPattern(culprit),
+                "consecutive repetitions can match the same text",
+            ),
+        )
+    return list(found.values())
+
+
+#: The severity from which :class:`CatastrophicBacktrackingError` is raised when a pattern is built,
+#: :code:`None` when strict mode is off. See :func:`set_strict_mode`.
+STRICT_SEVERITY: t.Optional[Severity] = None
+
+_CHECKING = threading.local()
+
+
+def set_strict_mode(severity: t.Optional[Severity]) -> t.Optional[Severity]:
+    """
+    Turns strict mode on for issues of at least the given severity, or off with :code:`None`.
+    Returns the previous setting. Strict mode applies to every thread.
+    """
+    global STRICT_SEVERITY  # pylint: disable=global-statement
+    previous, STRICT_SEVERITY = STRICT_SEVERITY, severity
+    return previous
+
+
+@contextlib.contextmanager
+def strict_mode(severity: Severity = Severity.EXPONENTIAL) -> t.Iterator[None]:
+    """Turns strict mode on inside a :code:`with` block, see :func:`set_strict_mode`."""
+    previous = set_strict_mode(severity)
+    try:
+        yield
+    finally:
+        set_strict_mode(previous)
+
+
+def check(pattern: "_pattern.RegexPattern") -> None:
+    """
+    Raises :class:`CatastrophicBacktrackingError` if a pattern has issues at least as severe as
+    :data:`STRICT_SEVERITY`. Patterns that are not valid regexes on their own are not checked.
+    """
+    if STRICT_SEVERITY is None or getattr(_CHECKING, "active", False):
+        return
+    threshold = SEVERITIES.index(STRICT_SEVERITY)
+    _CHECKING.active = True
+    try:
+        issues = [
+            issue
+            for issue in analyze(pattern)
+            if SEVERITIES.index(issue.severity) >= threshold
+        ]
+    except re.error:
+        issues = []
+    finally:
+        _CHECKING.active = False
+    if issues:
+        raise CatastrophicBacktrackingError(issues)
@@ -0,0 +1,141 @@
+"""
+Compile Cache
+*************
+
+Module for the process-wide cache of compiled patterns used by :meth:`RegexPattern.compile`.
+
+Python's :mod:`re` module keeps a small internal cache that silently drops entries
+once it is full, so applications that build many distinct patterns end up compiling
+the same regex over and over.
+:data:`COMPILE_CACHE` is a bounded least-recently-used cache of :class:`re.Pattern`
+objects keyed by :code:`(regex, flags)`, that reports how well it is doing.
+
+.. exec_code::
+
+    from regexfactory import COMPILE_CACHE, DIGIT, Multi
+
+    COMPILE_CACHE.clear()
+    Multi(DIGIT).compile()
+    Multi(DIGIT).compile()
+    print(COMPILE_CACHE.info())
+
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple, Union
+
+CacheKey = Tuple[Union[str, bytes], int]
+
+
+class CacheInfo(NamedTuple):
+    """Statistics snapshot returned by :meth:`CompileCache.info`."""
+
+    #: Lookups answered from the cache.
+    hits: int
+    #: Lookups that had to compile the regex.
+    misses: int
+    #: Entries dropped to respect :attr:`CompileCache.maxsize`.
+    evictions: int
+    #: Number of entries currently cached.
+    currsize: int
+    #: The configured bound, :code:`None` meaning unbounded.
+    maxsize: Optional[int]
+    #: Total seconds spent in :func:`re.compile` on misses.
+    compile_time: float
+
+
+class CompileCache:
+    """
+    A thread-safe LRU cache of compiled :class:`re.Pattern` objects.
+    Every access takes an internal lock, so the cache is also safe to share on free-threaded builds of CPython.
+    Compilation itself happens outside of the lock, so a slow compile never blocks lookups of other patterns.
+
+    :param maxsize: The maximum number of compiled patterns to keep,
+        :code:`None` for no bound and :code:`0` to disable caching.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 4096) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, re.Pattern]" = OrderedDict()
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._compile_time = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        """The maximum number of entries, see :meth:`resize`."""
+        return self._maxsize
+
+    def resize(self, maxsize: Optional[int]) -> None:
+        """Changes :attr:`maxsize`, evicting the least recently used entries if needed."""
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("maxsize must be None or a non-negative integer.")
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def compile(self, regex: Union[str, bytes], flags: int = 0) -> re.Pattern:
+        """Returns the compiled pattern for :code:`(regex, flags)`, compiling it on a miss."""
+        key = (regex, flags)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return compiled
+            self._misses += 1
+        start = time.perf_counter()
+        compiled = re.compile(regex, flags=flags)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._compile_time += elapsed
+            if self._maxsize == 0:
+                return compiled
+            # Another thread may have compiled the same key meanwhile, keep the first one.
+            compiled = self._entries.setdefault(key, compiled)
+            self._entries.move_to_end(key)
+            self._evict()
+        return compiled
+
+    def info(self) -> CacheInfo:
+        """Returns a :class:`CacheInfo` snapshot of the cache statistics."""
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                currsize=len(self._entries),
+                maxsize=self._maxsize,
+                compile_time=self._compile_time,
+            )
+
+    def clear(self, *, reset_stats: bool = True) -> None:
+        """Drops every cached pattern, and unless told otherwise, resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            if reset_stats:
+                self._hits = self._misses = self._evictions = 0
+                self._compile_time = 0.0
+
+    def _evict(self) -> None:
+        # Must be called with the lock held.
+        if self._maxsize is None:
+            return
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+#: The cache used by :meth:`RegexPattern.compile`.
+COMPILE_CACHE = CompileCache()
@@ -0,0 +1,289 @@
+"""
+Character Sets
+**************
+
+Module for the :class:`CharSet` class,
+the canonical form of the character classes built by :class:`Set` and :class:`NotSet`.
+
+A :class:`CharSet` keeps its members as a sorted list of merged code-point intervals
+plus the shorthand escapes :code:`\\d`, :code:`\\w`, :code:`\\s` and their negations,
+so duplicate, overlapping and adjacent members collapse into the smallest class.
+
+.. exec_code::
+
+    from regexfactory import Range, Set
+
+    print(Set(Range("a", "m"), Range("c", "z"), "0123456789", "x"))
+
+"""
+
+import sys
+import unicodedata
+from typing import Iterable, List, Optional, Tuple, Union
+
+#: A closed interval of code points.
+Interval = Tuple[int, int]
+
+#: Shorthand escapes that can be used inside character classes, in rendering order.
+CLASS_ESCAPES = "dDwWsS"
+
+# ASCII characters each escape is guaranteed to match, whatever the flags.
+_ESCAPE_COVERS = {
+    "d": ((0x30, 0x39),),
+    "w": ((0x30, 0x39), (0x41, 0x5A), (0x5F, 0x5F), (0x61, 0x7A)),
+    "s": ((0x09, 0x0D), (0x20, 0x20)),
+}
+
+# Escapes that are subsets of other escapes.
+_ESCAPE_SUPERSETS = {"d": "wS", "s": "WD", "w": "S", "W": "D"}
+
+_SIMPLE_ESCAPES = {"a": 7, "b": 8, "f": 12, "n": 10, "r": 13, "t": 9, "v": 11}
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+_OCTAL_DIGITS = "01234567"
+_CLASS_SPECIALS = "\\]^-[&~|"
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> Tuple[Interval, ...]:
+    """Sorts intervals and merges the overlapping and adjacent ones."""
+    merged: List[List[int]] = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return tuple((low, high) for low, high in merged)
+
+
+def subtract_intervals(
+    intervals: Iterable[Interval], removed: Iterable[Interval]
+) -> Tuple[Interval, ...]:
+    """Removes the code points of :code:`removed` from :code:`intervals`."""
+    result = []
+    removed = merge_intervals(removed)
+    for low, high in merge_intervals(intervals):
+        for removed_low, removed_high in removed:
+            if removed_high < low or removed_low > high:
+                continue
+            if removed_low > low:
+                result.append((low, removed_low - 1))
+            low = removed_high + 1
+            if low > high:
+                break
+        if low <= high:
+            result.append((low, high))
+    return tuple(result)
+
+
+def _read_escape(text: str, index: int) -> Tuple[Union[int, str], int]:
+    """
+    Reads the escape sequence whose backslash is at :code:`index` inside a character class.
+    Returns a code point, or a letter of :data:`CLASS_ESCAPES`, and the index after the escape.
+    Raises :class:`ValueError` for escapes that are not valid there.
+    """
+    char = text[index + 1 : index + 2]
+    if not char:
+        raise ValueError("Trailing backslash.")
+    end = index + 2
+    if char in CLASS_ESCAPES:
+        return char, end
+    if char in _SIMPLE_ESCAPES:
+        return _SIMPLE_ESCAPES[char], end
+    if char in _HEX_ESCAPES:
+        digits = text[end : end + _HEX_ESCAPES[char]]
+        if len(digits) != _HEX_ESCAPES[char]:
+            raise ValueError(f"Incomplete escape \\{char}{digits}.")
+        return int(digits, 16), end + len(digits)
+    if char == "N" and text[end : end + 1] == "{":
+        close = text.index("}", end)
+        return ord(unicodedata.lookup(text[end + 1 : close])), close + 1
+    if char in _OCTAL_DIGITS:
+        while end < min(index + 4, len(text)) and text[end] in _OCTAL_DIGITS:
+            end += 1
+        code = int(text[index + 1 : end], 8)
+        if code > 0o377:
+            raise ValueError(f"Octal escape out of range \\{text[index + 1 : end]}.")
+        return code, end
+    if char.isascii() and char.isalnum():
+        raise ValueError(f"Bad escape \\{char}.")
+    return ord(char), end
+
+
+def _read_item(text: str, index: int) -> Tuple[Union[int, str], int]:
+    if text[index] == "\\":
+        return _read_escape(text, index)
+    return ord(text[index]), index + 1
+
+
+def _class_char(code: int) -> str:
+    """Renders a code point for use inside a character class."""
+    char = chr(code)
+    if char in _CLASS_SPECIALS:
+        return "\\" + char
+    if char.isprintable():
+        return char
+    if code < 0x100:
+        return f"\\x{code:02x}"
+    if code < 0x10000:
+        return f"\\u{code:04x}"
+    return f"\\U{code:08x}"
+
+
+def _literal_char(code: int) -> str:
+    """Renders a code point for use outside of a character class."""
+    char = chr(code)
+    if char.isprintable():
+        # Spaces and # are escaped like re.escape does, verbose patterns would skip them.
+        return "\\" + char if char in "()[]{}?*+-|^$\\.&~# " else char
+    return _class_char(code)
+
+
+class CharSet:
+    """
+    An immutable, canonical character class.
+
+    :param intervals: Closed code-point intervals the class matches.
+    :param escapes: Letters of the shorthand escapes the class matches, like :code:`"dw"`.
+    :param raw: Class body fragments that could not be interpreted, rendered verbatim.
+    :param negated: Whether the class matches characters **NOT** in it.
+    """
+
+    intervals: Tuple[Interval, ...]
+    escapes: str
+    raw: Tuple[str, ...]
+    negated: bool
+
+    def __init__(
+        self,
+        intervals: Iterable[Interval] = (),
+        escapes: Iterable[str] = "",
+        raw: Iterable[str] = (),
+        negated: bool = False,
+    ) -> None:
+        escapes = set(escapes)
+        escapes -= {
+            escape
+            for escape in escapes
+            if any(
+                superset in escapes for superset in _ESCAPE_SUPERSETS.get(escape, "")
+            )
+        }
+        covered = [
+            interval
+            for escape in escapes
+            for interval in _ESCAPE_COVERS.get(escape, ())
+        ]
+        self.intervals = subtract_intervals(intervals, covered)
+        self.escapes = "".join(escape for escape in CLASS_ESCAPES if escape in escapes)
+        self.raw = tuple(dict.fromkeys(raw))
+        self.negated = negated
+
+    @classmethod
+    def parse(cls, body: str) -> "CharSet":
+        """
+        Builds a :class:`CharSet` from the text between the brackets of a character class.
+        Special characters like :code:`^` and :code:`]` are taken literally,
+        and bodies that can't be interpreted are kept verbatim in :attr:`raw`.
+        """
+        intervals: List[Interval] = []
+        escapes = []
+        index = 0
+        try:
+            while index < len(body):
+                item, index = _read_item(body, index)
+                if isinstance(item, str):
+                    escapes.append(item)
+                    continue
+                if body[index : index + 1] == "-" and index + 1 < len(body):
+                    stop, index = _read_item(body, index + 1)
+                    if isinstance(stop, str) or stop < item:
+                        raise ValueError("Bad character range.")
+                    intervals.append((item, stop))
+                else:
+                    intervals.append((item, item))
+        except (ValueError, KeyError):
+            return cls(raw=(body,))
+        return cls(intervals, escapes)
+
+    @classmethod
+    def range(cls, start: str, stop: str) -> "CharSet":
+        """Builds the :class:`CharSet` for a range between two (possibly escaped) characters."""
+        low, high = cls.parse(start)._single_code(), cls.parse(stop)._single_code()
+        if low is None or high is None or low > high:
+            return cls(raw=(f"{start}-{stop}",))
+        return cls(((low, high),))
+
+    def union(self, *others: "CharSet") -> "CharSet":
+        """Returns a non-negated :class:`CharSet` matching characters matched by any of the sets."""
+        sets = [charset.positive() for charset in (self, *others)]
+        return CharSet(
+            (interval for charset in sets for interval in charset.intervals),
+            (escape for charset in sets for escape in charset.escapes),
+            (raw for charset in sets for raw in charset.raw),
+        )
+
+    def negate(self) -> "CharSet":
+        """Returns the :class:`CharSet` matching exactly the characters this one does not."""
+        return CharSet(self.intervals, self.escapes, self.raw, not self.negated)
+
+    def positive(self) -> "CharSet":
+        """
+        Returns an equivalent non-negated :class:`CharSet`.
+        Raises :class:`ValueError` if a negated class mixes escapes with other members,
+        as the complement can't be written as a single class.
+        """
+        if not self.negated:
+            return self
+        if self.raw or (self.escapes and (self.intervals or len(self.escapes) > 1)):
+            raise ValueError(f"Can't take the complement of {self.render()}.")
+        if self.escapes:
+            return CharSet(escapes=self.escapes.swapcase())
+        return CharSet(subtract_intervals([(0, sys.maxunicode)], self.intervals))
+
+    def body(self) -> str:
+        """Renders the members of the class, without brackets or negation."""
+        parts = ["\\" + escape for escape in self.escapes]
+        for low, high in self.intervals:
+            if low == high:
+                parts.append(_class_char(low))
+            elif high == low + 1:
+                parts.append(_class_char(low) + _class_char(high))
+            else:
+                parts.append(_class_char(low) + "-" + _class_char(high))
+        parts.extend(self.raw)
+        return "".join(parts)
+
+    def render(self) -> str:
+        """Renders the class in its shortest form."""
+        if not self.raw:
+            if not self.intervals and not self.escapes:
+                return "[\\s\\S]" if self.negated else "(?!)"
+            if not self.escapes and len(self.intervals) == 1 and not self.negated:
+                low, high = self.intervals[0]
+                if low == high:
+                    return _literal_char(low)
+            if len(self.escapes) == 1 and not self.intervals:
+                return "\\" + (
+                    self.escapes.swapcase() if self.negated else self.escapes
+                )
+        return "[" + ("^" if self.negated else "") + self.body() + "]"
+
+    def _single_code(self) -> Optional[int]:
+        """Returns the code point of the only character in the set, if that is the case."""
+        if self.negated or self.escapes or self.raw or len(self.intervals) != 1:
+            return None
+        low, high = self.intervals[0]
+        return low if low == high else None
+
+    def _key(self) -> Tuple[Tuple[Interval, ...], str, Tuple[str, ...], bool]:
+        return (self.intervals, self.escapes, self.raw, self.negated)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CharSet):
+            return self._key() == other._key()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"<CharSet {self.render()}>"
@@ -0,0 +1,563 @@
+"""
+DFA Engine
+**********
+
+Module for :class:`DFAPattern`, a pure-Python engine for patterns that are truly regular,
+selected with :code:`RegexPattern.compile(engine="dfa")`.
+
+:mod:`re` backtracks, so patterns like :code:`Multi(Multi("a"))` take exponential time
+on text they almost match.
+This engine turns the pattern into a nondeterministic automaton whose states are
+tried in the order :mod:`re` would try them, and builds the deterministic automaton
+from it lazily: a state is only made the first time the text leads to it, then cached.
+Each character costs one dictionary lookup once its transition is cached,
+so :meth:`~DFAPattern.fullmatch`, :meth:`~DFAPattern.search` and :meth:`~DFAPattern.test`
+take time linear in the length of the text, and find the same matches as :mod:`re`.
+
+Patterns with backreferences, lookarounds, conditionals, atomic groups, capturing groups,
+word boundaries or flags other than :data:`re.ASCII`, :data:`re.DOTALL` and :data:`re.VERBOSE`
+can't run on it, and :meth:`RegexPattern.compile` falls back to :mod:`re` for them.
+
+.. exec_code::
+
+    import re
+    from regexfactory import Multi
+
+    nested = Multi(Multi("a"))
+    compiled = nested.compile(engine="dfa")
+    print(compiled)
+    print(compiled.fullmatch("a" * 30 + "b"))
+    print(compiled.search("baaac"))
+    print(nested.compile(engine="dfa", flags=re.IGNORECASE))
+
+"""
+
+import bisect
+import re
+import typing as t
+
+from . import nodes
+from .charset import CharSet
+from .parser import parse, structured_node
+from .pattern import RegexPattern
+
+# Kinds of the states of the nondeterministic automaton.
+_CHAR = 0  # Consumes a character accepted by its test.
+_SPLIT = 1  # Goes on to both of its targets, the first one is preferred.
+_EMPTY = 2  # Goes on to its target.
+_BEGIN = 3  # Goes on to its target if its assertion holds where the scan began.
+_FINISH = 4  # Accepts if its assertion holds, has nothing after it.
+_MATCH = 5  # Accepts.
+
+# Anchors that assert where a match starts, and where it ends.
+_STARTS = ("^", "\\A")
+_ENDS = ("$", "\\Z")
+
+_SUPPORTED_FLAGS = re.ASCII | re.DOTALL | re.UNICODE | re.VERBOSE
+
+# Above that many states, the nondeterministic automaton is too large to be worth building.
+_MAX_STATES = 10_000
+
+# Above that many deterministic states, the cache is flushed, so memory stays bounded.
+_MAX_CACHED = 4_096
+
+_ASCII_SPACES = frozenset(b" \t\n\r\f\v")
+
+
+def _holds(symbol: str, string: t.Any, index: int, end: int) -> bool:
+    """Whether an anchor holds at :code:`index` of a string searched up to :code:`end`."""
+    if symbol in _STARTS:
+        return index == 0
+    if symbol == "\\Z":
+        return index == end
+    return index == end or (index == end - 1 and string[index] in ("\n", 10))
+
+
+# Tests of the shorthand escapes for code points, with and without ASCII-only matching.
+_ESCAPE_TESTS: t.Dict[t.Tuple[str, bool], t.Callable[[int], bool]] = {
+    ("d", True): lambda code: 0x30 <= code <= 0x39,
+    ("w", True): lambda code: code < 0x80 and (chr(code).isalnum() or code == 0x5F),
+    ("s", True): lambda code: code in _ASCII_SPACES,
+    ("d", False): lambda code: chr(code).isdecimal(),
+    ("w", False): lambda code: chr(code).isalnum() or code == 0x5F,
+    ("s", False): lambda code: chr(code).isspace(),
+}
+
+
+def _class_test(charset: CharSet, ascii_only: bool) -> t.Callable[[int], bool]:
+    """Returns the test of a character class for code points."""
+    lows = [low for low, _ in charset.intervals]
+    highs = [high for _, high in charset.intervals]
+    escapes = [
+        (_ESCAPE_TESTS[letter.lower(), ascii_only], letter.isupper())
+        for letter in charset.escapes
+    ]
+    negated = charset.negated
+
+    def test(code: int) -> bool:
+        index = bisect.bisect_right(lows, code) - 1
+        found = index >= 0 and code <= highs[index]
+        found = found or any(escape(code) != upper for escape, upper in escapes)
+        return found != negated
+
+    return test
+
+
+class _State:
+    """A state of the deterministic automaton, and its cached transitions."""
+
+    __slots__ = ("threads", "searching", "finals", "next", "cuts")
+
+    def __init__(
+        self,
+        threads: t.Tuple[int, ...],
+        searching: bool,
+        finals: t.Tuple[t.Tuple[int, str], ...],
+    ) -> None:
+        #: The nondeterministic states it stands for, in the order they are preferred.
+        self.threads = threads
+        #: Whether a new match attempt starts at every position.
+        self.searching = searching
+        #: Indexes of the accepting threads, with the anchor that must hold for them to accept.
+        self.finals = finals
+        #: The states reached by each character.
+        self.next: t.Dict[t.Any, _State] = {}
+        #: The states left when the thread at each index accepts, without the threads after it.
+        self.cuts: t.Dict[int, _State] = {}
+
+
+class _Automaton:  # pylint: disable=too-many-instance-attributes
+    """
+    A nondeterministic automaton built from a node tree, with the deterministic states made from it.
+    With :code:`reverse`, it matches the reversed text of the tree's matches,
+    which is how :meth:`DFAPattern.search` finds where a match starts once it knows its end.
+    """
+
+    def __init__(
+        self, node: nodes.Node, flags: int, *, binary: bool, reverse: bool = False
+    ):
+        self.kinds: t.List[int] = []
+        self.tests: t.List[t.Optional[t.Callable[[int], bool]]] = []
+        self.targets: t.List[t.List[int]] = []
+        self.symbols: t.List[str] = []
+        #: Where each unbounded loop goes on to when it is left.
+        self.exits: t.Dict[int, int] = {}
+        self._ascii = binary or bool(flags & re.ASCII)
+        self._dotall = bool(flags & re.DOTALL)
+        self._reverse = reverse
+        self.match = self._add(_MATCH)
+        self.start = self._build(node, self.match)
+        self._states: t.Dict[t.Tuple[t.Tuple[int, ...], bool], _State] = {}
+        self._initial: t.Dict[t.Tuple[t.FrozenSet[str], bool], _State] = {}
+        self._restarts = bool(self._closure([self.start], frozenset(), set()))
+
+    def _add(
+        self,
+        kind: int,
+        targets: t.Sequence[int] = (),
+        test: t.Optional[t.Callable[[int], bool]] = None,
+        symbol: str = "",
+    ) -> int:
+        if len(self.kinds) >= _MAX_STATES:
+            raise ValueError("it is too large")
+        self.kinds.append(kind)
+        self.targets.append(list(targets))
+        self.tests.append(test)
+        self.symbols.append(symbol)
+        return len(self.kinds) - 1
+
+    def _build(  # pylint: disable=too-many-return-statements,too-many-branches
+        self, node: nodes.Node, after: int
+    ) -> int:
+        """Adds the states matching a node, followed by :code:`after`, and returns the first one."""
+        if isinstance(node, nodes.Literal):
+            text = node.text if self._reverse else node.text[::-1]
+            for char in text:
+                after = self._add(_CHAR, [after], ord(char).__eq__)
+            return after
+        if isinstance(node, nodes.CharClass):
+            if node.charset.raw:
+                raise ValueError(f"the class {node.render()} can't be interpreted")
+            return self._add(_CHAR, [after], _class_test(node.charset, self._ascii))
+        if isinstance(node, nodes.AnyChar):
+            test = (lambda code: True) if self._dotall else (lambda code: code != 10)
+            return self._add(_CHAR, [after], test)
+        if isinstance(node, nodes.Anchor):
+            return self._anchor(node.symbol, after)
+        if isinstance(node, nodes.Concat):
+            items = list(node.flatten())
+            for item in items if self._reverse else reversed(items):
+                after = self._build(item, after)
+            return after
+        if isinstance(node, nodes.Alternation):
+            first = self._build(node.items[-1], after)
+            for item in reversed(node.items[:-1]):
+                first = self._add(_SPLIT, [self._build(item, after), first])
+            return first
+        if isinstance(node, nodes.Repeat):
+            return self._repeat(node, after)
+        if isinstance(node, nodes.Group):
+            if node.capturing:
+                raise ValueError("it has capturing groups")
+            return self._build(node.child, after)
+        if isinstance(node, nodes.Comment) or node == nodes.Raw(""):
+            # Empty raw strings are left by inline flags, which are part of the compiled flags.
+            return after
+        if isinstance(node, nodes.Extension) and node.child == nodes.Raw(""):
+            return after
+        raise ValueError(f"it has {node.render()!r}, which isn't regular")
+
+    def _anchor(self, symbol: str, after: int) -> int:
+        if symbol not in _STARTS + _ENDS:
+            raise ValueError(f"the assertion {symbol} isn't supported")
+        if (symbol in _ENDS) == self._reverse:
+            return self._add(_BEGIN, [after], symbol=symbol)
+        if after != self.match:
+            raise ValueError(
+                f"the assertion {symbol} is followed by more of the pattern"
+            )
+        return self._add(_FINISH, symbol=symbol)
+
+    def _repeat(self, node: nodes.Repeat, after: int) -> int:
+        first = after
+        if node.max is None:
+            first = self._add(_SPLIT)
+            body = self._build(node.child, first)
+            self.targets[first] = [body, after] if node.greedy else [after, body]
+            self.exits[first] = after
+        else:
+            # Optional copies are nested, x{0,2} is (?:x(?:x)?)?, like re tries them.
+            for _ in range(node.max - node.min):
+                body = self._build(node.child, first)
+                first = self._add(
+                    _SPLIT, [body, after] if node.greedy else [after, body]
+                )
+        for _ in range(node.min):
+            first = self._build(node.child, first)
+        return first
+
+    def _closure(
+        self, starts: t.Iterable[int], begin: t.FrozenSet[str], seen: t.Set[int]
+    ) -> t.List[int]:
+        """
+        Follows the states that don't consume characters, in the order they are preferred,
+        and returns the states reached that do, or that accept.
+        States in :code:`seen` were already reached by preferred paths and are skipped.
+        """
+        threads = []
+        stack = list(starts)[::-1]
+        while stack:
+            state = stack.pop()
+            if state in seen:
+                # Like re, a loop is left after an iteration that matched nothing.
+                if state in self.exits:
+                    stack.append(self.exits[state])
+                continue
+            seen.add(state)
+            kind = self.kinds[state]
+            if kind in (_SPLIT, _EMPTY):
+                stack.extend(reversed(self.targets[state]))
+            elif kind == _BEGIN:
+                if self.symbols[state] in begin:
+                    stack.extend(self.targets[state])
+            else:
+                threads.append(state)
+        return threads
+
+    def _state(self, threads: t.Tuple[int, ...], searching: bool) -> _State:
+        key = (threads, searching)
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= _MAX_CACHED:
+                self._flush()
+            finals = tuple(
+                (index, self.symbols[thread])
+                for index, thread in enumerate(threads)
+                if self.kinds[thread] in (_FINISH, _MATCH)
+            )
+            state = self._states[key] = _State(threads, searching, finals)
+        return state
+
+    def _flush(self) -> None:
+        for state in self._states.values():
+            state.next.clear()
+            state.cuts.clear()
+        self._states.clear()
+        self._initial.clear()
+
+    def initial(self, string: t.Any, index: int, end: int, searching: bool) -> _State:
+        """Returns the state a scan starting at :code:`index` begins in."""
+        begin = frozenset(
+            symbol for symbol in _STARTS + _ENDS if _holds(symbol, string, index, end)
+        )
+        key = (begin, searching)
+        state = self._initial.get(key)
+        if state is None:
+            threads = self._closure([self.start], begin, set())
+            state = self._initial[key] = self._state(tuple(threads), searching)
+        return state
+
+    def step(self, state: _State, char: t.Any) -> _State:
+        """Returns the state reached from :code:`state` by a character, caching it."""
+        code = char if isinstance(char, int) else ord(char)
+        seen: t.Set[int] = set()
+        threads = []
+        for thread in state.threads:
+            test = self.tests[thread]
+            if test is not None and test(code):
+                threads.extend(self._closure(self.targets[thread], frozenset(), seen))
+        if state.searching:
+            # A match starting here is preferred less than those that started before.
+            threads.extend(self._closure([self.start], frozenset(), seen))
+        following = self._state(tuple(threads), state.searching)
+        state.next[char] = following
+        return following
+
+    def accepted(
+        self, state: _State, string: t.Any, index: int, end: int
+    ) -> t.Optional[int]:
+        """Returns the index of the preferred thread of a state accepting at a position, if any."""
+        for thread, symbol in state.finals:
+            if not symbol or _holds(symbol, string, index, end):
+                return thread
+        return None
+
+    def cut(self, state: _State, index: int) -> _State:
+        """Returns the state without the threads less preferred than an accepting one."""
+        cut = state.cuts.get(index)
+        if cut is None:
+            cut = state.cuts[index] = self._state(state.threads[:index], False)
+        return cut
+
+    def dead(self, state: _State) -> bool:
+        """Whether no match can be found from a state anymore."""
+        return not state.threads and not (state.searching and self._restarts)
+
+
+class DFAMatch:
+    """
+    A match found by a :class:`DFAPattern`, with the accessors of :class:`re.Match`.
+    Patterns run on the DFA engine have no capturing groups, so only group 0 exists.
+    """
+
+    __slots__ = ("re", "string", "pos", "endpos", "_span")
+
+    #: The pattern that found the match.
+    re: "DFAPattern"
+    #: The text searched.
+    string: t.Any
+    #: See :attr:`re.Match.pos`.
+    pos: int
+    #: See :attr:`re.Match.endpos`.
+    endpos: int
+
+    lastindex = None
+    lastgroup = None
+
+    def __init__(
+        self,
+        pattern: "DFAPattern",
+        string: t.Any,
+        bounds: t.Tuple[int, int],
+        span: t.Tuple[int, int],
+    ) -> None:
+        self.re = pattern
+        self.string = string
+        self.pos, self.endpos = bounds
+        self._span = span
+
+    def _check(self, group: t.Union[int, str]) -> None:
+        if group != 0:
+            raise IndexError("no such group")
+
+    def group(self, *groups: t.Union[int, str]) -> t.Any:
+        """See :meth:`re.Match.group`."""
+        for group in groups:
+            self._check(group)
+        text = self.string[self._span[0] : self._span[1]]
+        if not isinstance(text, str):
+            text = bytes(text)
+        return text if len(groups) <= 1 else (text,) * len(groups)
+
+    def __getitem__(self, group: t.Union[int, str]) -> t.Any:
+        return self.group(group)
+
+    def groups(self, default: t.Any = None) -> t.Tuple[t.Any, ...]:
+        """See :meth:`re.Match.groups`, there are no groups to fill with :code:`default`."""
+        del default
+        return ()
+
+    def groupdict(self, default: t.Any = None) -> t.Dict[str, t.Any]:
+        """See :meth:`re.Match.groupdict`, there are no groups to fill with :code:`default`."""
+        del default
+        return {}
+
+    def span(self, group: t.Union[int, str] = 0) -> t.Tuple[int, int]:
+        """See :meth:`re.Match.span`."""
+        self._check(group)
+        return self._span
+
+    def start(self, group: t.Union[int, str] = 0) -> int:
+        """See :meth:`re.Match.start`."""
+        return self.span(group)[0]
+
+    def end(self, group: t.Union[int, str] = 0) -> int:
+        """See :meth:`re.Match.end`."""
+        return self.span(group)[1]
+
+    def __repr__(self) -> str:
+        return f"<DFAMatch object; span={self._span!r}, match={self.group()!r}>"
+
+
+class DFAPattern:
+    """
+    A pattern compiled for the DFA engine, with the matching methods of :class:`re.Pattern`
+    that it can run in linear time, plus :meth:`test`.
+    Usually made by :code:`RegexPattern.compile(engine="dfa")`, which falls back to :mod:`re`.
+
+    :param pattern: The pattern to compile.
+    :param flags: Flags to compile it with.
+    :param binary: Whether it matches bytes rather than text.
+    :raises ValueError: If the pattern or the flags aren't supported.
+    """
+
+    #: The regex string, like :attr:`re.Pattern.pattern`.
+    pattern: t.Union[str, bytes]
+    #: The flags, including inline ones, like :attr:`re.Pattern.flags`.
+    flags: int
+
+    groups = 0
+    groupindex: t.Mapping[str, int] = {}
+
+    def __init__(
+        self, pattern: RegexPattern, /, *, flags: int = 0, binary: bool = False
+    ) -> None:
+        compiled = pattern.compile(flags=flags, binary=binary)
+        self.pattern = compiled.pattern
+        self.flags = compiled.flags
+        self._binary = binary
+        try:
+            unsupported = compiled.flags & ~_SUPPORTED_FLAGS
+            if unsupported:
+                raise ValueError(f"of the flags {re.RegexFlag(unsupported)!r}")
+            if compiled.flags & re.VERBOSE:
+                node = parse(pattern.compile(flags=flags)).node
+            else:
+                node = structured_node(pattern)
+            self._forward = _Automaton(node, compiled.flags, binary=binary)
+            self._backward = _Automaton(
+                node, compiled.flags, binary=binary, reverse=True
+            )
+        except ValueError as error:
+            raise ValueError(
+                f"{pattern.regex!r} can't run on the DFA engine, because {error}."
+            ) from None
+
+    def _bounds(
+        self, string: t.Any, pos: int, endpos: t.Optional[int]
+    ) -> t.Optional[t.Tuple[int, int]]:
+        """Returns the part of the string to scan, like :mod:`re` clamps it, or :code:`None` if empty."""
+        if isinstance(string, str) == self._binary:
+            kind = "bytes" if self._binary else "string"
+            raise TypeError(f"cannot use a {kind} pattern on a {type(string).__name__}")
+        length = len(string)
+        pos = min(max(pos, 0), length)
+        end = length if endpos is None else min(max(endpos, 0), length)
+        return None if end < pos else (pos, end)
+
+    def _leftmost(
+        self, string: t.Any, pos: int, end: int, searching: bool
+    ) -> t.Optional[int]:
+        """Returns where the preferred match of the scan from :code:`pos` ends, if any."""
+        automaton = self._forward
+        state = automaton.initial(string, pos, end, searching)
+        last = None
+        index = pos
+        while True:
+            if state.finals:
+                accepted = automaton.accepted(state, string, index, end)
+                if accepted is not None:
+                    last = index
+                    state = automaton.cut(state, accepted)
+            if index == end or automaton.dead(state):
+                return last
+            char = string[index]
+            state = state.next.get(char) or automaton.step(state, char)
+            index += 1
+
+    def _first(self, string: t.Any, pos: int, end: int, match_end: int) -> int:
+        """Returns the first position from which a match can end at :code:`match_end`."""
+        automaton = self._backward
+        state = automaton.initial(string, match_end, end, False)
+        first = match_end
+        index = match_end
+        while True:
+            if (
+                state.finals
+                and automaton.accepted(state, string, index, end) is not None
+            ):
+                first = index
+            if index == pos or automaton.dead(state):
+                return first
+            index -= 1
+            char = string[index]
+            state = state.next.get(char) or automaton.step(state, char)
+
+    def match(
+        self, string: t.Any, pos: int = 0, endpos: t.Optional[int] = None
+    ) -> t.Optional[DFAMatch]:
+        """See :meth:`re.Pattern.match`."""
+        bounds = self._bounds(string, pos, endpos)
+        end = bounds and self._leftmost(string, *bounds, searching=False)
+        if bounds is None or end is None:
+            return None
+        return DFAMatch(self, string, bounds, (bounds[0], end))
+
+    def search(
+        self, string: t.Any, pos: int = 0, endpos: t.Optional[int] = None
+    ) -> t.Optional[DFAMatch]:
+        """
+        See :meth:`re.Pattern.search`.
+        The end of the match is found by a forward scan, then its start by a backward one.
+        """
+        bounds = self._bounds(string, pos, endpos)
+        end = bounds and self._leftmost(string, *bounds, searching=True)
+        if bounds is None or end is None:
+            return None
+        start = self._first(string, *bounds, end)
+        return DFAMatch(self, string, bounds, (start, end))
+
+    def fullmatch(
+        self, string: t.Any, pos: int = 0, endpos: t.Optional[int] = None
+    ) -> t.Optional[DFAMatch]:
+        """See :meth:`re.Pattern.fullmatch`."""
+        bounds = self._bounds(string, pos, endpos)
+        if bounds is None or not self._reaches(string, *bounds, searching=False):
+            return None
+        return DFAMatch(self, string, bounds, bounds)
+
+    def test(self, string: t.Any, pos: int = 0, endpos: t.Optional[int] = None) -> bool:
+        """Whether the pattern matches anywhere in the string, stopping at the first match found."""
+        bounds = self._bounds(string, pos, endpos)
+        return bounds is not None and self._reaches(string, *bounds, searching=True)
+
+    def _reaches(self, string: t.Any, pos: int, end: int, searching: bool) -> bool:
+        """
+        Whether a match ends anywhere when :code:`searching`, or at :code:`end` otherwise.
+        Which match is preferred doesn't matter here, so no thread is dropped.
+        """
+        automaton = self._forward
+        state = automaton.initial(string, pos, end, searching)
+        index = pos
+        while True:
+            if (searching or index == end) and state.finals:
+                if automaton.accepted(state, string, index, end) is not None:
+                    return True
+            if index == end or automaton.dead(state):
+                return False
+            char = string[index]
+            state = state.next.get(char) or automaton.step(state, char)
+            index += 1
+
+    def __repr__(self) -> str:
+        return f"DFAPattern({self.pattern!r})"
@@ -0,0 +1,366 @@
+"""
+Pattern Libraries
+*****************
+
+Module for the :class:`PatternLibrary` class, which saves built patterns to disk,
+so that large grammars are loaded back without running the combinators that built them again.
+
+The file is JSON, holding each pattern's node tree, precedence, flags and rendered regex.
+Subtrees shared by several patterns are only stored once.
+Trees are only rebuilt from the file when a pattern is first looked up,
+and :meth:`PatternLibrary.compile` doesn't even need them, it compiles the stored regex.
+Files record the version of the format, of regexfactory and of the library itself,
+:meth:`PatternLibrary.cached` rebuilds the library when any of them changed.
+
+.. exec_code::
+
+    import os, tempfile
+    from regexfactory import DIGIT, Multi, Or, PatternLibrary
+
+    def build():
+        number = Multi(DIGIT)
+        return PatternLibrary({"number": number, "version": Or("v", "V") + number}, version="1")
+
+    path = os.path.join(tempfile.mkdtemp(), "grammar.json")
+    PatternLibrary.cached(path, build, version="1")
+    library = PatternLibrary.cached(path, build, version="1")
+    print(library)
+    print(library["version"], library.compile("version").search("release V2"))
+
+"""
+
+# pylint: disable=cyclic-import
+
+import json
+import os
+import re
+import tempfile
+import typing as t
+
+from . import nodes
+from .cache import COMPILE_CACHE
+from .charset import CharSet
+from .pattern import RegexPattern, ValidPatternType
+
+#: The version of the file format, files of other versions can't be loaded.
+FORMAT_VERSION = 1
+
+_NODE_TYPES: t.Dict[str, t.Type[nodes.Node]] = {
+    node_type.__name__: node_type for node_type in nodes.NODE_TYPES
+}
+
+
+def _regexfactory_version() -> str:
+    from . import __version__  # pylint: disable=import-outside-toplevel
+
+    return __version__
+
+
+class _Record(t.NamedTuple):
+    """A pattern as stored in a file."""
+
+    #: The index of its root in the table of nodes.
+    node: int
+    precedence: int
+    flags: int
+    regex: str
+
+
+def _child_nodes(values: t.Iterable[t.Any]) -> t.Iterator[nodes.Node]:
+    """Iterates over the nodes among the values of a node."""
+    for value in values:
+        if isinstance(value, nodes.Node):
+            yield value
+        elif isinstance(value, tuple):
+            yield from _child_nodes(value)
+
+
+def _child_indexes(values: t.Iterable[t.Any]) -> t.Iterator[int]:
+    """Iterates over the indexes of the nodes among the stored values of a node."""
+    for value in values:
+        if isinstance(value, dict) and "node" in value:
+            yield value["node"]
+        elif isinstance(value, list):
+            yield from _child_indexes(value)
+
+
+class _Encoder:
+    """
+    Flattens node trees into a table of nodes, where equal subtrees are stored once.
+    Trees are walked with an explicit stack, so deep grammars don't hit the recursion limit.
+    """
+
+    def __init__(self) -> None:
+        self.table: t.List[t.List[t.Any]] = []
+        self._indexes: t.Dict[nodes.Node, int] = {}
+
+    def node(self, node: nodes.Node) -> int:
+        """Returns the index of a node in the table, adding it and its descendants if needed."""
+        pending = [node]
+        while pending:
+            current = pending[-1]
+            if current in self._indexes:
+                pending.pop()
+                continue
+            name = type(current).__name__
+            if _NODE_TYPES.get(name) is not type(current):
+                raise TypeError(f"Can't save nodes of type {name}.")
+            values = current.__reduce__()[1]
+            missing = [
+                child for child in _child_nodes(values) if child not in self._indexes
+            ]
+            if missing:
+                # Children are stored before their parent, in order.
+                pending.extend(reversed(missing))
+                continue
+            pending.pop()
+            self._indexes[current] = len(self.table)
+            self.table.append([name, *map(self._value, values)])
+        return self._indexes[node]
+
+    def _value(self, value: t.Any) -> t.Any:
+        if isinstance(value, nodes.Node):
+            return {"node": self._indexes[value]}
+        if isinstance(value, CharSet):
+            return {
+                "charset": [
+                    [list(interval) for interval in value.intervals],
+                    value.escapes,
+                    list(value.raw),
+                    value.negated,
+                ]
+            }
+        if isinstance(value, tuple):
+            return list(map(self._value, value))
+        return value
+
+
+class _Decoder:
+    """Rebuilds nodes from a table of nodes, each one only once and only when needed."""
+
+    def __init__(self, table: t.List[t.List[t.Any]]) -> None:
+        self._table = table
+        self._nodes: t.List[t.Optional[nodes.Node]] = [None] * len(table)
+
+    def node(self, index: int) -> nodes.Node:
+        """Returns the node at an index of the table."""
+        pending = [index]
+        expanded = set()
+        while pending:
+            current = pending[-1]
+            if self._nodes[current] is not None:
+                pending.pop()
+                continue
+            name, *values = self._table[current]
+            node_type = _NODE_TYPES.get(name)
+            if node_type is None:
+                raise ValueError(f"Unknown node type {name!r}.")
+            missing = [
+                child for child in _child_indexes(values) if self._nodes[child] is None
+            ]
+            if missing:
+                if current in expanded:
+                    raise ValueError(f"Node {current} contains itself.")
+                expanded.add(current)
+                pending.extend(reversed(missing))
+                continue
+            pending.pop()
+            self._nodes[current] = node_type(*map(self._value, values))
+        return t.cast(nodes.Node, self._nodes[index])
+
+    def _value(self, value: t.Any) -> t.Any:
+        if isinstance(value, dict):
+            if "node" in value:
+                return self._nodes[value["node"]]
+            intervals, escapes, raw, negated = value["charset"]
+            return CharSet(map(tuple, intervals), escapes, raw, negated)
+        if isinstance(value, list):
+            return tuple(map(self._value, value))
+        return value
+
+
+class PatternLibrary(t.Mapping[str, RegexPattern]):
+    """
+    A mapping of names to patterns that can be saved to a file and loaded back,
+    with the flags to compile each of them with.
+    Loaded patterns are rebuilt from the file on first lookup and compiled on first :meth:`compile`.
+
+    :param patterns: A mapping, or pairs, of names and patterns.
+    :param flags: Flags to compile some of the patterns with, by name.
+    :param version: The version of the library, a file saved with another version is stale.
+    """
+
+    #: The version of the library, see :meth:`cached`.
+    version: str
+
+    def __init__(
+        self,
+        patterns: t.Union[
+            t.Mapping[str, ValidPatternType], t.Iterable[t.Tuple[str, ValidPatternType]]
+        ] = (),
+        *,
+        flags: t.Optional[t.Mapping[str, int]] = None,
+        version: str = "",
+    ) -> None:
+        self.version = version
+        self._patterns: t.Dict[str, RegexPattern] = {}
+        self._records: t.Dict[str, _Record] = {}
+        self._flags: t.Dict[str, int] = {}
+        self._compiled: t.Dict[str, re.Pattern] = {}
+        self._decoder = _Decoder([])
+        items = patterns.items() if isinstance(patterns, t.Mapping) else patterns
+        for name, pattern in items:
+            self.add(name, pattern, flags=(flags or {}).get(name, 0))
+
+    def add(self, name: str, pattern: ValidPatternType, /, *, flags: int = 0) -> None:
+        """Adds a pattern to the library, replacing any pattern of the same name."""
+        self._patterns[name] = RegexPattern(pattern)
+        self._records.pop(name, None)
+        self._flags[name] = flags
+        self._compiled.pop(name, None)
+
+    def __getitem__(self, name: str) -> RegexPattern:
+        pattern = self._patterns.get(name)
+        if pattern is None:
+            record = self._records[name]
+            pattern = RegexPattern(self._decoder.node(record.node), record.precedence)
+            self._patterns[name] = pattern
+        return pattern
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._flags)
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._flags
+
+    def __repr__(self) -> str:
+        return f"<PatternLibrary {self.version!r} of {len(self)} patterns>"
+
+    def flags(self, name: str) -> int:
+        """Returns the flags a pattern is compiled with."""
+        return self._flags[name]
+
+    def compile(self, name: str) -> re.Pattern:
+        """
+        Compiles a pattern with its flags, the first time it is asked for.
+        Loaded patterns are compiled from the regex stored with them, without rebuilding their tree.
+        """
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            record = self._records.get(name)
+            if record is None:
+                compiled = self[name].compile(flags=self._flags[name])
+            else:
+                compiled = COMPILE_CACHE.compile(record.regex, record.flags)
+            self._compiled[name] = compiled
+        return compiled
+
+    def dumps(self) -> str:
+        """Returns the library in the JSON format of the files it is saved to."""
+        encoder = _Encoder()
+        patterns = {}
+        for name in self:
+            record = self._records.get(name)
+            pattern = self[name]
+            patterns[name] = [
+                encoder.node(pattern.node),
+                pattern.precedence,
+                self._flags[name],
+                pattern.regex if record is None else record.regex,
+            ]
+        document = {
+            "format": FORMAT_VERSION,
+            "regexfactory": _regexfactory_version(),
+            "version": self.version,
+            "nodes": encoder.table,
+            "patterns": patterns,
+        }
+        return json.dumps(document, separators=(",", ":"))
+
+    @classmethod
+    def loads(
+        cls, text: str, /, *, version: t.Optional[str] = None
+    ) -> "PatternLibrary":
+        """
+        Loads a library from the text returned by :meth:`dumps`.
+
+        :param version: The version the library must have, any version if :code:`None`.
+        :raises ValueError: If the text isn't a library, or one saved by another version
+            of the format, of regexfactory or of the library.
+        """
+        document = json.loads(text)
+        if not isinstance(document, dict) or "format" not in document:
+            raise ValueError("Not a pattern library.")
+        saved = (document["format"], document["regexfactory"])
+        if saved != (FORMAT_VERSION, _regexfactory_version()):
+            raise ValueError(
+                f"The library was saved in format {saved[0]} by regexfactory {saved[1]}."
+            )
+        if version is not None and document["version"] != version:
+            raise ValueError(
+                f"The library has version {document['version']!r}, not {version!r}."
+            )
+        library = cls(version=document["version"])
+        library._decoder = _Decoder(document["nodes"])
+        for name, values in document["patterns"].items():
+            record = _Record(*values)
+            library._records[name] = record
+            library._flags[name] = record.flags
+        return library
+
+    def save(self, path: t.Union[str, "os.PathLike[str]"]) -> None:
+        """
+        Saves the library to a file, see :meth:`dumps`.
+        The file is written next to its destination then moved there,
+        so processes loading it concurrently never see it half written.
+        """
+        text = self.dumps()
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                file.write(text)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(
+        cls,
+        path: t.Union[str, "os.PathLike[str]"],
+        /,
+        *,
+        version: t.Optional[str] = None,
+    ) -> "PatternLibrary":
+        """Loads a library from a file written by :meth:`save`, see :meth:`loads`."""
+        with open(path, encoding="utf-8") as file:
+            return cls.loads(file.read(), version=version)
+
+    @classmethod
+    def cached(
+        cls,
+        path: t.Union[str, "os.PathLike[str]"],
+        build: t.Callable[[], "PatternLibrary"],
+        /,
+        *,
+        version: str,
+    ) -> "PatternLibrary":
+        """
+        Loads a library from a file, or builds it and saves it there
+        if the file is missing, unreadable or stale: saved by another version of
+        the format, of regexfactory, or of the library, which is checked against :code:`version`.
+
+        :param build: Builds the library, when the file can't be used.
+        :param version: The current version of the library.
+        """
+        try:
+            return cls.load(path, version=version)
+        except (OSError, ValueError, KeyError, TypeError):
+            library = build()
+            library.version = version
+            library.save(path)
+            return library
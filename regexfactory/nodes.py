@@ -0,0 +1,652 @@
+"""
+Pattern Nodes
+*************
+
+Module for the immutable node tree behind every :class:`RegexPattern`.
+
+Combinators only build nodes, and the regex string of a tree is rendered once, on first use,
+and memoized on each node.
+Nodes compare and hash structurally, so identical sub-trees can be shared freely.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, Multi, Or
+
+    patt = Or("Bob", Multi(DIGIT))
+
+    print(repr(patt.node))
+    print(patt.node.render())
+
+"""
+
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+from .charset import CharSet
+
+#: Precedence of an alternation, :code:`a|b`.
+ALTERNATION = 0
+#: Precedence of a concatenation, :code:`ab`.
+CONCATENATION = 1
+#: Precedence of a quantified node, :code:`a*`.
+QUANTIFIED = 2
+#: Precedence of a node that never needs grouping, like :code:`a`, :code:`[ab]` or :code:`(?:ab)`.
+ATOM = 3
+
+#: The shortest and longest text a node can match, :code:`None` meaning unbounded or unknown.
+Width = Tuple[int, Optional[int]]
+
+
+def _add(first: Optional[int], second: Optional[int]) -> Optional[int]:
+    return None if first is None or second is None else first + second
+
+
+def _widest(widths: Iterable[Width]) -> Width:
+    """Returns the width of a choice between nodes of the given widths."""
+    widths = list(widths) or [(0, 0)]
+    longest = [width[1] for width in widths]
+    return min(width[0] for width in widths), (
+        None if None in longest else max(cast(List[int], longest))
+    )
+
+
+def wrap(node: "Node", precedence: int) -> str:
+    """Renders a node, wrapping it in a non-capturing group if it binds looser than :code:`precedence`."""
+    if node.precedence < precedence:
+        return f"(?:{node.render()})"
+    return node.render()
+
+
+def _same(old: Any, new: Any) -> bool:
+    if isinstance(old, tuple) and isinstance(new, tuple):
+        return len(old) == len(new) and all(map(_same, old, new))
+    return old is new
+
+
+class Node:
+    """
+    Base class for pattern tree nodes.
+    Subclasses list the constructor arguments that define them in :attr:`_fields`,
+    which are used for equality, hashing, :func:`repr` and pickling.
+    """
+
+    __slots__ = ("_regex", "_hash", "_width")
+
+    _fields: Tuple[str, ...] = ()
+
+    _regex: Optional[str]
+    _hash: Optional[int]
+    _width: Optional[Width]
+
+    def __init__(self) -> None:
+        self._regex = None
+        self._hash = None
+        self._width = None
+
+    @property
+    def precedence(self) -> int:
+        """How tightly the rendered node binds, one of :data:`ALTERNATION`, :data:`CONCATENATION`, :data:`QUANTIFIED` or :data:`ATOM`."""
+        return ATOM
+
+    def children(self) -> Tuple["Node", ...]:
+        """The nodes directly contained in this node."""
+        return ()
+
+    def replace(self, **changes: Any) -> "Node":
+        """Returns a copy of the node with some of its :attr:`_fields` changed, or the node itself if none did."""
+        if all(_same(getattr(self, field), value) for field, value in changes.items()):
+            return self
+        values = dict(zip(self._fields, self._values()), **changes)
+        return type(self)(*(values[field] for field in self._fields))
+
+    def map_children(self, function: Callable[["Node"], "Node"]) -> "Node":
+        """Returns a copy of the node with :code:`function` applied to each of its children."""
+        changes: Dict[str, Any] = {}
+        for field, value in zip(self._fields, self._values()):
+            if isinstance(value, Node):
+                changes[field] = function(value)
+            elif isinstance(value, tuple) and value and isinstance(value[0], Node):
+                changes[field] = tuple(map(function, value))
+        return self.replace(**changes)
+
+    def render(self) -> str:
+        """Renders the node to a regex string, only the first time it is called."""
+        if self._regex is None:
+            self._regex = self._render()
+        return self._regex
+
+    def _render(self) -> str:
+        raise NotImplementedError
+
+    def width(self) -> Width:
+        """
+        Returns the length of the shortest and of the longest text the node can match,
+        only computing it the first time it is called.
+        The longest is :code:`None` when unbounded, or unknown, as for :class:`Raw` and :class:`Backreference` nodes.
+        """
+        if self._width is None:
+            self._width = self._measure()
+        return self._width
+
+    def _measure(self) -> Width:
+        return 0, None
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if type(self) is not type(other):  # pylint: disable=unidiomatic-typecheck
+            return NotImplemented
+        return hash(self) == hash(other) and self._values() == other._values()
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((type(self).__name__, self._values()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        arguments = ", ".join(map(repr, self._values()))
+        return f"{type(self).__name__}({arguments})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), self._values())
+
+
+class Raw(Node):
+    """A regex string given by the user, spliced verbatim into its parents."""
+
+    __slots__ = ("text",)
+    _fields = ("text",)
+
+    text: str
+
+    def __init__(self, text: str) -> None:
+        super().__init__()
+        self.text = text
+
+    def _render(self) -> str:
+        return self.text
+
+    def _measure(self) -> Width:
+        # Empty raw strings are left by inline flags, like (?i).
+        return (0, 0) if not self.text else (0, None)
+
+
+class Literal(Node):
+    """Matches a piece of text literally."""
+
+    __slots__ = ("text",)
+    _fields = ("text",)
+
+    text: str
+
+    def __init__(self, text: str) -> None:
+        super().__init__()
+        self.text = text
+
+    @property
+    def precedence(self) -> int:
+        return ATOM if len(self.text) == 1 else CONCATENATION
+
+    def _render(self) -> str:
+        return re.escape(self.text)
+
+    def _measure(self) -> Width:
+        return len(self.text), len(self.text)
+
+
+class CharClass(Node):
+    """Matches a single character of a :class:`~regexfactory.charset.CharSet`."""
+
+    __slots__ = ("charset",)
+    _fields = ("charset",)
+
+    charset: CharSet
+
+    def __init__(self, charset: CharSet) -> None:
+        super().__init__()
+        self.charset = charset
+
+    def _render(self) -> str:
+        return self.charset.render()
+
+    def _measure(self) -> Width:
+        return 1, 1
+
+
+class AnyChar(Node):
+    """Matches any character except a newline, :code:`.`"""
+
+    __slots__ = ()
+
+    def _render(self) -> str:
+        return "."
+
+    def _measure(self) -> Width:
+        return 1, 1
+
+
+class Anchor(Node):
+    """A zero-width assertion written with a single token, like :code:`^`, :code:`$` or :code:`\\b`."""
+
+    __slots__ = ("symbol",)
+    _fields = ("symbol",)
+
+    symbol: str
+
+    def __init__(self, symbol: str) -> None:
+        super().__init__()
+        self.symbol = symbol
+
+    @property
+    def precedence(self) -> int:
+        # Assertions can't be quantified without a group.
+        return CONCATENATION
+
+    def _render(self) -> str:
+        return self.symbol
+
+    def _measure(self) -> Width:
+        return 0, 0
+
+
+# The base and modulus of the rolling hash of concatenations.
+_BASE = 1_000_003
+_MODULUS = (1 << 61) - 1
+
+
+class Concat(Node):
+    """
+    Matches its items one after the other.
+    Items are kept as given, nested :class:`Concat` nodes are only flattened while rendering,
+    so repeatedly adding to a pattern does not copy what was built so far.
+    They are flattened when compared, hashed and pickled too, so long chains don't recurse deeply,
+    and a chain equals the flat concatenation of its items.
+    """
+
+    __slots__ = ("items", "_rolling")
+    _fields = ("items",)
+
+    items: Tuple[Node, ...]
+    _rolling: Optional[Tuple[int, int]]
+
+    def __init__(self, items: Tuple[Node, ...]) -> None:
+        super().__init__()
+        self.items = items
+        self._rolling = None
+
+    @property
+    def precedence(self) -> int:
+        return CONCATENATION
+
+    def children(self) -> Tuple[Node, ...]:
+        return self.items
+
+    def map_children(self, function: Callable[[Node], Node]) -> Node:
+        # Nested concatenations are flattened, so long chains don't recurse deeply.
+        return self.replace(items=tuple(map(function, self.flatten())))
+
+    def _values(self) -> Tuple[Any, ...]:
+        return (tuple(self.flatten()),)
+
+    def _rolling_hash(self) -> Tuple[int, int]:
+        """
+        Returns a rolling hash of the flattened items and how many there are,
+        built from those of nested concatenations, without recursion.
+        """
+        # pylint: disable=protected-access
+        pending = [] if self._rolling is not None else [self]
+        while pending:
+            node = pending[-1]
+            missing = [
+                item
+                for item in node.items
+                if isinstance(item, Concat) and item._rolling is None
+            ]
+            if missing:
+                pending.extend(missing)
+                continue
+            pending.pop()
+            value, length = 0, 0
+            for item in node.items:
+                if isinstance(item, Concat):
+                    item_value, item_length = cast(Tuple[int, int], item._rolling)
+                else:
+                    item_value, item_length = hash(item) % _MODULUS, 1
+                shift = pow(_BASE, item_length, _MODULUS)
+                value = (value * shift + item_value) % _MODULUS
+                length += item_length
+            node._rolling = (value, length)
+        return cast(Tuple[int, int], self._rolling)
+
+    def __hash__(self) -> int:
+        # Adding to a pattern only hashes what was added, like rendering it doesn't copy the rest.
+        if self._hash is None:
+            self._hash = hash((type(self).__name__, self._rolling_hash()))
+        return self._hash
+
+    def flatten(self) -> Iterator[Node]:
+        """Iterates over the items of this node and of nested :class:`Concat` nodes, in order."""
+        stack: List[Iterator[Node]] = [iter(self.items)]
+        while stack:
+            for item in stack[-1]:
+                if isinstance(item, Concat):
+                    stack.append(iter(item.items))
+                    break
+                yield item
+            else:
+                stack.pop()
+
+    def _render(self) -> str:
+        parts: List[str] = []
+        previous: Optional[Node] = None
+        for item in self.flatten():
+            rendered = wrap(item, CONCATENATION)
+            if not rendered:
+                continue
+            if (
+                isinstance(previous, Backreference)
+                and isinstance(previous.group, int)
+                and rendered[:1].isdigit()
+            ):
+                # \1 followed by 0 would read as \10.
+                parts[-1] = f"(?:{parts[-1]})"
+            parts.append(rendered)
+            previous = item
+        return "".join(parts)
+
+    def _measure(self) -> Width:
+        shortest, longest = 0, cast(Optional[int], 0)
+        for item in self.flatten():
+            item_shortest, item_longest = item.width()
+            shortest += item_shortest
+            longest = _add(longest, item_longest)
+        return shortest, longest
+
+
+class Alternation(Node):
+    """Matches the first of its items that lets the whole pattern match."""
+
+    __slots__ = ("items",)
+    _fields = ("items",)
+
+    items: Tuple[Node, ...]
+
+    def __init__(self, items: Tuple[Node, ...]) -> None:
+        super().__init__()
+        self.items = items
+
+    @property
+    def precedence(self) -> int:
+        if len(self.items) == 1:
+            return self.items[0].precedence
+        return ALTERNATION if self.items else CONCATENATION
+
+    def children(self) -> Tuple[Node, ...]:
+        return self.items
+
+    def _render(self) -> str:
+        return "|".join(item.render() for item in self.items)
+
+    def _measure(self) -> Width:
+        return _widest(item.width() for item in self.items)
+
+
+class Repeat(Node):
+    """
+    Matches its child between :attr:`min` and :attr:`max` times, :code:`None` meaning unbounded.
+    Passing :code:`braces=True` always renders the amount in braces, like :code:`{1,}` instead of :code:`+`.
+    """
+
+    __slots__ = ("child", "min", "max", "greedy", "braces")
+    _fields = ("child", "min", "max", "greedy", "braces")
+
+    child: Node
+    min: int
+    max: Optional[int]
+    greedy: bool
+    braces: bool
+
+    def __init__(
+        self,
+        child: Node,
+        min: int,  # pylint: disable=redefined-builtin
+        max: Optional[int] = None,  # pylint: disable=redefined-builtin
+        greedy: bool = True,
+        braces: bool = False,
+    ) -> None:
+        super().__init__()
+        self.child = child
+        self.min = min
+        self.max = max
+        self.greedy = greedy
+        self.braces = braces
+
+    @property
+    def precedence(self) -> int:
+        return QUANTIFIED
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self.child,)
+
+    def quantifier(self) -> str:
+        """Renders the quantifier of this node, like :code:`+` or :code:`{2,5}?`."""
+        amount = (self.min, self.max)
+        if not self.braces and amount == (0, None):
+            suffix = "*"
+        elif not self.braces and amount == (1, None):
+            suffix = "+"
+        elif not self.braces and amount == (0, 1):
+            suffix = "?"
+        elif self.max is None:
+            suffix = f"{{{self.min},}}"
+        elif self.min == self.max:
+            suffix = f"{{{self.min}}}"
+        else:
+            suffix = f"{{{self.min},{self.max}}}"
+        return suffix if self.greedy else suffix + "?"
+
+    def _render(self) -> str:
+        return wrap(self.child, ATOM) + self.quantifier()
+
+    def _measure(self) -> Width:
+        shortest, longest = self.child.width()
+        if self.max == 0 or longest == 0:
+            return shortest * self.min, 0
+        if self.max is None or longest is None:
+            return shortest * self.min, None
+        return shortest * self.min, longest * self.max
+
+
+class Group(Node):
+    """A capturing, named or non-capturing group around its child."""
+
+    __slots__ = ("child", "capturing", "name")
+    _fields = ("child", "capturing", "name")
+
+    child: Node
+    capturing: bool
+    name: Optional[str]
+
+    def __init__(
+        self, child: Node, capturing: bool = True, name: Optional[str] = None
+    ) -> None:
+        super().__init__()
+        self.child = child
+        self.capturing = capturing
+        self.name = name
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self.child,)
+
+    def _render(self) -> str:
+        if self.name is not None:
+            return f"(?P<{self.name}>{self.child.render()})"
+        if self.capturing:
+            return f"({self.child.render()})"
+        return f"(?:{self.child.render()})"
+
+    def _measure(self) -> Width:
+        return self.child.width()
+
+
+class Lookaround(Node):
+    """A lookahead or lookbehind assertion, positive or negative."""
+
+    __slots__ = ("child", "ahead", "negative")
+    _fields = ("child", "ahead", "negative")
+
+    child: Node
+    ahead: bool
+    negative: bool
+
+    def __init__(self, child: Node, ahead: bool = True, negative: bool = False) -> None:
+        super().__init__()
+        self.child = child
+        self.ahead = ahead
+        self.negative = negative
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self.child,)
+
+    def _render(self) -> str:
+        prefix = ("" if self.ahead else "<") + ("!" if self.negative else "=")
+        return f"(?{prefix}{self.child.render()})"
+
+    def _measure(self) -> Width:
+        return 0, 0
+
+
+class Backreference(Node):
+    """Matches the text last matched by a group, referenced by number or by name."""
+
+    __slots__ = ("group",)
+    _fields = ("group",)
+
+    group: Union[int, str]
+
+    def __init__(self, group: Union[int, str]) -> None:
+        super().__init__()
+        self.group = group
+
+    def _render(self) -> str:
+        if isinstance(self.group, int):
+            return f"\\{self.group}"
+        return f"(?P={self.group})"
+
+
+class Conditional(Node):
+    """Matches :attr:`yes` if the referenced group matched, else :attr:`no`."""
+
+    __slots__ = ("group", "yes", "no")
+    _fields = ("group", "yes", "no")
+
+    group: Union[int, str]
+    yes: Node
+    no: Optional[Node]
+
+    def __init__(
+        self, group: Union[int, str], yes: Node, no: Optional[Node] = None
+    ) -> None:
+        super().__init__()
+        self.group = group
+        self.yes = yes
+        self.no = no
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self.yes,) if self.no is None else (self.yes, self.no)
+
+    def _render(self) -> str:
+        branches = wrap(self.yes, CONCATENATION)
+        if self.no is not None:
+            branches += "|" + wrap(self.no, CONCATENATION)
+        return f"(?({self.group}){branches})"
+
+    def _measure(self) -> Width:
+        return _widest(
+            (self.yes.width(), (0, 0) if self.no is None else self.no.width())
+        )
+
+
+class Comment(Node):
+    """A comment ignored by the regex engine."""
+
+    __slots__ = ("text",)
+    _fields = ("text",)
+
+    text: str
+
+    def __init__(self, text: str) -> None:
+        super().__init__()
+        self.text = text
+
+    @property
+    def precedence(self) -> int:
+        return CONCATENATION
+
+    def _render(self) -> str:
+        return f"(?#{self.text})"
+
+    def _measure(self) -> Width:
+        return 0, 0
+
+
+class Extension(Node):
+    """Any other :code:`(?...)` construct, made of a prefix and a child."""
+
+    __slots__ = ("prefix", "child")
+    _fields = ("prefix", "child")
+
+    prefix: str
+    child: Node
+
+    def __init__(self, prefix: str, child: Node) -> None:
+        super().__init__()
+        self.prefix = prefix
+        self.child = child
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self.child,)
+
+    def _render(self) -> str:
+        return f"(?{self.prefix}{self.child.render()})"
+
+    def _measure(self) -> Width:
+        return self.child.width()
+
+
+#: The types of nodes without children.
+LEAF_TYPES: Tuple[Type[Node], ...] = (
+    Raw,
+    Literal,
+    CharClass,
+    AnyChar,
+    Anchor,
+    Backreference,
+    Comment,
+)
+
+#: Every type of node.
+NODE_TYPES: Tuple[Type[Node], ...] = LEAF_TYPES + (
+    Concat,
+    Alternation,
+    Repeat,
+    Group,
+    Lookaround,
+    Conditional,
+    Extension,
+)
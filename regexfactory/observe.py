@@ -0,0 +1,251 @@
+"""
+Observers
+*********
+
+Module for the :class:`Observer` class, which is told about the compiling and matching patterns do,
+and the :class:`Profiler` observer, which finds the patterns that take up the most time.
+
+Observers are set for every pattern with :func:`~regexfactory.pattern.set_observer`
+or :func:`~regexfactory.pattern.observing`,
+or for a single pattern through :attr:`RegexPattern.observer <regexfactory.pattern.RegexPattern.observer>`,
+which takes precedence.
+Until an observer is first set, the matching methods only pay for checking a flag.
+
+Reported calls are :meth:`~regexfactory.pattern.RegexPattern.match`,
+:meth:`~regexfactory.pattern.RegexPattern.fullmatch`, :meth:`~regexfactory.pattern.RegexPattern.search`,
+:meth:`~regexfactory.pattern.RegexPattern.test`, :meth:`~regexfactory.pattern.RegexPattern.findall`,
+:meth:`~regexfactory.pattern.RegexPattern.finditer`, :meth:`~regexfactory.pattern.RegexPattern.split`,
+:meth:`~regexfactory.pattern.RegexPattern.sub`, :meth:`~regexfactory.pattern.RegexPattern.subn`
+and every string given to the :code:`*_many` methods.
+A :meth:`~regexfactory.pattern.RegexPattern.finditer` call is reported once its iterator is exhausted or closed,
+with the time spent finding its matches.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, WORD, Multi, Profiler, observing
+
+    number, word = Multi(DIGIT), Multi(WORD)
+    with observing(Profiler()) as profiler:
+        for line in ["12 apples", "no numbers", "7 pears"] * 100:
+            number.search(line)
+            word.findall(line)
+    for stats in profiler.top(key="hits"):
+        print(stats.regex, stats.calls, stats.hits, stats.characters)
+
+"""
+
+import operator
+import re
+import threading
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .pattern import RegexPattern
+
+
+class Observer:
+    """
+    Receives the events of the patterns it observes.
+    Subclasses override the callbacks they need, the others do nothing.
+    Callbacks run in the thread that compiled or matched, and compile callbacks run under the compile lock,
+    so they should be quick and must not compile patterns themselves.
+    """
+
+    def on_compile_start(
+        self, pattern: "RegexPattern", flags: int, binary: bool, engine: str
+    ) -> None:
+        """Called before a pattern is compiled, see :meth:`RegexPattern.compile <regexfactory.pattern.RegexPattern.compile>`."""
+
+    def on_compile_end(
+        self, pattern: "RegexPattern", compiled: t.Any, elapsed: float
+    ) -> None:
+        """Called after a pattern was compiled, with the compiled pattern and the seconds it took."""
+
+    def on_match(
+        self,
+        pattern: "RegexPattern",
+        method: str,
+        length: int,
+        hit: bool,
+        elapsed: float,
+    ) -> None:
+        """
+        Called after a pattern matched against a text.
+
+        :param method: The name of the method that was called, like :code:`"search"`.
+        :param length: The length of the text.
+        :param hit: Whether anything matched, or for :code:`split`, :code:`sub` and :code:`subn`,
+            whether anything was split or replaced.
+        :param elapsed: The seconds the call took.
+        """
+
+
+def _found(result: t.Any) -> bool:
+    return result is not None
+
+
+#: Whether a reported call found anything, from its result, by name of the method.
+#: :code:`sub` is reported by calling :code:`subn`.
+HITS: t.Dict[str, t.Callable[[t.Any], bool]] = {
+    "match": _found,
+    "fullmatch": _found,
+    "search": _found,
+    "test": _found,
+    "findall": bool,
+    "split": lambda parts: len(parts) > 1,
+    "sub": lambda result: result[1] > 0,
+    "subn": lambda result: result[1] > 0,
+}
+
+
+def report_matches(
+    observer: Observer,
+    pattern: "RegexPattern",
+    matches: t.Iterator[re.Match],
+    length: int,
+) -> t.Iterator[re.Match]:
+    """Yields the matches of a :code:`finditer` call, reporting the call when they run out or are closed."""
+    elapsed = 0.0
+    hit = False
+    try:
+        while True:
+            start = time.perf_counter()
+            match = next(matches, None)
+            elapsed += time.perf_counter() - start
+            if match is None:
+                return
+            hit = True
+            yield match
+    finally:
+        observer.on_match(pattern, "finditer", length, hit, elapsed)
+
+
+class PatternStats(t.NamedTuple):
+    """What a :class:`Profiler` recorded of the patterns of a regex."""
+
+    regex: str
+    #: The matching calls, see :meth:`Observer.on_match`.
+    calls: int
+    #: The calls where something matched.
+    hits: int
+    #: The total length of the texts matched against.
+    characters: int
+    #: Seconds spent matching.
+    match_time: float
+    #: The times a pattern was compiled, cache hits aren't counted.
+    compiles: int
+    #: Seconds spent compiling.
+    compile_time: float
+
+    @property
+    def total_time(self) -> float:
+        """Seconds spent matching and compiling."""
+        return self.match_time + self.compile_time
+
+
+#: The keys :meth:`Profiler.top` sorts by, tuple methods like :code:`count` aren't stats.
+_SORT_KEYS = frozenset(PatternStats._fields) - {"regex"}  # pylint: disable=no-member
+_SORT_KEYS |= {"total_time"}
+
+
+class Profiler(Observer):
+    """
+    An observer that adds up the calls, hits, text length and time of each regex it sees.
+    Patterns rendering the same regex are counted together.
+    It keeps the patterns it saw alive until :meth:`reset`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # calls, hits, characters, match time, compiles and compile time, by id of the pattern.
+        self._totals: t.Dict[int, t.Tuple["RegexPattern", t.List[float]]] = {}
+
+    def _totals_of(self, pattern: "RegexPattern") -> t.List[float]:
+        entry = self._totals.get(id(pattern))
+        if entry is None:
+            entry = self._totals[id(pattern)] = (pattern, [0, 0, 0, 0.0, 0, 0.0])
+        return entry[1]
+
+    def on_compile_end(
+        self, pattern: "RegexPattern", compiled: t.Any, elapsed: float
+    ) -> None:
+        with self._lock:
+            totals = self._totals_of(pattern)
+            totals[4] += 1
+            totals[5] += elapsed
+
+    def on_match(
+        self,
+        pattern: "RegexPattern",
+        method: str,
+        length: int,
+        hit: bool,
+        elapsed: float,
+    ) -> None:
+        with self._lock:
+            totals = self._totals_of(pattern)
+            totals[0] += 1
+            totals[1] += hit
+            totals[2] += length
+            totals[3] += elapsed
+
+    def stats(self) -> t.List[PatternStats]:
+        """Returns what was recorded of each regex, those that took the most time first."""
+        with self._lock:
+            entries = list(self._totals.values())
+        merged: t.Dict[str, t.List[float]] = {}
+        for pattern, totals in entries:
+            regex = pattern.regex
+            sums = merged.setdefault(regex, [0, 0, 0, 0.0, 0, 0.0])
+            for index, value in enumerate(totals):
+                sums[index] += value
+        stats = [
+            PatternStats(
+                regex,
+                calls=int(calls),
+                hits=int(hits),
+                characters=int(characters),
+                match_time=match_time,
+                compiles=int(compiles),
+                compile_time=compile_time,
+            )
+            for regex, (
+                calls,
+                hits,
+                characters,
+                match_time,
+                compiles,
+                compile_time,
+            ) in merged.items()
+        ]
+        stats.sort(key=operator.attrgetter("total_time"), reverse=True)
+        return stats
+
+    def top(self, count: int = 10, *, key: str = "total_time") -> t.List[PatternStats]:
+        """
+        Returns the :code:`count` regexes with the largest value of :code:`key`,
+        any field of :class:`PatternStats` but :code:`regex`.
+        """
+        if key not in _SORT_KEYS:
+            raise ValueError(f"Can't sort patterns by {key!r}.")
+        stats = self.stats()
+        stats.sort(key=operator.attrgetter(key), reverse=True)
+        return stats[:count]
+
+    def report(self, count: int = 10) -> str:
+        """Returns a table of the :code:`count` regexes that took the most time."""
+        lines = [
+            f"{'total s':>10} {'match s':>10} {'calls':>8} {'hits':>8} {'chars':>10} {'compiles':>8}  regex"
+        ]
+        for stats in self.top(count):
+            lines.append(
+                f"{stats.total_time:10.6f} {stats.match_time:10.6f} {stats.calls:8} {stats.hits:8}"
+                f" {stats.characters:10} {stats.compiles:8}  {stats.regex}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Forgets everything recorded so far."""
+        with self._lock:
+            self._totals.clear()
@@ -0,0 +1,399 @@
+"""
+Optimization Passes
+*******************
+
+Module for the passes that rewrite a pattern's node tree into a smaller equivalent one
+before it is rendered, see :meth:`RegexPattern.render`.
+
+Combinators group their operands defensively, so :code:`Multi(DIGIT)` is built as
+:code:`(?:\\d)+`, and every extra group is an extra node in the compiled program.
+:func:`eliminate_groups` drops every non-capturing group that precedence makes unnecessary.
+
+Quantifiers are taken literally too, so :code:`Amount(Amount("x", 2), 3)` is built as :code:`(?:x{2}){3}`.
+:func:`simplify_quantifiers` rewrites them to their canonical forms,
+merging nested and adjacent repetitions of the same thing, which also removes the ways
+nested quantifiers like :code:`(?:x+)+` have of backtracking over the same text.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, Amount, Multi, Or
+
+    patt = Multi(Or("Bob", DIGIT + "x"))
+
+    print(patt.render(optimize=False))
+    print(patt.render())
+
+    number = DIGIT + DIGIT + Amount(DIGIT, 2) + Multi(Multi("x"))
+
+    print(number.render(optimize=False))
+    print(number.render())
+
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple, cast
+
+from . import nodes
+from .nodes import ALTERNATION, ATOM, CONCATENATION, QUANTIFIED
+
+#: A pass takes a node tree and returns an equivalent one.
+Pass = Callable[[nodes.Node], nodes.Node]
+
+# Characters with a special meaning outside of character classes.
+_SPECIALS = "()[]{}?*+|^$\\#"
+# Escapes whose meaning depends on the characters that follow them.
+_OPEN_ESCAPES = "0123456789xuUNg"
+# Escapes that match an empty string and can't be quantified.
+_ASSERTION_ESCAPES = "AbBZ"
+
+
+def _class_end(text: str, index: int) -> Optional[int]:
+    """Returns the index after the character class opening at :code:`index`, if it is a simple one."""
+    index += 1
+    if text[index : index + 1] == "^":
+        index += 1
+    if text[index : index + 1] == "]":
+        index += 1
+    while index < len(text):
+        if text[index] == "\\":
+            index += 2
+        elif text[index] == "]":
+            return index + 1
+        elif text[index] == "[":
+            return None
+        else:
+            index += 1
+    return None
+
+
+def raw_precedence(text: str) -> int:
+    """
+    Returns how tightly a regex string given by the user actually binds.
+    Sequences of plain characters, escapes and character classes are recognized,
+    anything else is assumed to be an alternation.
+    """
+    precedence = ATOM
+    tokens = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            escaped = text[index + 1 : index + 2]
+            if not escaped or escaped in _OPEN_ESCAPES:
+                return ALTERNATION
+            if escaped in _ASSERTION_ESCAPES:
+                precedence = CONCATENATION
+            index += 2
+        elif char == "[":
+            end = _class_end(text, index)
+            if end is None:
+                return ALTERNATION
+            index = end
+        elif char in _SPECIALS or char.isspace():
+            return ALTERNATION
+        else:
+            index += 1
+        tokens += 1
+    return precedence if tokens == 1 else CONCATENATION
+
+
+class _GroupElimination:
+    """State of one run of :func:`eliminate_groups`, memoizing results for shared sub-trees."""
+
+    def __init__(self) -> None:
+        # Nodes are kept alongside the results, so their ids can't be reused during the run.
+        self._effective: Dict[int, Tuple[nodes.Node, int]] = {}
+        self._visited: Dict[Tuple[int, int], Tuple[nodes.Node, nodes.Node]] = {}
+
+    def effective(self, node: nodes.Node) -> int:
+        """
+        Returns the precedence of the regex a node actually renders to.
+        It can be lower than :attr:`~regexfactory.nodes.Node.precedence`
+        when :class:`~regexfactory.nodes.Raw` text is spliced in without grouping.
+        """
+        cached = self._effective.get(id(node))
+        if cached is not None:
+            return cached[1]
+        if isinstance(node, nodes.Raw):
+            value = raw_precedence(node.text)
+        elif isinstance(node, nodes.Concat):
+            value = CONCATENATION
+            if any(
+                self.effective(item) < CONCATENATION <= item.precedence
+                for item in node.flatten()
+            ):
+                value = ALTERNATION
+        elif isinstance(node, nodes.Alternation) and len(node.items) == 1:
+            value = self.effective(node.items[0])
+        elif isinstance(node, nodes.Repeat) and node.child.precedence >= ATOM:
+            value = min(QUANTIFIED, self.effective(node.child))
+        else:
+            value = node.precedence
+        self._effective[id(node)] = (node, value)
+        return value
+
+    def visit(self, node: nodes.Node, context: int) -> nodes.Node:
+        """Simplifies a node rendered where anything binding looser than :code:`context` needs a group."""
+        key = (id(node), context)
+        cached = self._visited.get(key)
+        if cached is not None:
+            return cached[1]
+        result = self._simplify(node, context)
+        self._visited[key] = (node, result)
+        return result
+
+    def _simplify(  # pylint: disable=too-many-return-statements
+        self, node: nodes.Node, context: int
+    ) -> nodes.Node:
+        if isinstance(node, nodes.Group):
+            if node.capturing or node.name is not None:
+                return node.replace(child=self.visit(node.child, ALTERNATION))
+            child = self.visit(node.child, context)
+            effective = self.effective(child)
+            # Parents group honest children themselves when needed.
+            if effective >= context or effective >= child.precedence:
+                return child
+            return node.replace(child=child)
+        if isinstance(node, nodes.Concat):
+            items: List[nodes.Node] = [
+                self.visit(item, CONCATENATION) for item in node.flatten()
+            ]
+            if len(items) == len(node.items) and all(
+                new is old for new, old in zip(items, node.items)
+            ):
+                return node
+            return nodes.Concat(tuple(items))
+        if isinstance(node, nodes.Alternation):
+            context = context if len(node.items) == 1 else ALTERNATION
+            return node.replace(
+                items=tuple(self.visit(item, context) for item in node.items)
+            )
+        if isinstance(node, nodes.Repeat):
+            return node.replace(child=self.visit(node.child, ATOM))
+        if isinstance(node, (nodes.Lookaround, nodes.Extension)):
+            return node.replace(child=self.visit(node.child, ALTERNATION))
+        if isinstance(node, nodes.Conditional):
+            return node.replace(
+                yes=self.visit(node.yes, CONCATENATION),
+                no=None if node.no is None else self.visit(node.no, CONCATENATION),
+            )
+        return node
+
+
+def eliminate_groups(node: nodes.Node) -> nodes.Node:
+    """
+    Removes non-capturing groups around nodes that bind tightly enough where they are used,
+    like :code:`(?:a)|(?:bc)` becoming :code:`a|bc`.
+    Groups around :class:`~regexfactory.nodes.Raw` text are only removed when its precedence is recognized.
+    """
+    return _GroupElimination().visit(node, ALTERNATION)
+
+
+# Quantifiers whose nesting and sequences reduce to another of them, as (min, max) amounts.
+_OPEN_AMOUNTS = ((0, 1), (0, None), (1, None))
+
+
+def _atom(node: nodes.Node) -> nodes.Node:
+    """Returns the node inside any non-capturing groups around it."""
+    while isinstance(node, nodes.Group) and not node.capturing and node.name is None:
+        node = node.child
+    return node
+
+
+def _quantifiable(node: nodes.Repeat) -> bool:
+    """
+    Returns whether the quantifier applies to the whole child,
+    which it doesn't for regex strings made of several tokens, spliced in without a group.
+    """
+    child = node.child
+    return not isinstance(child, nodes.Raw) or raw_precedence(child.text) == ATOM
+
+
+def _closed(node: nodes.Node) -> bool:
+    """
+    Returns whether repeating the node a fixed number of times can be written as a single quantifier:
+    it always matches some text, and has no groups, references or constructs it could interact with.
+    """
+    if isinstance(node, nodes.Raw):
+        return raw_precedence(node.text) == ATOM
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(
+            item, (nodes.Raw, nodes.Backreference, nodes.Conditional, nodes.Extension)
+        ) or (isinstance(item, nodes.Group) and (item.capturing or item.name)):
+            return False
+        stack.extend(item.children())
+    return node.width()[0] > 0
+
+
+def _single(node: nodes.Node) -> bool:
+    """
+    Returns whether the node always matches exactly one character, and is :func:`_closed`.
+    Any amounts of it can be merged, their backtracking tries the same lengths in the same order.
+    """
+    if isinstance(node, nodes.Raw):
+        return raw_precedence(node.text) == ATOM
+    return node.width() == (1, 1) and _closed(node)
+
+
+# An atom repeated between a minimum and maximum number of times,
+# greedily or not, or either way for fixed amounts.
+_Count = Tuple[nodes.Node, int, Optional[int], Optional[bool]]
+
+
+def _count(node: nodes.Node) -> _Count:
+    if isinstance(node, nodes.Repeat) and _quantifiable(node) and node.max != 0:
+        greedy = None if node.min == node.max else node.greedy
+        return _atom(node.child), node.min, node.max, greedy
+    return _atom(node), 1, 1, None
+
+
+def _merge(first: _Count, second: _Count) -> Optional[_Count]:
+    """Returns the count matching the same as two consecutive ones, if there is one."""
+    atom, low, high, greedy = first
+    if (
+        type(atom) is not type(second[0]) or atom != second[0]
+    ):  # pylint: disable=unidiomatic-typecheck
+        return None
+    fixed = greedy is None and second[3] is None
+    if fixed and not _closed(atom):
+        return None
+    if not fixed and not (
+        _single(atom) and (None in (greedy, second[3]) or greedy == second[3])
+    ):
+        return None
+    total = None if high is None or second[2] is None else high + second[2]
+    return atom, low + second[1], total, greedy if greedy is not None else second[3]
+
+
+def _repeat(count: _Count) -> nodes.Node:
+    atom, low, high, greedy = count
+    if (low, high) == (1, 1):
+        return atom
+    return nodes.Repeat(atom, low, high, greedy=greedy is not False)
+
+
+def _fused(run: List[nodes.Node], count: Optional[_Count]) -> List[nodes.Node]:
+    """
+    Returns the items of a run, or the single repetition they merge into
+    if there are repetitions among them and it isn't longer.
+    """
+    if (
+        len(run) < 2
+        or count is None
+        or not any(isinstance(item, nodes.Repeat) for item in run)
+    ):
+        return run
+    fused = _repeat(count)
+    length = sum(len(_repeat(_count(item)).render()) for item in run)
+    if len(fused.render()) > length:
+        return run
+    return [fused]
+
+
+def _fuse_runs(items: List[nodes.Node]) -> List[nodes.Node]:
+    """Merges the runs of consecutive items that repeat the same atom, see :func:`_fused`."""
+    result: List[nodes.Node] = []
+    run: List[nodes.Node] = []
+    count: Optional[_Count] = None
+    for item in items:
+        current = _count(item)
+        merged = None if count is None else _merge(count, current)
+        if merged is not None:
+            run.append(item)
+            count = merged
+            continue
+        result.extend(_fused(run, count))
+        run, count = [item], current
+    result.extend(_fused(run, count))
+    return result
+
+
+class _QuantifierSimplification:
+    """State of one run of :func:`simplify_quantifiers`, memoizing results for shared sub-trees."""
+
+    def __init__(self) -> None:
+        # Nodes are kept alongside the results, so their ids can't be reused during the run.
+        self._visited: Dict[int, Tuple[nodes.Node, nodes.Node]] = {}
+
+    def visit(self, node: nodes.Node) -> nodes.Node:
+        """Simplifies the quantifiers of a tree, bottom up."""
+        if isinstance(node, nodes.LEAF_TYPES):
+            return node
+        cached = self._visited.get(id(node))
+        if cached is not None:
+            return cached[1]
+        if isinstance(node, nodes.Concat):
+            result = self._concat(node)
+        elif isinstance(node, nodes.Repeat):
+            result = self._repeat(
+                cast(nodes.Repeat, node.replace(child=self.visit(node.child)))
+            )
+        elif any(self.visit(child) is not child for child in node.children()):
+            # Visits the children again, but their results are memoized.
+            result = node.map_children(self.visit)
+        else:
+            result = node
+        self._visited[id(node)] = (node, result)
+        return result
+
+    @staticmethod
+    def _repeat(node: nodes.Repeat) -> nodes.Node:
+        if not _quantifiable(node):
+            return node
+        if (node.min, node.max) == (1, 1):
+            # Parents only group children by their declared precedence, the group is removed later if it can be.
+            return nodes.Group(node.child, capturing=False)
+        inner = _atom(node.child)
+        if isinstance(inner, nodes.Repeat) and _quantifiable(inner):
+            atom = _atom(inner.child)
+            if node.min == node.max and inner.min == inner.max and _closed(atom):
+                amount = node.min * inner.min
+                return nodes.Repeat(atom, amount, amount)
+            if (
+                (node.min, node.max) in _OPEN_AMOUNTS
+                and (inner.min, inner.max) in _OPEN_AMOUNTS
+                and node.greedy == inner.greedy
+                and _single(atom)
+            ):
+                highest = 1 if node.max == inner.max == 1 else None
+                return nodes.Repeat(
+                    atom, node.min * inner.min, highest, greedy=node.greedy
+                )
+        if node.braces and (node.min, node.max) in _OPEN_AMOUNTS:
+            return nodes.Repeat(node.child, node.min, node.max, greedy=node.greedy)
+        return node
+
+    def _concat(self, node: nodes.Concat) -> nodes.Node:
+        original = list(node.flatten())
+        items = [self.visit(item) for item in original]
+        if any(isinstance(item, nodes.Repeat) for item in items):
+            items = _fuse_runs(items)
+        if len(items) == len(original) and all(
+            new is old for new, old in zip(items, original)
+        ):
+            return node
+        return nodes.Concat(tuple(items))
+
+
+def simplify_quantifiers(node: nodes.Node) -> nodes.Node:
+    """
+    Rewrites quantifiers to their canonical forms, like :code:`x{1}` to :code:`x` and :code:`x{1,}` to :code:`x+`,
+    and merges nested and adjacent repetitions of the same node when that can't change what matches,
+    like :code:`(?:x{2}){3}` to :code:`x{6}`, :code:`(?:x+)*` to :code:`x*`, or :code:`\\d\\d{3}` to :code:`\\d{4}`.
+    Fixed amounts are merged for nodes that always match some text and hold no groups or references,
+    others only for nodes matching a single character, with the same greediness.
+    Adjacent items are only merged when some of them are repetitions, and when that isn't longer.
+    """
+    return _QuantifierSimplification().visit(node)
+
+
+#: The passes run by :func:`optimize_node`, in order.
+PASSES: List[Pass] = [simplify_quantifiers, eliminate_groups]
+
+
+def optimize_node(node: nodes.Node) -> nodes.Node:
+    """Runs every pass of :data:`PASSES` over a node tree."""
+    for optimization in PASSES:
+        node = optimization(node)
+    return node
@@ -0,0 +1,282 @@
+"""
+Parallel Scanning
+*****************
+
+Module for :meth:`RegexPattern.findall_parallel` and :meth:`RegexPattern.finditer_parallel`,
+which spread a scan over several processes, since :mod:`re` holds the GIL while matching.
+
+The input can be a list of documents, scanned one per task,
+or one large text or file, cut into windows of :code:`chunk_size` characters.
+Each window is sent with the text around it that the pattern can look at,
+see :func:`~regexfactory.stream.context`, so matches near its edges are found as in the whole text.
+When a match runs into the next window, the matches of that window are checked again
+from the end of the match, in the calling process, until they agree with the worker's.
+The pattern is sent to every worker once, when it starts.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, Amount
+
+    numbers = Amount(DIGIT, 1, 3)
+    print(numbers.findall_parallel(["a 1", "22 b 333"], workers=2))
+    print([match.span() for match in numbers.finditer_parallel("1 22 333", chunk_size=3)])
+
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import mmap
+import os
+import re
+import typing as t
+
+from .pattern import ContentType, RegexPattern
+from .stream import OffsetMatch, context
+
+# (text, offset of the text, position to start scanning at, last position a match may start at)
+_Task = t.Tuple[t.Any, int, int, int]
+
+# The pattern compiled in each worker process by _initialize.
+_COMPILED: t.Optional[re.Pattern] = None
+
+
+def _initialize(regex: t.Union[str, bytes], flags: int) -> None:
+    global _COMPILED  # pylint: disable=global-statement
+    _COMPILED = re.compile(regex, flags)
+
+
+def _scan(task: _Task) -> t.List[OffsetMatch]:
+    assert _COMPILED is not None
+    return list(_matches(_COMPILED, task))
+
+
+def _matches(compiled: re.Pattern, task: _Task) -> t.Iterator[OffsetMatch]:
+    text, offset, position, limit = task
+    for match in compiled.finditer(text, position):
+        if match.start() > limit:
+            break
+        yield OffsetMatch(match, offset)
+
+
+def _picklable(text: t.Any) -> t.Any:
+    # Views and memory maps can't be sent to other processes.
+    return bytes(text) if isinstance(text, (memoryview, mmap.mmap)) else text
+
+
+def _reader(source: t.Any) -> t.Callable[[int], t.Any]:
+    """Returns a function reading the next characters of a file or a text."""
+    if not _is_text(source):
+        return source.read
+    position = 0
+
+    def read(size: int) -> t.Any:
+        nonlocal position
+        chunk = _picklable(source[position : position + size])
+        position += len(chunk)
+        return chunk
+
+    return read
+
+
+def _windows(
+    read: t.Callable[[int], t.Any],
+    first: t.Any,
+    chunk_size: int,
+    behind: int,
+    ahead: int,
+) -> t.Iterator[_Task]:
+    """
+    Cuts a text into tasks for windows of :code:`chunk_size` characters,
+    with the characters before and after them that matches may need.
+    Only the text of the windows still to come is kept.
+    """
+    buffer = first
+    offset = 0
+    start = 0
+    done = False
+    while True:
+        while not done and offset + len(buffer) < start + chunk_size + ahead:
+            chunk = read(chunk_size)
+            done = not chunk
+            buffer += chunk
+        text_start = max(start - behind, offset)
+        end = start + chunk_size
+        if done and end >= offset + len(buffer):
+            text = buffer[text_start - offset :]
+            yield text, text_start, start - text_start, len(text)
+            return
+        text = buffer[text_start - offset : end + ahead - offset]
+        yield text, text_start, start - text_start, end - 1 - text_start
+        start = end
+        cut = start - behind - offset
+        if cut > 0:
+            buffer = buffer[cut:]
+            offset += cut
+
+
+def _run(
+    compiled: re.Pattern,
+    tasks: t.Iterator[_Task],
+    workers: t.Optional[int],
+) -> t.Iterator[t.Tuple[_Task, t.List[OffsetMatch]]]:
+    """Scans the tasks in worker processes, yielding their results in order."""
+    if workers == 1:
+        for task in tasks:
+            yield task, list(_matches(compiled, task))
+        return
+    workers = workers or os.cpu_count() or 1
+    pending: t.Deque[t.Tuple[_Task, "concurrent.futures.Future[t.List[OffsetMatch]]"]]
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=_initialize, initargs=(compiled.pattern, compiled.flags)
+    ) as executor:
+        try:
+            for task in tasks:
+                pending.append((task, executor.submit(_scan, task)))
+                # Only a few tasks per worker are queued, so large files aren't read all at once.
+                if len(pending) > 2 * workers:
+                    done, future = pending.popleft()
+                    yield done, future.result()
+            while pending:
+                done, future = pending.popleft()
+                yield done, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _merge(
+    compiled: re.Pattern, results: t.Iterator[t.Tuple[_Task, t.List[OffsetMatch]]]
+) -> t.Iterator[OffsetMatch]:
+    """
+    Chains the matches of consecutive windows.
+    Workers scan each window from its start, but when the last match of the previous window
+    runs into it, scanning really resumes where that match ends, so the window is scanned again
+    from there until a match agrees with the worker's, after which the rest does too.
+    """
+    end = 0
+    for task, matches in results:
+        text, offset, position, limit = task
+        if end > offset + position:
+            found = {match.span(): index for index, match in enumerate(matches)}
+            rescanned = []
+            for match in _matches(compiled, (text, offset, end - offset, limit)):
+                index = found.get(match.span())
+                if index is not None:
+                    rescanned.extend(matches[index:])
+                    break
+                rescanned.append(match)
+            matches = rescanned
+        for match in matches:
+            yield match
+            end = match.end()
+
+
+def _is_text(source: t.Any) -> bool:
+    return isinstance(source, (str, bytes, bytearray, memoryview, mmap.mmap))
+
+
+def _compile_for(pattern: RegexPattern, first: t.Any, flags: int) -> re.Pattern:
+    return pattern.compile(flags=flags, binary=not isinstance(first, (str, type(None))))
+
+
+def _text_matches(
+    pattern: RegexPattern,
+    source: t.Any,
+    *,
+    workers: t.Optional[int],
+    chunk_size: int,
+    max_width: t.Optional[int],
+    flags: int,
+) -> t.Iterator[OffsetMatch]:
+    behind, ahead = context(pattern, max_width=max_width, flags=flags)
+    read = _reader(source)
+    first = read(chunk_size)
+    compiled = _compile_for(pattern, first, flags)
+    tasks = _windows(read, first, chunk_size, behind, ahead)
+    return _merge(compiled, _run(compiled, tasks, workers))
+
+
+def _document_matches(
+    pattern: RegexPattern,
+    documents: t.Iterable[ContentType],
+    workers: t.Optional[int],
+    flags: int,
+) -> t.Iterator[t.List[OffsetMatch]]:
+    iterator = iter(documents)
+    first = next(iterator, None)
+    if first is not None:
+        iterator = itertools.chain((first,), iterator)
+    compiled = _compile_for(pattern, first, flags)
+    tasks = ((_picklable(document), 0, 0, len(document)) for document in iterator)
+    return (matches for _, matches in _run(compiled, tasks, workers))
+
+
+def finditer_parallel(
+    pattern: RegexPattern,
+    source: t.Any,
+    /,
+    *,
+    workers: t.Optional[int] = None,
+    chunk_size: int = 1 << 20,
+    max_width: t.Optional[int] = None,
+    flags: int = 0,
+) -> t.Iterator[t.Any]:
+    """Implements :meth:`RegexPattern.finditer_parallel`."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+    if _is_text(source) or hasattr(source, "read"):
+        return _text_matches(
+            pattern,
+            source,
+            chunk_size=chunk_size,
+            max_width=max_width,
+            workers=workers,
+            flags=flags,
+        )
+    return (
+        (index, match)
+        for index, matches in enumerate(
+            _document_matches(pattern, source, workers, flags)
+        )
+        for match in matches
+    )
+
+
+def _findall_item(match: OffsetMatch) -> t.Any:
+    """Returns what :meth:`re.Pattern.findall` gives for a match."""
+    empty = match.group()[:0]
+    groups = match.groups(empty)
+    if not groups:
+        return match.group()
+    return groups[0] if len(groups) == 1 else groups
+
+
+def findall_parallel(
+    pattern: RegexPattern,
+    source: t.Any,
+    /,
+    *,
+    workers: t.Optional[int] = None,
+    chunk_size: int = 1 << 20,
+    max_width: t.Optional[int] = None,
+    flags: int = 0,
+) -> t.List[t.Any]:
+    """Implements :meth:`RegexPattern.findall_parallel`."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+    if _is_text(source) or hasattr(source, "read"):
+        matches = _text_matches(
+            pattern,
+            source,
+            chunk_size=chunk_size,
+            max_width=max_width,
+            workers=workers,
+            flags=flags,
+        )
+        return list(map(_findall_item, matches))
+    return [
+        list(map(_findall_item, matches))
+        for matches in _document_matches(pattern, source, workers, flags)
+    ]
@@ -0,0 +1,356 @@
+"""
+Regex Parser
+************
+
+Module for :func:`parse`, which turns regex strings and :class:`re.Pattern` objects
+written by hand into the same combinators the rest of the library builds,
+so they can be analyzed, optimized and combined like any other :class:`RegexPattern`.
+
+.. exec_code::
+
+    from regexfactory import RegexPattern
+
+    patt = RegexPattern.parse(r"(?P<user>\\w+)@(?:example|exampel)\\.(?:com|org)")
+
+    print(repr(patt.node))
+    print(patt)
+
+"""
+
+import re
+import typing as t
+
+from . import nodes
+from .chars import (
+    ANCHOR_END,
+    ANCHOR_START,
+    ANY,
+    DIGIT,
+    NOTDIGIT,
+    NOTWHITESPACE,
+    NOTWORD,
+    WHITESPACE,
+    WORD,
+)
+from .charset import CharSet, _read_escape
+from .optimize import optimize_node
+from .pattern import PatternBuilder, RegexPattern, escape
+from .patterns import (
+    Amount,
+    Comment,
+    Extension,
+    Group,
+    IfAhead,
+    IfBehind,
+    IfGroup,
+    IfNotAhead,
+    IfNotBehind,
+    Multi,
+    NamedGroup,
+    NamedReference,
+    NotSet,
+    NumberedReference,
+    Optional,
+    Or,
+    Set,
+)
+
+_ESCAPES = {
+    "d": DIGIT,
+    "D": NOTDIGIT,
+    "w": WORD,
+    "W": NOTWORD,
+    "s": WHITESPACE,
+    "S": NOTWHITESPACE,
+}
+
+_ASSERTIONS = "AbBZ"
+
+_LOOKAROUNDS: t.Dict[str, t.Callable[[RegexPattern], RegexPattern]] = {
+    "=": IfAhead,
+    "!": IfNotAhead,
+    "<=": IfBehind,
+    "<!": IfNotBehind,
+}
+
+#: Inline flag letters of the flags that can be applied to a whole pattern.
+_FLAG_LETTERS = {re.ASCII: "a", re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s"}
+
+_QUANTIFIER = re.compile(r"\{(\d*)(?:(,)(\d*))?\}")
+_GROUP_NUMBER = re.compile(r"0[0-7]{0,2}|[1-7][0-7]{2}|\d\d?")
+_INLINE_FLAGS = re.compile(r"([aiLmsux]*)(?:-([imsx]+))?([:)])")
+
+_Piece = t.Union[str, RegexPattern]
+
+
+def _is_comment(piece: _Piece) -> bool:
+    return isinstance(piece, RegexPattern) and isinstance(piece.node, nodes.Comment)
+
+
+class _Parser:  # pylint: disable=too-few-public-methods
+    """
+    Recursive descent parser over a regex string already known to be valid.
+    Alternatives are combined with :class:`~regexfactory.patterns.Or`, or with :code:`exact`,
+    kept as they are written, without removing duplicates or factoring common prefixes.
+    """
+
+    def __init__(self, regex: str, verbose: bool, exact: bool = False) -> None:
+        self.regex = regex
+        self.index = 0
+        self.verbose = verbose
+        self.exact = exact
+
+    def _peek(self, length: int = 1) -> str:
+        return self.regex[self.index : self.index + length]
+
+    def _take(self, until: str) -> str:
+        end = self.regex.index(until, self.index)
+        text = self.regex[self.index : end]
+        self.index = end + len(until)
+        return text
+
+    def alternation(self) -> RegexPattern:
+        """Parses alternatives up to the end of the current group."""
+        branches = [self._sequence()]
+        while self._peek() == "|":
+            self.index += 1
+            branches.append(self._sequence())
+        if len(branches) == 1:
+            return branches[0]
+        if self.exact:
+            return RegexPattern(
+                nodes.Alternation(
+                    tuple(
+                        nodes.Group(branch.node, capturing=False) for branch in branches
+                    )
+                )
+            )
+        return Or(*branches)
+
+    def _sequence(self) -> RegexPattern:
+        pieces: t.List[_Piece] = []
+        while self.index < len(self.regex) and self._peek() not in "|)":
+            char = self._peek()
+            if self.verbose and (char.isspace() or char == "#"):
+                self._skip_verbose()
+                continue
+            bounds = self._quantifier()
+            if bounds is not None:
+                # Like re, quantifiers skip the comments between them and what they repeat.
+                target = len(pieces) - 1
+                while _is_comment(pieces[target]):
+                    target -= 1
+                pieces[target] = self._quantify(pieces[target], *bounds)
+            else:
+                pieces.append(self._atom())
+        patterns: t.List[RegexPattern] = []
+        literal = ""
+        for piece in pieces:
+            if isinstance(piece, str):
+                literal += piece
+                continue
+            if literal:
+                patterns.append(escape(literal))
+                literal = ""
+            patterns.append(piece)
+        if literal:
+            patterns.append(escape(literal))
+        if len(patterns) == 1:
+            return patterns[0]
+        return PatternBuilder(*patterns).build()
+
+    def _skip_verbose(self) -> None:
+        if self._peek() == "#":
+            end = self.regex.find("\n", self.index)
+            self.index = len(self.regex) if end == -1 else end + 1
+        else:
+            self.index += 1
+
+    def _quantifier(self) -> t.Optional[t.Tuple[int, t.Optional[int], bool]]:
+        """Reads a quantifier, returning its bounds and whether it was written with braces."""
+        char = self._peek()
+        if char in "*+?":
+            self.index += 1
+            return {"*": (0, None), "+": (1, None), "?": (0, 1)}[char] + (False,)
+        match = _QUANTIFIER.match(self.regex, self.index)
+        if char != "{" or match is None or match.group() == "{}":
+            return None
+        self.index = match.end()
+        low, comma, high = match.groups()
+        if comma is None:
+            return int(low), int(low), True
+        return int(low or 0), int(high) if high else None, True
+
+    def _quantify(
+        self, piece: _Piece, low: int, high: t.Optional[int], braces: bool
+    ) -> RegexPattern:
+        greedy = self._peek() != "?"
+        possessive = self._peek() == "+"
+        if not greedy or possessive:
+            self.index += 1
+        pattern = escape(piece) if isinstance(piece, str) else piece
+        if braces:
+            quantified: RegexPattern = Amount(
+                pattern, low, high, or_more=high is None, greedy=greedy
+            )
+        elif high is None:
+            quantified = Multi(pattern, match_zero=low == 0, greedy=greedy)
+        else:
+            quantified = Optional(pattern, greedy=greedy)
+        return Extension(">", quantified) if possessive else quantified
+
+    def _atom(self) -> _Piece:  # pylint: disable=too-many-return-statements
+        char = self._peek()
+        self.index += 1
+        if char == "(":
+            return self._group()
+        if char == "[":
+            return self._set()
+        if char == "\\":
+            return self._escape()
+        if char == ".":
+            return ANY
+        if char == "^":
+            return ANCHOR_START
+        if char == "$":
+            return ANCHOR_END
+        return char
+
+    def _set(self) -> RegexPattern:
+        negated = self._peek() == "^"
+        start = self.index + negated
+        index = start + (self.regex[start : start + 1] == "]")
+        while self.regex[index] != "]":
+            index += 2 if self.regex[index] == "\\" else 1
+        self.index = index + 1
+        member = RegexPattern(nodes.CharClass(CharSet.parse(self.regex[start:index])))
+        return NotSet(member) if negated else Set(member)
+
+    def _escape(self) -> _Piece:
+        char = self._peek()
+        if char in _ESCAPES:
+            self.index += 1
+            return _ESCAPES[char]
+        if char in _ASSERTIONS:
+            self.index += 1
+            return RegexPattern(nodes.Anchor("\\" + char), _precedence=2)
+        if char.isdigit():
+            match = _GROUP_NUMBER.match(self.regex, self.index)
+            assert match is not None
+            self.index = match.end()
+            if match.group()[0] == "0" or len(match.group()) == 3:
+                return chr(int(match.group(), 8))
+            return NumberedReference(int(match.group()))
+        code, self.index = _read_escape(self.regex, self.index - 1)
+        assert isinstance(code, int)
+        return chr(code)
+
+    def _group(self) -> RegexPattern:  # pylint: disable=too-many-return-statements
+        if self._peek() != "?":
+            return self._close(Group(self.alternation()))
+        self.index += 1
+        for prefix, lookaround in _LOOKAROUNDS.items():
+            if self.regex.startswith(prefix, self.index):
+                self.index += len(prefix)
+                return self._close(lookaround(self.alternation()))
+        if self._peek() == ":":
+            self.index += 1
+            return self._close(Group(self.alternation(), capturing=False))
+        if self._peek(2) == "P<":
+            self.index += 2
+            name = self._take(">")
+            return self._close(NamedGroup(name, self.alternation()))
+        if self._peek(2) == "P=":
+            self.index += 2
+            return NamedReference(self._take(")"))
+        if self._peek() == "#":
+            self.index += 1
+            return Comment(self._take(")"))
+        if self._peek() == "(":
+            self.index += 1
+            return self._conditional()
+        if self._peek() == ">":
+            self.index += 1
+            return self._close(Extension(">", self.alternation()))
+        return self._flags()
+
+    def _conditional(self) -> RegexPattern:
+        reference = self._take(")")
+        name_or_id: t.Union[str, int] = (
+            int(reference) if reference.isdigit() else reference
+        )
+        yes = self._sequence()
+        no = escape("")
+        if self._peek() == "|":
+            self.index += 1
+            no = self._sequence()
+        return self._close(IfGroup(name_or_id, yes, no))
+
+    def _flags(self) -> RegexPattern:
+        flags = _INLINE_FLAGS.match(self.regex, self.index)
+        assert flags is not None
+        self.index = flags.end()
+        enabled, disabled, end = flags.group(1), flags.group(2) or "", flags.group(3)
+        # Verbose syntax is resolved while parsing, the result never relies on it.
+        verbose = self.verbose
+        if "x" in enabled:
+            self.verbose = True
+        if "x" in disabled:
+            self.verbose = False
+        enabled, disabled = enabled.replace("x", ""), disabled.replace("x", "")
+        prefix = enabled + ("-" + disabled if disabled else "")
+        if end == ")":
+            return Extension(prefix, "") if prefix else escape("")
+        child = self.alternation()
+        self.verbose = verbose
+        if not prefix:
+            return self._close(Group(child, capturing=False))
+        return self._close(Extension(prefix + ":", child))
+
+    def _close(self, pattern: RegexPattern) -> RegexPattern:
+        self.index += 1
+        return pattern
+
+
+def _parse(regex: t.Union[str, re.Pattern], exact: bool = False) -> RegexPattern:
+    flags = 0
+    if isinstance(regex, re.Pattern):
+        flags = regex.flags
+        regex = regex.pattern
+    if not isinstance(regex, str):
+        raise TypeError(f"Can't parse {regex.__class__.__qualname__} object.")
+    re.compile(regex, flags)
+    pattern = _Parser(regex, bool(flags & re.VERBOSE), exact).alternation()
+    letters = "".join(letter for flag, letter in _FLAG_LETTERS.items() if flags & flag)
+    if letters:
+        return Extension(letters, "") + pattern
+    return pattern
+
+
+def parse(regex: t.Union[str, re.Pattern], /) -> RegexPattern:
+    """
+    Builds the combinators a regex string or :class:`re.Pattern` object is made of,
+    like :class:`~regexfactory.patterns.Or` for alternatives
+    and :class:`~regexfactory.patterns.Amount` for counted repetitions.
+    The flags of a :class:`re.Pattern` object are kept as inline flags.
+    Raises :class:`re.error` if the regex isn't valid,
+    and :class:`TypeError` for anything but text patterns.
+    """
+    return _parse(regex)
+
+
+def structured_node(pattern: RegexPattern) -> nodes.Node:
+    """
+    Returns the node tree of the regex a pattern compiles to, after the passes of :mod:`~regexfactory.optimize`,
+    parsing it first if it contains regex strings, as :class:`~regexfactory.nodes.Raw` nodes are opaque to the analyses.
+    Parsed alternatives are kept as written, as :class:`~regexfactory.patterns.Or` would merge
+    the duplicates of :code:`(a|a)*` that make it slow.
+    Raises :class:`re.error` if the pattern isn't valid.
+    """
+    stack = [pattern.node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, nodes.Raw):
+            return _parse(pattern.regex, exact=True).node
+        stack.extend(node.children())
+    return optimize_node(pattern.node)
@@ -3,50 +3,527 @@ Base Pattern Module
 *******************
 
 Module for the :class:`RegexPattern` class.
+Every :class:`RegexPattern` wraps an immutable tree of :mod:`~regexfactory.nodes`,
+its regex string is only rendered when it is first needed.
 """
 
-# pylint: disable=cyclic-import
+# pylint: disable=cyclic-import,too-many-lines
 
 
+import contextlib
+import functools
+import itertools
+import mmap
 import re
-from typing import Any, Iterator, List, Optional, Tuple, Union
+import threading
+import time
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+    overload,
+)
+
+from . import backtracking, nodes, observe
+from .cache import COMPILE_CACHE
+from .optimize import optimize_node
+
+if TYPE_CHECKING:
+    import concurrent.futures
+
+    from . import dfa, stream
 
 #:
-ValidPatternType = Union[re.Pattern, str, "RegexPattern"]
+ValidPatternType = Union[re.Pattern, str, bytes, "RegexPattern"]
+
+#: What the matching methods accept, binary content is matched with the pattern compiled for bytes.
+ContentType = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
+# The types matched with the pattern compiled for bytes.
+_BINARY_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
 
 #: Special characters that need to be escaped to be used without their special meanings.
 ESCAPED_CHARACTERS = "()[]{}?*+-|^$\\.&~#"
 
+#: The values of the :code:`output` argument of :meth:`RegexPattern.match_many` and its siblings.
+MANY_OUTPUTS = ("list", "mask", "iter")
+
+# The length from which texts are searched by jumping to the first characters of matches,
+# the regex engine is faster on shorter ones.
+_JUMP_LENGTH = 256
+
+# Searches trying more candidates than this, closer than _DENSE_GAP characters apart on average,
+# leave the rest of the text to the regex engine.
+_DENSE_TRIES = 8
+_DENSE_GAP = 256
+
+# The flags under which literals don't just match themselves, which turn off the prefilter.
+_UNFILTERED_FLAGS = re.IGNORECASE | re.VERBOSE | re.LOCALE
+
+# Guards insertions into the per-instance compiled pattern caches,
+# reentrant since the DFA engine compiles with re first.
+_COMPILE_LOCK = threading.RLock()
+
 
 def join(*patterns: ValidPatternType) -> "RegexPattern":
     """Umbrella function for combining :class:`ValidPatternType`'s into a :class:`RegexPattern`."""
-    joined = RegexPattern("")
-    for pattern in patterns:
-        joined += RegexPattern(pattern)
-    return joined
+    return PatternBuilder(*patterns).build()
 
 
-def escape(string: str) -> "RegexPattern":
+def escape(string: Union[str, bytes]) -> "RegexPattern":
     """Escapes special characters in a string to use them without their special meanings."""
-    return RegexPattern(re.escape(string))
+    if isinstance(string, bytes):
+        string = string.decode("latin-1")
+    return RegexPattern(nodes.Literal(string))
+
+
+def encode_regex(regex: str) -> bytes:
+    """
+    Converts a regex to the equivalent regex for bytes,
+    where every character stands for the byte of the same value.
+    :code:`\\u` and :code:`\\U` escapes become :code:`\\x` ones,
+    and ranges running past :code:`\\xff` are cut there, since there are no larger bytes.
+    Raises :class:`ValueError` if the regex needs any other character above :code:`\\xff`.
+    """
+    if regex.isascii() and "\\u" not in regex and "\\U" not in regex:
+        return regex.encode("ascii")
+    parts: List[str] = []
+    opened = -1
+    index = 0
+    while index < len(regex):
+        char = regex[index]
+        end = index + 1
+        if char == "\\":
+            end += {"u": 5, "U": 9}.get(regex[index + 1 : index + 2], 1)
+        elif char == "[" and opened < 0:
+            end += regex[end : end + 1] == "^"
+            end += regex[end : end + 1] == "]"
+            opened = len(parts)
+        elif char == "]" and opened >= 0:
+            opened = -1
+        token = regex[index:end]
+        if token[:2] in ("\\u", "\\U") and int(token[2:], 16) > 0xFF:
+            # The upper bound of a range, the range can stop at the largest byte.
+            if opened < 0 or len(parts) - opened < 3 or parts[-1] != "-":
+                raise ValueError(
+                    f"{regex!r} can't match bytes, {token} is above \\xff."
+                )
+            token = "\\xff"
+        elif token[:2] in ("\\u", "\\U"):
+            token = f"\\x{int(token[2:], 16):02x}"
+        elif len(token) == 1 and ord(token) > 0xFF:
+            raise ValueError(f"{regex!r} can't match bytes, {token!r} is above \\xff.")
+        parts.append(token)
+        index = end
+    return "".join(parts).encode("latin-1")
+
+
+# The interned patterns by structure, None when interning is off. See set_interning.
+_INTERNED: Optional["weakref.WeakValueDictionary[Tuple[Any, ...], RegexPattern]"] = None
+
+_INTERN_LOCK = threading.Lock()
+
+# The names of the slots that subclasses of RegexPattern add, by class.
+_EXTRA_SLOTS: Dict[type, Tuple[str, ...]] = {}
 
 
-class RegexPattern:
+def set_interning(enabled: bool) -> bool:
+    """
+    Turns interning on or off, and returns the previous setting.
+    While it is on, building a pattern structurally identical to one that is still alive,
+    same class, tree, precedence and attributes, returns that pattern instead of a new one,
+    so repeated sub-patterns share their memory and their compiled regexes.
+    Interned patterns can't be changed through :attr:`RegexPattern.regex`.
+    Interning applies to every thread.
+    """
+    global _INTERNED  # pylint: disable=global-statement
+    previous = _INTERNED is not None
+    if enabled != previous:
+        _INTERNED = weakref.WeakValueDictionary() if enabled else None
+    return previous
+
+
+@contextlib.contextmanager
+def interning() -> Iterator[None]:
+    """
+    Turns interning on inside a :code:`with` block, see :func:`set_interning`.
+
+    .. exec_code::
+
+        from regexfactory import DIGIT, Group, interning
+
+        with interning():
+            print(Group(DIGIT, capturing=False) is Group(DIGIT, capturing=False))
+        print(Group(DIGIT, capturing=False) is Group(DIGIT, capturing=False))
+
+    """
+    previous = set_interning(True)
+    try:
+        yield
+    finally:
+        set_interning(previous)
+
+
+# The observer of every pattern without one of its own. See set_observer.
+_OBSERVER: Optional["observe.Observer"] = None
+
+# Whether a pattern was ever given an observer of its own.
+_PATTERN_OBSERVED = False
+
+# Whether any observer may be set, the only check of the matching methods when none ever was.
+_OBSERVING = False
+
+
+def set_observer(
+    observer: Optional["observe.Observer"],
+) -> Optional["observe.Observer"]:
+    """
+    Sets the observer of every pattern without one of its own, see :mod:`~regexfactory.observe`,
+    and returns the previous one. :code:`None` stops observing.
+    """
+    global _OBSERVER, _OBSERVING  # pylint: disable=global-statement
+    previous = _OBSERVER
+    _OBSERVER = observer
+    _OBSERVING = observer is not None or _PATTERN_OBSERVED
+    return previous
+
+
+@contextlib.contextmanager
+def observing(observer: "observe.Observer") -> Iterator["observe.Observer"]:
+    """
+    Sets the observer of every pattern inside a :code:`with` block, see :func:`set_observer`.
+
+    .. exec_code::
+
+        from regexfactory import DIGIT, Multi, Observer, observing
+
+        class Printer(Observer):
+            def on_match(self, pattern, method, length, hit, elapsed):
+                print(pattern, method, length, hit)
+
+        with observing(Printer()):
+            Multi(DIGIT).search("route 66")
+            Multi(DIGIT).test("no digits")
+
+    """
+    previous = set_observer(observer)
+    try:
+        yield observer
+    finally:
+        set_observer(previous)
+
+
+def _shortest(node: nodes.Node) -> int:
+    """
+    Returns the length of the shortest match of a tree, or 0 if it has regex strings,
+    which are spliced in verbatim and can change how the rest of the regex reads.
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, nodes.Raw):
+            return 0
+        stack.extend(item.children())
+    return node.width()[0]
+
+
+def _literals_by_type(pattern: "RegexPattern") -> Dict[type, Tuple[Any, ...]]:
+    """Returns the required literals of a pattern, for each type of text the prefilter checks."""
+    from .prefilter import (  # pylint: disable=import-outside-toplevel
+        required_literals,
+    )
+
+    literals = required_literals(pattern)
+    if not literals:
+        return {}
+    by_type: Dict[type, Tuple[Any, ...]] = {str: literals}
+    try:
+        encoded = tuple(literal.encode("latin-1") for literal in literals)
+    except UnicodeEncodeError:
+        return by_type
+    by_type[bytes] = by_type[bytearray] = encoded
+    return by_type
+
+
+def _starts(
+    pattern: "RegexPattern",
+) -> Tuple[Dict[type, Tuple[Any, ...]], Optional[str]]:
+    """
+    Returns the first characters of the matches of a pattern, for each type of text searches jump through,
+    as characters for strings and code points for bytes, and the anchor its matches start with.
+    """
+    from .prefilter import (  # pylint: disable=import-outside-toplevel
+        first_chars,
+        leading_anchor,
+    )
+
+    anchor = leading_anchor(pattern)
+    chars = first_chars(pattern)
+    if chars is None:
+        return {}, anchor
+    codes = tuple(ord(char) for char in chars if ord(char) < 0x100)
+    return {str: tuple(chars), bytes: codes, bytearray: codes}, anchor
+
+
+def _prefiltered(
+    search: Callable[[Any], Optional[re.Match]], literals: Tuple[Any, ...]
+) -> Callable[[Any], Optional[re.Match]]:
+    """Wraps the search method of a compiled pattern, to only search texts holding all the literals."""
+
+    def prefiltered(content: Any) -> Optional[re.Match]:
+        for literal in literals:
+            if literal not in content:
+                return None
+        return search(content)
+
+    return prefiltered
+
+
+def _sparse(content: Any, needles: Tuple[Any, ...]) -> bool:
+    """Returns whether the needles are far enough apart at the start of the text to be worth jumping to."""
+    sample = min(len(content), _DENSE_TRIES * _DENSE_GAP)
+    return sum(content.count(needle, 0, sample) for needle in needles) < _DENSE_TRIES
+
+
+def _jump(
+    compiled: re.Pattern,
+    content: Any,
+    needles: Tuple[Any, ...],
+    pos: int = 0,
+    endpos: Optional[int] = None,
+) -> Iterator[re.Match]:
+    """
+    Finds the matches of a pattern that can't match the empty string
+    by only trying to match where one of the needles is,
+    the first characters of the pattern, or their code points for bytes.
+    Leaves the rest of the text to :meth:`re.Pattern.finditer` once candidates turn out to be close together.
+    """
+    end = len(content) if endpos is None else max(min(endpos, len(content)), 0)
+    start = max(pos, 0)
+    # The next position of each needle, -1 once there are none left.
+    found = [content.find(needle, start, end) for needle in needles]
+    tries = 0
+    while True:
+        candidates = [index for index in found if index >= 0]
+        if not candidates:
+            return
+        candidate = min(candidates)
+        tries += 1
+        if tries > _DENSE_TRIES and candidate - start < tries * _DENSE_GAP:
+            yield from compiled.finditer(content, candidate, end)
+            return
+        match = compiled.match(content, candidate, end)
+        after = candidate + 1
+        if match is not None:
+            yield match
+            after = match.end()
+        found = [
+            content.find(needle, after, end) if 0 <= index < after else index
+            for needle, index in zip(needles, found)
+        ]
+
+
+def _extra_slots(cls: type) -> Tuple[str, ...]:
+    names = _EXTRA_SLOTS.get(cls)
+    if names is None:
+        names = tuple(
+            name
+            for klass in cls.__mro__
+            if issubclass(klass, RegexPattern) and klass is not RegexPattern
+            for name in klass.__dict__.get("__slots__", ())
+        )
+        _EXTRA_SLOTS[cls] = names
+    return names
+
+
+def _intern_key(pattern: "RegexPattern") -> Tuple[Any, ...]:
+    cls = type(pattern)
+    extras = tuple(getattr(pattern, name, None) for name in _extra_slots(cls))
+    return (cls, pattern.node, pattern.precedence, extras)
+
+
+class _PatternType(type):
+    """The type of patterns, which returns interned instances while interning is on."""
+
+    def __call__(cls, *args: Any, **kwargs: Any) -> Any:
+        pattern = super().__call__(*args, **kwargs)
+        interned = _INTERNED
+        if interned is None:
+            return pattern
+        key = _intern_key(pattern)
+        with _INTERN_LOCK:
+            return interned.setdefault(key, pattern)
+
+
+class RegexPattern(  # pylint: disable=too-many-public-methods,too-many-instance-attributes
+    metaclass=_PatternType,
+):
     """
     The main object that represents Regular Expression Pattern strings for this library.
     """
 
-    regex: str
+    __slots__ = (
+        "precedence",
+        "node",
+        "_compiled",
+        "_optimized",
+        "_width",
+        "_shortest",
+        "_required",
+        "_first",
+        "_anchor",
+        "_observer",
+        "__weakref__",
+    )
 
     #: The precedence of the pattern. Higher precedence patterns are evaluated first.
     # Precedence order here (https://pubs.opengroup.org/onlinepubs/9699919799/basedefs/V1_chap09.html#tag_09_04_08)
     precedence: int
 
-    def __init__(self, pattern: ValidPatternType, /, _precedence: int = 1) -> None:
-        self.regex = self.get_regex(pattern)
+    #: The root of the immutable node tree the pattern is built from.
+    node: nodes.Node
+
+    #: Compiled patterns for :attr:`regex`, keyed by flags, whether they match bytes and engine.
+    _compiled: Dict[Tuple[int, bool, str], Any]
+
+    #: The last tree given to :func:`~regexfactory.optimize.optimize_node` and its result.
+    _optimized: Tuple[Optional[nodes.Node], nodes.Node]
+
+    #: The last tree :attr:`width` was computed for and its width.
+    _width: Tuple[Optional[nodes.Node], nodes.Width]
+
+    #: The length of the shortest match, shorter texts are rejected without matching.
+    #: Set when the pattern is compiled, see :func:`_shortest`.
+    _shortest: int
+
+    #: Texts every match contains, by type of text, see :mod:`~regexfactory.prefilter`.
+    #: Set when the pattern is compiled.
+    _required: Dict[type, Tuple[Any, ...]]
+
+    #: The first characters of matches, by type of text, see :func:`~regexfactory.prefilter.first_chars`.
+    #: Set when the pattern is compiled.
+    _first: Dict[type, Tuple[Any, ...]]
+
+    #: The anchor matches start with, see :func:`~regexfactory.prefilter.leading_anchor`.
+    #: Set when the pattern is compiled.
+    _anchor: Optional[str]
+
+    _observer: Optional["observe.Observer"]
+
+    def __init__(
+        self, pattern: Union[ValidPatternType, nodes.Node], /, _precedence: int = 1
+    ) -> None:
+        self._compiled = {}
+        self.node = self.get_node(pattern)
+        self._optimized = (None, self.node)
+        self._width = (None, (0, None))
+        self._shortest = 0
+        self._required = {}
+        self._first = {}
+        self._anchor = None
+        self._observer = None
         self.precedence = (
             _precedence if not isinstance(pattern, RegexPattern) else pattern.precedence
         )
+        if backtracking.STRICT_SEVERITY is not None:
+            backtracking.check(self)
+
+    @property
+    def regex(self) -> str:
+        """The regex string this pattern represents, rendered from :attr:`node` on first use."""
+        return self.render()
+
+    @regex.setter
+    def regex(self, value: str) -> None:
+        interned = _INTERNED
+        if interned is not None and interned.get(_intern_key(self)) is self:
+            raise AttributeError("Interned patterns can't be changed.")
+        with _COMPILE_LOCK:
+            self.node = nodes.Raw(value)
+            self._compiled = {}
+            self._shortest = 0
+            self._required = {}
+            self._first = {}
+            self._anchor = None
+
+    @property
+    def observer(self) -> Optional["observe.Observer"]:
+        """
+        The observer of this pattern alone, which replaces the one set with :func:`set_observer`,
+        see :mod:`~regexfactory.observe`.
+        Interned patterns share their observer, see :func:`set_interning`.
+        Observers aren't pickled with the pattern.
+        """
+        return self._observer
+
+    @observer.setter
+    def observer(self, observer: Optional["observe.Observer"]) -> None:
+        global _PATTERN_OBSERVED, _OBSERVING  # pylint: disable=global-statement
+        if observer is not None:
+            _PATTERN_OBSERVED = _OBSERVING = True
+        self._observer = observer
+
+    def __getstate__(self) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        slots = {
+            name: getattr(self, name)
+            for cls in type(self).__mro__
+            for name in cls.__dict__.get("__slots__", ())
+            if name != "__weakref__" and hasattr(self, name)
+        }
+        slots["_observer"] = None
+        return getattr(self, "__dict__", None), slots
+
+    def render(self, *, optimize: bool = True) -> str:
+        """
+        Renders :attr:`node` to a regex string.
+        Unless :code:`optimize` is false, the tree first goes through the passes of
+        :mod:`~regexfactory.optimize`, which never change what the pattern matches.
+        """
+        if not optimize:
+            return self.node.render()
+        source, optimized = self._optimized
+        if source is not self.node:
+            optimized = optimize_node(self.node)
+            self._optimized = (self.node, optimized)
+        return optimized.render()
+
+    @property
+    def width(self) -> nodes.Width:
+        """
+        The length of the shortest and of the longest text the pattern can match,
+        the longest being :code:`None` if it is unbounded or depends on a backreference.
+        Lookarounds and anchors don't count, they match no text.
+        Regex strings are parsed to be measured, see :func:`~regexfactory.parser.parse`.
+
+        .. exec_code::
+
+            from regexfactory import DIGIT, Amount, IfAhead, Multi, Optional, Or
+
+            print(Amount(DIGIT, 2, 4).width)
+            print((Or("px", "em") + Optional("!")).width)
+            print((Multi(DIGIT) + IfAhead("%")).width)
+
+        """
+        source, width = self._width
+        if source is not self.node:
+            from .parser import (  # pylint: disable=import-outside-toplevel
+                structured_node,
+            )
+
+            source = self.node
+            width = structured_node(self).width()
+            self._width = (source, width)
+        return width
 
     def __repr__(self) -> str:
         raw_regex = f"{self.regex!r}".replace("\\\\", "\\")
@@ -57,171 +534,742 @@ class RegexPattern:
 
     def __add__(self, other: ValidPatternType) -> "RegexPattern":
         """Adds two :class:`ValidPatternType`'s together, into a :class:`RegexPattern`"""
-        from .patterns import Group  # pylint: disable=import-outside-toplevel
-
         try:
             other_pattern = (
                 RegexPattern(other) if not isinstance(other, RegexPattern) else other
             )
         except TypeError:
             return NotImplemented
-
-        if self.precedence > other_pattern.precedence:
-            return RegexPattern(
-                self.regex + self.get_regex(Group(other_pattern, capturing=False))
-            )
-        if self.precedence < other_pattern.precedence:
-            return RegexPattern(
-                self.get_regex(Group(self, capturing=False)) + other_pattern.regex
-            )
-        return RegexPattern(self.regex + other_pattern.regex)
+        return RegexPattern(self._concat(self, other_pattern))
 
     def __radd__(self, other: ValidPatternType) -> "RegexPattern":
         """Adds two :class:`ValidPatternType`'s together, into a :class:`RegexPattern`"""
-        from .patterns import Group  # pylint: disable=import-outside-toplevel
-
         try:
             other_pattern = (
                 RegexPattern(other) if not isinstance(other, RegexPattern) else other
             )
         except TypeError:
             return NotImplemented
+        return RegexPattern(self._concat(other_pattern, self))
 
-        if self.precedence > other_pattern.precedence:
-            return RegexPattern(
-                self.get_regex(Group(other_pattern, capturing=False)) + self.regex
-            )
-        if self.precedence < other_pattern.precedence:
-            return RegexPattern(
-                other_pattern.regex + self.get_regex(Group(self, capturing=False))
-            )
-        return RegexPattern(other_pattern.regex + self.regex)
+    @staticmethod
+    def _concat(left: "RegexPattern", right: "RegexPattern") -> nodes.Concat:
+        """Concatenates two patterns, grouping the one with the lower precedence."""
+        if left.precedence > right.precedence:
+            return nodes.Concat((left.node, nodes.Group(right.node, capturing=False)))
+        if left.precedence < right.precedence:
+            return nodes.Concat((nodes.Group(left.node, capturing=False), right.node))
+        return nodes.Concat((left.node, right.node))
 
     def __mul__(self, coefficient: int) -> "RegexPattern":
-        """Treats :class:`RegexPattern` as a string and multiplies it by an integer."""
-        return RegexPattern(self.regex * coefficient)
+        """Repeats the :class:`RegexPattern` an integer amount of times, like a string."""
+        return RegexPattern(nodes.Concat((self.node,) * max(coefficient, 0)))
 
     def __eq__(self, other: Any) -> bool:
         """
         Returns whether or not two :class:`ValidPatternType`'s have the same regex.
         Otherwise return false.
         """
-        if isinstance(other, (str, re.Pattern, RegexPattern)):
-            return (
-                self.regex == RegexPattern(other).regex
-                and self.precedence == RegexPattern(other).precedence
-            )
+        if self is other:
+            return True
+        if isinstance(other, RegexPattern):
+            return self.regex == other.regex and self.precedence == other.precedence
+        if isinstance(other, (str, bytes, re.Pattern)):
+            # Compared as the pattern they'd make, without building it and checking it in strict mode.
+            return self.regex == self.get_regex(other) and self.precedence == 1
         return super().__eq__(other)
 
     def __hash__(self) -> int:
         """Hashes the regex string."""
         return hash(self.regex)
 
+    @staticmethod
+    def get_node(obj: Union[ValidPatternType, nodes.Node], /) -> nodes.Node:
+        """
+        Extracts the node tree from :class:`RegexPattern` objects.
+        Strings and :class:`re.Pattern` objects become :class:`~regexfactory.nodes.Raw` nodes,
+        which are spliced verbatim into the patterns that contain them.
+        """
+        if isinstance(obj, RegexPattern):
+            return obj.node
+        if isinstance(obj, nodes.Node):
+            return obj
+        return nodes.Raw(RegexPattern.get_regex(obj))
+
+    @staticmethod
+    def parse(regex: Union[str, re.Pattern], /) -> "RegexPattern":
+        """
+        Builds a structured pattern from a regex written by hand,
+        so the library's analyses and optimizations apply to it, see :func:`~regexfactory.parser.parse`.
+
+        .. exec_code::
+
+            from regexfactory import RegexPattern
+
+            print(RegexPattern.parse("(?:x)+|(?:y)+").regex)
+
+        """
+        from .parser import parse  # pylint: disable=import-outside-toplevel
+
+        return parse(regex)
+
+    def analyze_backtracking(self) -> List["backtracking.BacktrackingIssue"]:
+        """
+        Finds the parts of the pattern that can make matching take polynomial or exponential time,
+        see :mod:`~regexfactory.backtracking`.
+        """
+        return backtracking.analyze(self)
+
     @staticmethod
     def get_regex(obj: ValidPatternType, /) -> str:
         """
         Extracts the regex content from :class:`RegexPattern` or :class:`re.Pattern` objects
         else return the input :class:`str`.
+        Bytes are decoded as Latin-1, so each byte becomes the character of the same value.
         """
         if isinstance(obj, RegexPattern):
             return obj.regex
+        if isinstance(obj, re.Pattern):
+            obj = obj.pattern
         if isinstance(obj, str):
             return obj
-        if isinstance(obj, re.Pattern):
-            return obj.pattern
+        if isinstance(obj, bytes):
+            return obj.decode("latin-1")
         raise TypeError(f"Can't get regex from {obj.__class__.__qualname__} object.")
 
+    @overload
+    def compile(
+        self, *, flags: int = 0, binary: bool = False, engine: Literal["re"] = "re"
+    ) -> re.Pattern: ...
+
+    @overload
+    def compile(
+        self, *, flags: int = 0, binary: bool = False, engine: Literal["dfa"]
+    ) -> Union[re.Pattern, "dfa.DFAPattern"]: ...
+
     def compile(
         self,
         *,
         flags: int = 0,
-    ) -> re.Pattern:
-        """See :func:`re.compile`."""
-        return re.compile(self.regex, flags=flags)
+        binary: bool = False,
+        engine: str = "re",
+    ) -> Any:
+        """
+        See :func:`re.compile`.
+        The compiled pattern is cached on the instance for each value of ``flags``,
+        so repeated calls do not go through :mod:`re`'s internal cache.
+        New regexes are looked up in :data:`~regexfactory.cache.COMPILE_CACHE` first.
+
+        Pass :code:`binary=True` to compile the pattern for bytes, see :func:`encode_regex`.
+        Bytes given to the pattern's constructors stand for the characters of the same value,
+        so any pattern whose characters are below :code:`\\xff` can match bytes too.
+        The matching methods do this by themselves when given binary content,
+        like :class:`bytes`, :class:`bytearray`, :class:`memoryview` or :class:`mmap.mmap`.
+
+        .. exec_code::
+
+            from regexfactory import DIGIT, Multi, Or
+
+            version = Or(b"HTTP/", "HTTPS/") + Multi(DIGIT)
+            print(version.compile(binary=True))
+            print(version.search(b"GET / HTTP/2"))
+            print(version.search(memoryview(b"HTTPS/1")))
+
+        Pass :code:`engine="dfa"` to get a :class:`~regexfactory.dfa.DFAPattern` instead,
+        which matches in time linear in the length of the text, see :mod:`~regexfactory.dfa`.
+        Patterns it can't run, like those with backreferences or lookarounds,
+        are compiled by :mod:`re` as usual.
+
+        .. exec_code::
+
+            from regexfactory import IfAhead, Multi
+
+            print(Multi(Multi("a")).compile(engine="dfa"))
+            print(Multi(IfAhead("a") + "a").compile(engine="dfa"))
+
+        """
+        if engine not in ("re", "dfa"):
+            raise ValueError(f"Unknown engine {engine!r}, use 're' or 'dfa'.")
+        key = (flags, binary, engine)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with _COMPILE_LOCK:
+                compiled = self._compiled.get(key)
+                if compiled is None:
+                    observer = self._observing()
+                    if observer is None:
+                        compiled = self._compile(flags, binary, engine)
+                    else:
+                        observer.on_compile_start(self, flags, binary, engine)
+                        start = time.perf_counter()
+                        compiled = self._compile(flags, binary, engine)
+                        elapsed = time.perf_counter() - start
+                        observer.on_compile_end(self, compiled, elapsed)
+                    self._compiled[key] = compiled
+                    self._shortest = _shortest(self.node)
+                    self._required = _literals_by_type(self)
+                    self._first, self._anchor = _starts(self)
+        return compiled
+
+    def _compile(self, flags: int, binary: bool, engine: str) -> Any:
+        if engine == "dfa":
+            from .dfa import DFAPattern  # pylint: disable=import-outside-toplevel
+
+            try:
+                return DFAPattern(self, flags=flags, binary=binary)
+            except ValueError:
+                return self.compile(flags=flags, binary=binary)
+        regex = encode_regex(self.regex) if binary else self.regex
+        return COMPILE_CACHE.compile(regex, flags)
+
+    def _compile_for(self, content: Any, flags: int) -> re.Pattern:
+        """Returns the pattern compiled for the type of :code:`content`."""
+        return self.compile(flags=flags, binary=isinstance(content, _BINARY_TYPES))
+
+    def _lacks_literals(self, content: Any, flags: int) -> bool:
+        """Returns whether the text lacks one of the literals every match contains."""
+        literals = self._required.get(type(content))
+        if literals is None or flags & _UNFILTERED_FLAGS:
+            return False
+        for literal in literals:
+            if literal not in content:
+                return True
+        return False
+
+    def _observing(self) -> Optional["observe.Observer"]:
+        """Returns the observer of the pattern, its own or the one of every pattern."""
+        if not _OBSERVING:
+            return None
+        return self._observer if self._observer is not None else _OBSERVER
+
+    def _report(
+        self, method: str, function: Callable[..., Any], content: Any, *args: Any
+    ) -> Any:
+        """Calls a method of the compiled pattern, reporting the call to the pattern's observer."""
+        observer = self._observing()
+        if observer is None:
+            return function(content, *args)
+        start = time.perf_counter()
+        result = function(content, *args)
+        elapsed = time.perf_counter() - start
+        observer.on_match(
+            self, method, len(content), observe.HITS[method](result), elapsed
+        )
+        return result
 
     def match(
         self,
-        content: str,
+        content: ContentType,
         /,
         *,
         flags: int = 0,
     ) -> Optional[re.Match]:
         """See :meth:`re.Pattern.match`."""
-        return self.compile(flags=flags).match(content)
+        if _OBSERVING:
+            return self._report(
+                "match", self._compile_for(content, flags).match, content
+            )
+        if len(content) < self._shortest:
+            return None
+        return self._compile_for(content, flags).match(content)
 
     def fullmatch(
         self,
-        content: str,
+        content: ContentType,
         /,
         *,
         flags: int = 0,
     ) -> Optional[re.Match]:
         """See :meth:`re.Pattern.fullmatch`."""
-        return self.compile(flags=flags).fullmatch(content)
+        if _OBSERVING:
+            return self._report(
+                "fullmatch", self._compile_for(content, flags).fullmatch, content
+            )
+        if len(content) < self._shortest:
+            return None
+        return self._compile_for(content, flags).fullmatch(content)
 
     def findall(
         self,
-        content: str,
+        content: ContentType,
         /,
         *,
         flags: int = 0,
     ) -> List[Tuple[str, ...]]:
         """See :meth:`re.Pattern.findall`."""
-        return self.compile(flags=flags).findall(content)
+        if _OBSERVING:
+            return self._report(
+                "findall", self._compile_for(content, flags).findall, content
+            )
+        if self._required and self._lacks_literals(content, flags):
+            return []
+        return self._compile_for(content, flags).findall(content)
 
     def finditer(
         self,
-        content: str,
+        content: ContentType,
         /,
         *,
         flags: int = 0,
     ) -> Iterator[re.Match]:
-        """See :meth:`re.Pattern.finditer`."""
-        return self.compile(flags=flags).finditer(content)
+        """
+        See :meth:`re.Pattern.finditer`.
+        On long texts, patterns whose matches start with one of a few characters only try to match
+        where those are, see :func:`~regexfactory.prefilter.first_chars`.
+        The :attr:`re.Match.pos` of matches found this way is where they were tried,
+        not the start of the text, their spans and groups are the same.
+        """
+        compiled = self._compile_for(content, flags)
+        needles = self._first.get(type(content))
+        if (
+            needles is not None
+            and len(content) >= _JUMP_LENGTH
+            and not flags & _UNFILTERED_FLAGS
+            and _sparse(content, needles)
+        ):
+            matches = _jump(compiled, content, needles)
+        else:
+            matches = compiled.finditer(content)
+        observer = self._observing()
+        if observer is not None:
+            return observe.report_matches(observer, self, matches, len(content))
+        return matches
+
+    def finditer_stream(
+        self,
+        fileobj: Any,
+        /,
+        chunk_size: int = 1 << 16,
+        *,
+        max_width: Optional[int] = None,
+        flags: int = 0,
+    ) -> Iterator["stream.OffsetMatch"]:
+        """
+        Like :meth:`finditer`, but reads the text from a file object :code:`chunk_size` characters at a time,
+        keeping memory use flat however large the file is, see :mod:`~regexfactory.stream`.
+        The offsets of the matches count from the start of the file.
+        Patterns whose matches can be arbitrarily long need :code:`max_width`,
+        an upper bound on how many characters past its start a match can look at.
+
+        .. exec_code::
+
+            import io
+            from regexfactory import WORD, Amount
+
+            text = io.StringIO("stream " * 3)
+            print([match.span() for match in Amount(WORD, 1, 8).finditer_stream(text, 5)])
+
+        """
+        from .stream import finditer_stream  # pylint: disable=import-outside-toplevel
+
+        return finditer_stream(
+            self, fileobj, chunk_size, max_width=max_width, flags=flags
+        )
+
+    def afinditer(
+        self,
+        source: Any,
+        /,
+        chunk_size: int = 1 << 16,
+        *,
+        max_width: Optional[int] = None,
+        flags: int = 0,
+        executor: Optional["concurrent.futures.Executor"] = None,
+        offload_size: int = 1 << 14,
+    ) -> AsyncIterator["stream.OffsetMatch"]:
+        """
+        Like :meth:`finditer_stream`, for :code:`async for` loops.
+        Reads from an :class:`asyncio.StreamReader`, or anything else with a :code:`read` coroutine,
+        :code:`chunk_size` characters at a time, or takes chunks from an async iterable.
+        Matches spanning several chunks are found as in the whole text.
+
+        Scans of at least :code:`offload_size` characters run in :code:`executor` if one is given,
+        see :meth:`~regexfactory.stream.StreamScanner.afeed`,
+        so large payloads don't stall the event loop.
+
+        .. exec_code::
+
+            import asyncio
+            from regexfactory import DIGIT, Amount
+
+            async def main():
+                reader = asyncio.StreamReader()
+                reader.feed_data(b"GET /items/12 /items/345")
+                reader.feed_eof()
+                async for match in Amount(DIGIT, 1, 4).afinditer(reader, chunk_size=5):
+                    print(match.span(), match.group())
+
+            asyncio.run(main())
+
+        """
+        from .stream import afinditer  # pylint: disable=import-outside-toplevel
+
+        return afinditer(
+            self,
+            source,
+            chunk_size,
+            max_width=max_width,
+            flags=flags,
+            executor=executor,
+            offload_size=offload_size,
+        )
+
+    def finditer_parallel(
+        self,
+        source: Any,
+        /,
+        *,
+        workers: Optional[int] = None,
+        chunk_size: int = 1 << 20,
+        max_width: Optional[int] = None,
+        flags: int = 0,
+    ) -> Iterator[Any]:
+        """
+        Like :meth:`finditer`, but spreads the work over :code:`workers` processes,
+        all of the machine's cores by default, see :mod:`~regexfactory.parallel`.
+        With :code:`workers=1` everything runs in the calling process.
+
+        :param source: One large text, a file object, or an iterable of documents.
+            Texts and files are cut into windows of :code:`chunk_size` characters,
+            and :class:`~regexfactory.stream.OffsetMatch` objects are yielded in order,
+            with offsets from the start of the text.
+            For documents, :code:`(index, match)` pairs are yielded,
+            the index telling which document the match is from.
+        :param max_width: Stands in for the pattern's :func:`~regexfactory.stream.reach`
+            when its matches can be arbitrarily long, see :meth:`finditer_stream`.
+        """
+        from .parallel import (  # pylint: disable=import-outside-toplevel
+            finditer_parallel,
+        )
+
+        return finditer_parallel(
+            self,
+            source,
+            workers=workers,
+            chunk_size=chunk_size,
+            max_width=max_width,
+            flags=flags,
+        )
+
+    def findall_parallel(
+        self,
+        source: Any,
+        /,
+        *,
+        workers: Optional[int] = None,
+        chunk_size: int = 1 << 20,
+        max_width: Optional[int] = None,
+        flags: int = 0,
+    ) -> List[Any]:
+        """
+        Like :meth:`findall`, but spreads the work over several processes, see :meth:`finditer_parallel`.
+        For an iterable of documents, returns the list of results of each document.
+
+        .. exec_code::
+
+            from regexfactory import DIGIT, Amount, NamedGroup
+
+            pair = NamedGroup("key", "x") + "=" + NamedGroup("value", Amount(DIGIT, 1, 4))
+            print(pair.findall_parallel("x=1 y=2 x=345 " * 2, chunk_size=8, workers=2))
+
+        """
+        from .parallel import (  # pylint: disable=import-outside-toplevel
+            findall_parallel,
+        )
+
+        return findall_parallel(
+            self,
+            source,
+            workers=workers,
+            chunk_size=chunk_size,
+            max_width=max_width,
+            flags=flags,
+        )
 
     def split(
         self,
-        content: str,
+        content: ContentType,
         /,
         maxsplit: int = 0,
         *,
         flags: int = 0,
     ) -> List[Any]:
         """See :meth:`re.Pattern.split`."""
-        return self.compile(flags=flags).split(content, maxsplit=maxsplit)
+        if _OBSERVING:
+            compiled = self._compile_for(content, flags)
+            return self._report("split", compiled.split, content, maxsplit)
+        return self._compile_for(content, flags).split(content, maxsplit=maxsplit)
 
     def sub(
         self,
-        replacement: str,
-        content: str,
+        replacement: Union[str, bytes, Callable[[re.Match], Any]],
+        content: ContentType,
         /,
         count: int = 0,
         *,
         flags: int = 0,
-    ) -> str:
+    ) -> Union[str, bytes]:
         """See :meth:`re.Pattern.sub`."""
-        return self.compile(flags=flags).sub(replacement, content, count=count)
+        if _OBSERVING:
+            subn = functools.partial(
+                self._compile_for(content, flags).subn, replacement
+            )
+            return self._report("sub", subn, content, count)[0]
+        return self._compile_for(content, flags).sub(replacement, content, count=count)
 
     def subn(
         self,
-        replacement: str,
-        content: str,
+        replacement: Union[str, bytes, Callable[[re.Match], Any]],
+        content: ContentType,
         /,
         count: int = 0,
         *,
         flags: int = 0,
-    ) -> Tuple[str, int]:
+    ) -> Tuple[Union[str, bytes], int]:
         """See :meth:`re.Pattern.subn`."""
-        return self.compile(flags=flags).subn(replacement, content, count=count)
+        if _OBSERVING:
+            subn = functools.partial(
+                self._compile_for(content, flags).subn, replacement
+            )
+            return self._report("subn", subn, content, count)
+        return self._compile_for(content, flags).subn(replacement, content, count=count)
 
     def search(
         self,
-        content: str,
+        content: ContentType,
         /,
         pos: int = 0,
-        endpos: int = 0,
+        endpos: Optional[int] = None,
         *,
         flags: int = 0,
     ) -> Optional[re.Match]:
-        """See :meth:`re.Pattern.search`."""
-        return self.compile(flags=flags).search(content, pos, endpos)
+        """
+        See :meth:`re.Pattern.search`, :code:`endpos` defaults to the end of :code:`content`.
+        The match may have been tried where it starts, like those of :meth:`finditer`,
+        and then has that position as its :attr:`re.Match.pos` instead of :code:`pos`.
+        """
+        if _OBSERVING:
+            search = functools.partial(
+                self._search, self._compile_for(content, flags), flags
+            )
+            return self._report("search", search, content, pos, endpos)
+        if len(content) < self._shortest:
+            return None
+        # Anchored patterns are quicker to match at the start than to check for literals.
+        if (
+            self._required
+            and self._anchor is None
+            and self._lacks_literals(content, flags)
+        ):
+            return None
+        compiled = self._compile_for(content, flags)
+        if self._first or self._anchor is not None:
+            return self._search(compiled, flags, content, pos, endpos)
+        if endpos is None:
+            return compiled.search(content, pos)
+        return compiled.search(content, pos, endpos)
+
+    def test(
+        self,
+        content: ContentType,
+        /,
+        *,
+        flags: int = 0,
+    ) -> bool:
+        """Returns whether the pattern matches anywhere in :code:`content`."""
+        if _OBSERVING:
+            search = functools.partial(
+                self._search, self._compile_for(content, flags), flags
+            )
+            return self._report("test", search, content) is not None
+        if len(content) < self._shortest:
+            return False
+        if (
+            self._required
+            and self._anchor is None
+            and self._lacks_literals(content, flags)
+        ):
+            return False
+        compiled = self._compile_for(content, flags)
+        if self._first or self._anchor is not None:
+            return self._search(compiled, flags, content) is not None
+        return compiled.search(content) is not None
+
+    def _search(
+        self,
+        compiled: re.Pattern,
+        flags: int,
+        content: Any,
+        pos: int = 0,
+        endpos: Optional[int] = None,
+    ) -> Optional[re.Match]:
+        """
+        Searches with the compiled pattern, only matching at the start of the text if the pattern is anchored,
+        and jumping through the first characters of matches in long texts, see :mod:`~regexfactory.prefilter`.
+        """
+        anchor = self._anchor
+        if anchor is not None and (anchor == "\\A" or not flags & re.MULTILINE):
+            if endpos is None:
+                return compiled.match(content, pos)
+            return compiled.match(content, pos, endpos)
+        needles = self._first.get(type(content))
+        if (
+            needles is not None
+            and len(content) >= _JUMP_LENGTH
+            and not flags & _UNFILTERED_FLAGS
+        ):
+            return next(_jump(compiled, content, needles, pos, endpos), None)
+        if endpos is None:
+            return compiled.search(content, pos)
+        return compiled.search(content, pos, endpos)
+
+    def _many(
+        self,
+        method: str,
+        contents: Iterable[ContentType],
+        flags: int,
+        output: str,
+        convert: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Calls a method of the compiled pattern on every string,
+        looking the method up once instead of once per string.
+        The pattern is compiled for the type of the first string.
+        """
+        if output not in MANY_OUTPUTS:
+            raise ValueError(
+                f"output must be one of {', '.join(map(repr, MANY_OUTPUTS))}."
+            )
+        iterator = iter(contents)
+        first = next(iterator, None)
+        if first is not None:
+            iterator = itertools.chain((first,), iterator)
+        function = getattr(self._compile_for(first, flags), method)
+        literals = self._required.get(type(first))
+        if method == "search" and literals and not flags & _UNFILTERED_FLAGS:
+            function = _prefiltered(function, literals)
+        if _OBSERVING:
+            name = "test" if convert is bool else method
+            function = functools.partial(self._report, name, function)
+        results = map(function, iterator)
+        if convert is not None:
+            results = map(convert, results)
+        if output == "iter":
+            return results
+        if output == "mask":
+            return bytearray(map(bool, results))
+        return list(results)
+
+    def match_many(
+        self,
+        contents: Iterable[ContentType],
+        /,
+        *,
+        flags: int = 0,
+        output: str = "list",
+    ) -> Union[List[Optional[re.Match]], bytearray, Iterator[Optional[re.Match]]]:
+        """
+        Calls :meth:`match` on every string of an iterable, compiling the pattern only once.
+
+        :param output: :code:`"list"` for a list of results,
+            :code:`"mask"` for a :class:`bytearray` holding 1 where a string matched and 0 elsewhere,
+            or :code:`"iter"` to get the results lazily, one string at a time.
+
+        .. exec_code::
+
+            from regexfactory import DIGIT, Multi
+
+            lines = ["12 apples", "no numbers", "7 pears"]
+
+            print(Multi(DIGIT).match_many(lines))
+            print(list(Multi(DIGIT).match_many(lines, output="mask")))
+
+        """
+        return self._many("match", contents, flags, output)
+
+    def fullmatch_many(
+        self,
+        contents: Iterable[ContentType],
+        /,
+        *,
+        flags: int = 0,
+        output: str = "list",
+    ) -> Union[List[Optional[re.Match]], bytearray, Iterator[Optional[re.Match]]]:
+        """Calls :meth:`fullmatch` on every string of an iterable, see :meth:`match_many`."""
+        return self._many("fullmatch", contents, flags, output)
+
+    def search_many(
+        self,
+        contents: Iterable[ContentType],
+        /,
+        *,
+        flags: int = 0,
+        output: str = "list",
+    ) -> Union[List[Optional[re.Match]], bytearray, Iterator[Optional[re.Match]]]:
+        """Calls :meth:`search` on every string of an iterable, see :meth:`match_many`."""
+        return self._many("search", contents, flags, output)
+
+    def test_many(
+        self,
+        contents: Iterable[ContentType],
+        /,
+        *,
+        flags: int = 0,
+        output: str = "list",
+    ) -> Union[List[bool], bytearray, Iterator[bool]]:
+        """Calls :meth:`test` on every string of an iterable, see :meth:`match_many`."""
+        return self._many("search", contents, flags, output, bool)
+
+
+class PatternBuilder:
+    """
+    Accumulates :class:`ValidPatternType`'s to concatenate them into a single :class:`RegexPattern`.
+    Unlike repeatedly adding patterns together,
+    appending does not create intermediate :class:`RegexPattern` objects,
+    and the result is rendered in a single pass.
+
+    .. exec_code::
+
+        from regexfactory import DIGIT, PatternBuilder
+
+        builder = PatternBuilder("Order #")
+        for _ in range(3):
+            builder.append(DIGIT)
+        builder.extend(["-", DIGIT])
+
+        print(builder.build())
+
+    """
+
+    def __init__(self, *patterns: ValidPatternType) -> None:
+        self._items: List[nodes.Node] = []
+        self.extend(patterns)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def append(self, pattern: ValidPatternType) -> "PatternBuilder":
+        """
+        Appends a pattern, grouping it or what was built so far
+        according to their precedence, like :meth:`RegexPattern.__add__` does.
+        """
+        node = RegexPattern.get_node(pattern)
+        precedence = pattern.precedence if isinstance(pattern, RegexPattern) else 1
+        if precedence < 1:
+            node = nodes.Group(node, capturing=False)
+        elif precedence > 1 and self._items:
+            self._items = [
+                nodes.Group(nodes.Concat(tuple(self._items)), capturing=False)
+            ]
+        self._items.append(node)
+        return self
+
+    def extend(self, patterns: Iterable[ValidPatternType]) -> "PatternBuilder":
+        """Appends every pattern of an iterable, see :meth:`append`."""
+        for pattern in patterns:
+            self.append(pattern)
+        return self
+
+    def build(self) -> RegexPattern:
+        """Returns the concatenation of every pattern appended so far."""
+        return RegexPattern(nodes.Concat(tuple(self._items)))
@@ -6,19 +6,240 @@ Module for Regex pattern classes like :code:`[^abc]` or :code:`(abc)` or :code:`
 
 """
 
+import os
+import re
 import typing as t
 
-from regexfactory.pattern import RegexPattern, ValidPatternType
+from regexfactory import nodes
+from regexfactory.charset import CLASS_ESCAPES, CharSet
+from regexfactory.pattern import ESCAPED_CHARACTERS, RegexPattern, ValidPatternType
+
+
+def _plain_text(regex: str) -> t.Optional[str]:
+    """
+    Returns the text a regex matches if it is a plain literal,
+    made of ordinary characters and backslash-escaped punctuation, else :code:`None`.
+    """
+    chars = []
+    escaped = False
+    for char in regex:
+        if escaped:
+            if char.isalnum() or not char.isascii():
+                return None
+            chars.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in ESCAPED_CHARACTERS or char.isspace():
+            return None
+        else:
+            chars.append(char)
+    if escaped:
+        return None
+    return "".join(chars)
+
+
+def _literal_text(node: nodes.Node) -> t.Optional[str]:
+    """Returns the text a node matches if it is a plain literal, else :code:`None`."""
+    if isinstance(node, nodes.Literal):
+        return node.text
+    if isinstance(node, nodes.Raw):
+        return _plain_text(node.text)
+    return None
+
+
+def _may_match_same(first: t.Optional[str], second: t.Optional[str]) -> bool:
+    """
+    Whether alternatives starting with these characters can match at the same position,
+    :code:`None` standing for the empty alternative.
+    Case variants count as overlapping since the pattern may be compiled with :data:`re.IGNORECASE`.
+    """
+    if first is None or second is None:
+        return True
+    return first.casefold() == second.casefold()
+
+
+def _group_by_first_char(
+    words: t.List[str],
+) -> t.List[t.Tuple[t.Optional[str], t.List[str]]]:
+    """
+    Groups words by their first character, keeping the order of first appearance.
+    A word only joins an earlier group when no group in between could match at the same position.
+    """
+    groups: t.List[t.Tuple[t.Optional[str], t.List[str]]] = []
+    for word in words:
+        key = word[0] if word else None
+        target = None
+        for index in range(len(groups) - 1, -1, -1):
+            group_key = groups[index][0]
+            if key is not None and group_key == key:
+                target = index
+                break
+            if _may_match_same(group_key, key):
+                break
+        if target is None:
+            groups.append((key, [word]))
+        else:
+            groups[target][1].append(word)
+    return groups
+
+
+#: An alternation branch, with the characters it matches if it matches exactly one character.
+_Branch = t.Tuple[nodes.Node, t.Optional[CharSet]]
+
+
+def _merge_char_branches(branches: t.List[_Branch]) -> t.List[nodes.Node]:
+    """
+    Merges consecutive branches that each match exactly one character into a single character set.
+    Since every such branch consumes the same amount of text,
+    their relative order does not change what the alternation matches.
+    """
+    merged: t.List[nodes.Node] = []
+    index = 0
+    while index < len(branches):
+        end = index
+        while end < len(branches) and branches[end][1] is not None:
+            end += 1
+        if end - index > 1:
+            members = [t.cast(CharSet, member) for _, member in branches[index:end]]
+            merged.append(nodes.CharClass(members[0].union(*members[1:])))
+            index = end
+        else:
+            merged.append(branches[index][0])
+            index += 1
+    return merged
+
+
+def _literal_trie(words: t.List[str]) -> t.List[_Branch]:
+    """
+    Prefix-factors an ordered list of unique literal strings into alternation branches,
+    which are tried in the same order as the original alternatives.
+    """
+    branches: t.List[_Branch] = []
+    for key, members in _group_by_first_char(words):
+        if key is None:
+            branches.append((nodes.Literal(""), None))
+        elif len(members) == 1:
+            literal = nodes.Literal(members[0])
+            branches.append((literal, _class_member(literal)))
+        else:
+            prefix = os.path.commonprefix(members)
+            rest = _literal_trie([member[len(prefix) :] for member in members])
+            greedy = None
+            if _literal_text(rest[-1][0]) == "":
+                rest, greedy = rest[:-1], True
+            elif _literal_text(rest[0][0]) == "":
+                rest, greedy = rest[1:], False
+            alternatives = _merge_char_branches(rest)
+            suffix: nodes.Node
+            if len(alternatives) == 1 and (rest[0][1] is not None or len(rest) > 1):
+                suffix = alternatives[0]
+            else:
+                suffix = nodes.Group(
+                    nodes.Alternation(tuple(alternatives)), capturing=False
+                )
+            if greedy is not None:
+                suffix = nodes.Repeat(suffix, 0, 1, greedy=greedy)
+            branches.append((nodes.Concat((nodes.Literal(prefix), suffix)), None))
+    return branches
+
+
+def _class_member(node: nodes.Node) -> t.Optional[CharSet]:
+    """Returns the characters the node matches if it always matches exactly one character."""
+    if isinstance(node, nodes.CharClass) and not node.charset.negated:
+        return node.charset
+    if isinstance(node, nodes.Raw):
+        regex = node.text
+        if len(regex) == 2 and regex[0] == "\\" and regex[1] in CLASS_ESCAPES:
+            return CharSet(escapes=regex[1])
+    literal = _literal_text(node)
+    if literal is not None and len(literal) == 1:
+        return CharSet(((ord(literal), ord(literal)),))
+    return None
+
+
+def _member_charset(pattern: ValidPatternType) -> CharSet:
+    """Returns the characters a member of a :class:`Set` or :class:`NotSet` stands for."""
+    if isinstance(pattern, Range):
+        return pattern.charset
+    node = RegexPattern.get_node(pattern)
+    if isinstance(node, nodes.CharClass):
+        return node.charset
+    return CharSet.parse(RegexPattern.get_regex(pattern))
+
+
+#: Lookaround extension prefixes, and whether they look ahead and are negative.
+_LOOKAROUNDS = {
+    "=": (True, False),
+    "!": (True, True),
+    "<=": (False, False),
+    "<!": (False, True),
+}
+
+
+def _check_lookbehind(child: nodes.Node) -> None:
+    """
+    Raises :class:`ValueError` if the child of a lookbehind can match texts of different lengths,
+    which :mod:`re` would only refuse when compiling the pattern.
+    """
+    from regexfactory.parser import (  # pylint: disable=import-outside-toplevel,cyclic-import
+        structured_node,
+    )
+
+    try:
+        node = structured_node(RegexPattern(child))
+    except re.error:
+        # Invalid regexes are reported by re.compile.
+        return
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, nodes.Backreference):
+            # Backreferences are as wide as their group, which may be outside of the lookbehind.
+            return
+        stack.extend(item.children())
+    shortest, longest = node.width()
+    if shortest != longest:
+        widths = (
+            f"{shortest} or more" if longest is None else f"{shortest} to {longest}"
+        )
+        raise ValueError(
+            f"Lookbehinds need a fixed width, {child.render()!r} matches {widths} characters."
+        )
+
+
+def _extension_node(prefix: str, child: nodes.Node) -> nodes.Node:
+    """Builds the node for the :code:`(?{prefix}{child})` extension."""
+    if prefix == ":":
+        return nodes.Group(child, capturing=False)
+    if prefix in _LOOKAROUNDS:
+        ahead, negative = _LOOKAROUNDS[prefix]
+        if not ahead:
+            _check_lookbehind(child)
+        return nodes.Lookaround(child, ahead=ahead, negative=negative)
+    if prefix.startswith("P<") and prefix.endswith(">"):
+        return nodes.Group(child, name=prefix[2:-1])
+    if prefix == "P=" and isinstance(child, nodes.Raw):
+        return nodes.Backreference(child.text)
+    if prefix == "#" and isinstance(child, nodes.Raw):
+        return nodes.Comment(child.text)
+    return nodes.Extension(prefix, child)
 
 
 class Or(RegexPattern):
     """
     For matching multiple patterns.
     This pattern `or` that pattern `or` that other pattern.
+    Consecutive alternatives that are plain literals are factored into a prefix tree,
+    so :code:`Or("Alice", "Alan")` becomes :code:`Al(?:ice|an)`,
+    which still tries the alternatives in the order they were given.
+    Consecutive alternatives that match a single character,
+    like one character literals, :class:`Range`, :class:`Set`, :data:`DIGIT`, :data:`WORD` or :data:`WHITESPACE`,
+    are merged into one character set.
 
     .. exec_code::
 
-        from regexfactory import Or
+        from regexfactory import Or, DIGIT, Range
 
         patt = Or("Bob", "Alice", "Sally")
 
@@ -26,25 +247,42 @@ class Or(RegexPattern):
         print(patt.match("Bob"))
         print(patt.match("Sally"))
 
+        print(Or(DIGIT, "x", Range("a", "f"), "Bob"))
+
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         *patterns: ValidPatternType,
     ) -> None:
-        regex = "|".join(
-            map(
-                self.get_regex,
-                (
-                    Group(
-                        pattern,
-                        capturing=False,
-                    )
-                    for pattern in patterns
-                ),
+        branches: t.List[_Branch] = []
+        run: t.List[str] = []
+        for pattern in patterns:
+            node = self.get_node(pattern)
+            literal = _literal_text(node)
+            if literal is not None:
+                if literal not in run:
+                    run.append(literal)
+                continue
+            branches.extend(self._literal_branches(run))
+            run = []
+            branches.append((nodes.Group(node, capturing=False), _class_member(node)))
+        branches.extend(self._literal_branches(run))
+        super().__init__(nodes.Alternation(tuple(_merge_char_branches(branches))))
+
+    @staticmethod
+    def _literal_branches(run: t.List[str]) -> t.List[_Branch]:
+        if len(run) > 1:
+            return _literal_trie(run)
+        return [
+            (
+                nodes.Group(nodes.Literal(literal), capturing=False),
+                _class_member(nodes.Literal(literal)),
             )
-        )
-        super().__init__((regex))
+            for literal in run
+        ]
 
 
 class Range(RegexPattern):
@@ -69,11 +307,27 @@ class Range(RegexPattern):
 
     """
 
-    def __init__(self, start: str, stop: str) -> None:
+    __slots__ = ("start", "stop", "charset")
+
+    #: The first character of the range.
+    start: str
+    #: The last character of the range.
+    stop: str
+    #: The characters of the range.
+    charset: CharSet
+
+    def __init__(self, start: t.Union[str, bytes], stop: t.Union[str, bytes]) -> None:
+        if isinstance(start, bytes):
+            start = start.decode("latin-1")
+        if isinstance(stop, bytes):
+            stop = stop.decode("latin-1")
         self.start = start
         self.stop = stop
-        regex = f"[{start}-{stop}]"
-        super().__init__(regex)
+        self.charset = CharSet.range(start, stop)
+        if self.charset.raw:
+            super().__init__(nodes.Raw(f"[{start}-{stop}]"))
+        else:
+            super().__init__(nodes.CharClass(self.charset))
 
 
 class Set(RegexPattern):
@@ -110,14 +364,14 @@ class Set(RegexPattern):
 
     """
 
+    __slots__ = ("charset",)
+
+    #: The canonical class matched by the set, see :class:`~regexfactory.charset.CharSet`.
+    charset: CharSet
+
     def __init__(self, *patterns: ValidPatternType) -> None:
-        regex = ""
-        for pattern in patterns:
-            if isinstance(pattern, Range):
-                regex += f"{pattern.start}-{pattern.stop}"
-            else:
-                regex += self.get_regex(pattern)
-        super().__init__(f"[{regex}]")
+        self.charset = CharSet().union(*map(_member_charset, patterns))
+        super().__init__(nodes.CharClass(self.charset))
 
 
 class NotSet(RegexPattern):
@@ -138,14 +392,14 @@ class NotSet(RegexPattern):
 
     """
 
+    __slots__ = ("charset",)
+
+    #: The canonical class matched by the set, see :class:`~regexfactory.charset.CharSet`.
+    charset: CharSet
+
     def __init__(self, *patterns: ValidPatternType) -> None:
-        regex = ""
-        for pattern in patterns:
-            if isinstance(pattern, Range):
-                regex += f"{pattern.start}-{pattern.stop}"
-            else:
-                regex += self.get_regex(pattern)
-        super().__init__(f"[^{regex}]")
+        self.charset = CharSet().union(*map(_member_charset, patterns)).negate()
+        super().__init__(nodes.CharClass(self.charset))
 
 
 class Amount(RegexPattern):
@@ -184,6 +438,8 @@ class Amount(RegexPattern):
 
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         pattern: ValidPatternType,
@@ -193,13 +449,14 @@ class Amount(RegexPattern):
         greedy: bool = True,
     ) -> None:
         if j is not None:
-            amount = f"{i},{j}"
+            upper: t.Optional[int] = j
         elif or_more:
-            amount = f"{i},"
+            upper = None
         else:
-            amount = f"{i}"
-        regex = self.get_regex(pattern) + "{" + amount + "}" + ("" if greedy else "?")
-        super().__init__(regex)
+            upper = i
+        super().__init__(
+            nodes.Repeat(self.get_node(pattern), i, upper, greedy=greedy, braces=True)
+        )
 
 
 class Multi(RegexPattern):
@@ -208,17 +465,18 @@ class Multi(RegexPattern):
     If given :code:`match_zero=True` to the init method it matches zero or more occurences.
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         pattern: ValidPatternType,
         match_zero: bool = False,
         greedy: bool = True,
     ):
-        suffix = "*" if match_zero else "+"
-        if greedy is False:
-            suffix += "?"
-        regex = self.get_regex(Group(pattern, capturing=False))
-        super().__init__(regex + suffix)
+        group = nodes.Group(self.get_node(pattern), capturing=False)
+        super().__init__(
+            nodes.Repeat(group, 0 if match_zero else 1, None, greedy=greedy)
+        )
 
 
 class Optional(RegexPattern):
@@ -227,17 +485,23 @@ class Optional(RegexPattern):
     Functions the same as :code:`Amount(pattern, 0, 1)`.
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType, greedy: bool = True) -> None:
-        regex = Group(pattern, capturing=False) + "?" + ("" if greedy else "?")
-        super().__init__(regex)
+        group = nodes.Group(self.get_node(pattern), capturing=False)
+        super().__init__(nodes.Repeat(group, 0, 1, greedy=greedy))
 
 
 class Extension(RegexPattern):
-    """Base class for extension pattern classes."""
+    """
+    Base class for extension pattern classes.
+    Well-known prefixes, like :code:`?:` or :code:`?=`, build the matching structured node.
+    """
+
+    __slots__ = ()
 
     def __init__(self, prefix: str, pattern: ValidPatternType):
-        regex = self.get_regex(pattern)
-        super().__init__(f"(?{prefix}{regex})")
+        super().__init__(_extension_node(prefix, self.get_node(pattern)))
 
 
 class NamedGroup(Extension):
@@ -257,6 +521,11 @@ class NamedGroup(Extension):
 
     """
 
+    __slots__ = ("name",)
+
+    #: The name of the group.
+    name: str
+
     def __init__(self, name: str, pattern: ValidPatternType):
         self.name = name
         super().__init__(f"P<{self.name}>", pattern)
@@ -278,6 +547,8 @@ class NamedReference(Extension):
         print(repr(patt2))
     """
 
+    __slots__ = ()
+
     def __init__(self, group_name: t.Union[str, NamedGroup]):
         if isinstance(group_name, NamedGroup):
             name = group_name.name
@@ -302,8 +573,10 @@ class NumberedReference(RegexPattern):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, group_number: int):
-        super().__init__(f"\\{group_number}")
+        super().__init__(nodes.Backreference(group_number))
 
 
 class Comment(Extension):
@@ -324,6 +597,8 @@ class Comment(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, content: str):
         super().__init__("#", content)
 
@@ -350,6 +625,8 @@ class IfAhead(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType):
         super().__init__("=", pattern)
 
@@ -373,6 +650,8 @@ class IfNotAhead(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType):
         super().__init__("!", pattern)
 
@@ -394,6 +673,8 @@ class IfBehind(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType):
         super().__init__("<=", pattern)
 
@@ -416,6 +697,8 @@ class IfNotBehind(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType):
         super().__init__("<!", pattern)
 
@@ -437,13 +720,15 @@ class Group(Extension):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, pattern: ValidPatternType, capturing: bool = True) -> None:
         if capturing is False:
             Extension.__init__(self, ":", pattern)
         else:
             RegexPattern.__init__(  # pylint: disable=non-parent-init-called
                 self,
-                f"({pattern})",
+                nodes.Group(self.get_node(pattern)),
             )
 
 
@@ -471,10 +756,19 @@ class IfGroup(Extension):
         print(patt.match("Bob Dillon"))
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         name_or_id: t.Union[str, int],
         yes_pattern: ValidPatternType,
         no_pattern: ValidPatternType,
-    ):
-        super().__init__(str(Group(str(name_or_id))), Or(yes_pattern, no_pattern))
+    ):  # pylint: disable=super-init-not-called
+        RegexPattern.__init__(  # pylint: disable=non-parent-init-called
+            self,
+            nodes.Conditional(
+                name_or_id,
+                nodes.Group(self.get_node(yes_pattern), capturing=False),
+                nodes.Group(self.get_node(no_pattern), capturing=False),
+            ),
+        )
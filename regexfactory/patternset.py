@@ -0,0 +1,227 @@
+"""
+Pattern Sets
+************
+
+Module for the :class:`PatternSet` class, which tells which of many rules match a text
+in a few scans, instead of one :meth:`RegexPattern.search` per rule.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, Multi, PatternSet
+
+    rules = PatternSet({
+        "number": Multi(DIGIT),
+        "greeting": "hello|hi",
+        "question": r"\\?$",
+    })
+
+    print(rules.matches("hi, is 42 the answer?"))
+    print(rules.matches("no rules here"))
+
+"""
+
+import re
+import typing as t
+from functools import lru_cache
+
+from . import nodes
+from .parser import structured_node
+from .pattern import (
+    _UNFILTERED_FLAGS,
+    ContentType,
+    RegexPattern,
+    ValidPatternType,
+    _literals_by_type,
+    join,
+)
+from .patterns import IfAhead, NamedGroup, Optional, Or
+from .prefilter import _leading_text
+
+_GLOBAL_FLAGS = re.compile(r"[aiLmsux]+(-[imsx]+)?")
+
+
+def _needs_own_shard(node: nodes.Node) -> bool:
+    """
+    Returns whether a rule can't be combined with others:
+    references need their groups to keep their numbers and names,
+    and inline flags apply to the whole regex.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (nodes.Backreference, nodes.Conditional)):
+            return True
+        if isinstance(node, nodes.Extension) and _GLOBAL_FLAGS.fullmatch(node.prefix):
+            return True
+        stack.extend(node.children())
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _without_captures(node: nodes.Node) -> nodes.Node:
+    """Turns every group of a tree into a non-capturing one, so rules can't collide on group names."""
+    if isinstance(node, nodes.Group) and (node.capturing or node.name is not None):
+        return nodes.Group(_without_captures(node.child), capturing=False)
+    return node.map_children(_without_captures)
+
+
+class _Shard(t.NamedTuple):
+    #: The rule names, in the order of their tags.
+    names: t.Tuple[str, ...]
+    #: The combined pattern, or the rule itself for a shard of its own.
+    pattern: RegexPattern
+    #: Whether the shard is a single rule that kept its groups.
+    alone: bool
+    #: The literals each rule needs, by type of text, see :func:`~regexfactory.prefilter.required_literals`.
+    literals: t.Tuple[t.Dict[type, t.Tuple[t.Any, ...]], ...]
+
+
+class PatternSet:
+    """
+    A set of named rules, combined into as few patterns as possible so that
+    :meth:`matches` finds every rule that matches anywhere in a text in about one scan per shard.
+
+    Each combined pattern first looks ahead for any of the rules,
+    then tags the rules matching at that position with a :class:`~regexfactory.patterns.NamedGroup`,
+    so all of them are reported, not just the first alternative.
+    Rules are split into shards of at most :code:`shard_size` rules.
+    Rules that use references to their own groups or inline flags get a shard of their own,
+    and so do rules starting with literal text, which :mod:`re` skips to faster on its own
+    than a combined pattern can.
+
+    :param rules: A mapping, or pairs, of rule names and patterns.
+    :param flags: Flags to compile every shard with.
+    :param shard_size: The maximum number of rules combined into one pattern.
+    """
+
+    def __init__(
+        self,
+        rules: t.Union[
+            t.Mapping[str, ValidPatternType], t.Iterable[t.Tuple[str, ValidPatternType]]
+        ],
+        *,
+        flags: int = 0,
+        shard_size: int = 64,
+    ) -> None:
+        if shard_size < 1:
+            raise ValueError("shard_size must be a positive integer.")
+        items = list(rules.items() if isinstance(rules, t.Mapping) else rules)
+        names = [name for name, _ in items]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique.")
+        self.flags = flags
+        self.rules: t.Dict[str, RegexPattern] = {
+            name: RegexPattern(rule) for name, rule in items
+        }
+        self._shards: t.List[_Shard] = []
+        batch: t.List[t.Tuple[str, nodes.Node]] = []
+        for name, rule in self.rules.items():
+            node = structured_node(rule)
+            if _needs_own_shard(node) or _leading_text(node):
+                self._shards.append(
+                    _Shard((name,), rule, True, (_literals_by_type(rule),))
+                )
+                continue
+            batch.append((name, _without_captures(node)))
+            if len(batch) == shard_size:
+                self._shards.append(self._combine(batch))
+                batch = []
+        if batch:
+            self._shards.append(self._combine(batch))
+
+    @staticmethod
+    def _combine(batch: t.List[t.Tuple[str, nodes.Node]]) -> _Shard:
+        rules = [RegexPattern(node) for _, node in batch]
+        tags = [
+            Optional(IfAhead(NamedGroup(f"_{index}", rule)))
+            for index, rule in enumerate(rules)
+        ]
+        pattern = join(IfAhead(Or(*rules)), *tags)
+        literals = tuple(map(_literals_by_type, rules))
+        return _Shard(tuple(name for name, _ in batch), pattern, False, literals)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.rules)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.rules
+
+    def __repr__(self) -> str:
+        return f"<PatternSet {len(self.rules)} rules in {len(self._shards)} shards>"
+
+    @property
+    def shards(self) -> t.List[RegexPattern]:
+        """The patterns the rules were combined into."""
+        return [shard.pattern for shard in self._shards]
+
+    def _candidates(self, shard: _Shard, content: ContentType) -> t.List[str]:
+        """Returns the rules of a shard whose required literals are all in :code:`content`."""
+        if self.flags & _UNFILTERED_FLAGS:
+            return list(shard.names)
+        return [
+            name
+            for name, literals in zip(shard.names, shard.literals)
+            if all(literal in content for literal in literals.get(type(content), ()))
+        ]
+
+    def _search(self, name: str, content: ContentType, pos: int = 0) -> bool:
+        compiled = self.rules[name].compile(
+            flags=self.flags, binary=not isinstance(content, str)
+        )
+        return compiled.search(content, pos) is not None
+
+    def matches(self, content: ContentType, /) -> t.List[str]:
+        """
+        Returns the names of the rules that match anywhere in :code:`content`, in the order they were given.
+
+        Rules missing a literal they need, see :func:`~regexfactory.prefilter.required_literals`, are left out first.
+        The others are found with one scan of their shard, until it stops at a position where only rules
+        already found match, like a rule matching every word would.
+        The rules left are then searched for one by one from there, so found rules are never scanned for again.
+        """
+        found: t.Set[str] = set()
+        for shard in self._shards:
+            candidates = self._candidates(shard, content)
+            if shard.alone or len(candidates) < 2:
+                found.update(name for name in candidates if self._search(name, content))
+                continue
+            compiled = shard.pattern.compile(
+                flags=self.flags, binary=not isinstance(content, str)
+            )
+            tags = {f"_{index}": name for index, name in enumerate(shard.names)}
+            missing = set(candidates)
+            for match in compiled.finditer(content):
+                hits = {
+                    tags[tag]
+                    for tag, value in match.groupdict().items()
+                    if value is not None
+                }
+                if hits & missing:
+                    found |= hits
+                    missing -= hits
+                    if not missing:
+                        break
+                    continue
+                start = match.start() + 1
+                found.update(
+                    name for name in missing if self._search(name, content, start)
+                )
+                break
+        return [name for name in self.rules if name in found]
+
+    def test(self, content: ContentType, /) -> bool:
+        """Returns whether any of the rules matches anywhere in :code:`content`."""
+        return any(
+            self._candidates(shard, content)
+            and shard.pattern.search(content, flags=self.flags) is not None
+            for shard in self._shards
+        )
+
+    def matches_many(
+        self, contents: t.Iterable[ContentType], /
+    ) -> t.Iterator[t.List[str]]:
+        """Lazily calls :meth:`matches` on every string of an iterable."""
+        return map(self.matches, contents)
@@ -0,0 +1,313 @@
+"""
+Prefilters
+**********
+
+Module for the analyses that let searches rule out a text without running the regex.
+
+:func:`required_literals` finds pieces of text every match of a pattern contains,
+like :code:`"://"` in a URL pattern.
+:meth:`RegexPattern.search`, :meth:`RegexPattern.findall`, :meth:`RegexPattern.test`
+and their :code:`*_many` versions first check that the text holds all of them,
+with the substring search of :class:`str` and :class:`bytes`,
+and skip the regex engine when one is missing, which on most texts is much faster than searching.
+The prefilter is off for the :data:`re.IGNORECASE`, :data:`re.VERBOSE` and :data:`re.LOCALE` flags.
+
+:func:`first_chars` finds the few characters every match starts with, if there are few enough
+and the pattern doesn't start with literal text.
+On texts of a few hundred characters or more, :meth:`RegexPattern.search`,
+:meth:`RegexPattern.test` and :meth:`RegexPattern.finditer` jump from one of them to the next
+with :meth:`str.find`, and only try to match there.
+The regex engine already skips ahead to literal text by itself,
+this helps patterns starting with a repetition, an alternation, a class or a lookahead,
+which it tries at every position.
+When the characters turn out to be frequent, the rest of the text is left to the regex engine.
+Matches found this way have the position they were tried at as :attr:`re.Match.pos`.
+
+:func:`leading_anchor` finds patterns anchored at the start of the text,
+which :meth:`RegexPattern.search` and :meth:`RegexPattern.test` try to match there only.
+
+Regex strings are only understood when they are plain text.
+Others, like :code:`"[a-z]+"`, may change how the regex around them reads,
+so patterns with any outside of a group have no required literals.
+Build them with combinators or :meth:`RegexPattern.parse` instead.
+
+.. exec_code::
+
+    from regexfactory import DIGIT, WORD, Multi, Set, escape
+    from regexfactory.prefilter import first_chars, required_literals
+
+    url = Multi(WORD) + escape("://") + Multi(WORD) + escape(".com")
+    print(required_literals(url))
+    print(url.test("no link in here"))
+
+    number = Multi(Set("+", "-") + Multi(DIGIT))
+    print(first_chars(number), number.search("x" * 1000 + "-12"))
+
+"""
+
+import os
+import typing as t
+
+from . import nodes
+from .pattern import RegexPattern
+from .patterns import _plain_text
+
+#: The most characters :func:`first_chars` returns, patterns starting with more aren't jumped through.
+MAX_FIRST_CHARS = 8
+
+
+class _Opaque(Exception):
+    """Raised for regex strings that may change how the regex around them reads."""
+
+
+def _text(  # pylint: disable=too-many-return-statements
+    node: nodes.Node,
+) -> t.Optional[str]:
+    """Returns the only text a node matches, if there is just one."""
+    if isinstance(node, nodes.Literal):
+        return node.text
+    if isinstance(node, nodes.Raw):
+        return _plain_text(node.text)
+    if isinstance(node, nodes.Group):
+        return _text(node.child)
+    if isinstance(node, nodes.Concat):
+        texts = [_text(item) for item in node.flatten()]
+        return None if None in texts else "".join(t.cast(t.List[str], texts))
+    if isinstance(node, nodes.Repeat) and node.min == node.max:
+        text = _text(node.child)
+        if text is None or isinstance(node.child, nodes.Raw) and len(text) != 1:
+            # Regex strings aren't grouped, the quantifier only repeats their last character.
+            return None
+        return text * node.min
+    return None
+
+
+def _case_sensitive(node: nodes.Node, letters: str = "ixL") -> bool:
+    """
+    Returns whether the tree has no inline flags for case-insensitive, verbose or locale matching,
+    or the other flags of :code:`letters`.
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, nodes.Extension) and any(
+            letter in item.prefix for letter in letters
+        ):
+            return False
+        if isinstance(item, nodes.Raw) and "(?" in item.text:
+            return False
+        stack.extend(item.children())
+    return True
+
+
+def _required(  # pylint: disable=too-many-return-statements
+    node: nodes.Node,
+) -> t.Set[str]:
+    """Returns texts every match of the node contains."""
+    text = _text(node)
+    if text is not None:
+        return {text} if text else set()
+    if isinstance(node, nodes.Raw):
+        raise _Opaque
+    if isinstance(node, nodes.Concat):
+        return _concat_required(node)
+    if isinstance(node, nodes.Alternation):
+        branches = [_required(item) for item in node.items]
+        return set.intersection(*branches) if branches else set()
+    if isinstance(node, nodes.Repeat):
+        if isinstance(node.child, nodes.Raw) and not _plain_text(node.child.text):
+            # Regex strings aren't grouped, so the quantifier may apply to part of them,
+            # or to whatever comes before them if they are empty.
+            raise _Opaque
+        return _required(node.child) if node.min else set()
+    if isinstance(node, nodes.Lookaround) and node.negative:
+        return set()
+    if isinstance(node, (nodes.Group, nodes.Lookaround, nodes.Extension)):
+        # Regex strings inside parentheses can't change how the regex around them reads.
+        try:
+            return _required(node.child)
+        except _Opaque:
+            return set()
+    return set()
+
+
+def _concat_required(node: nodes.Concat) -> t.Set[str]:
+    """Returns the runs of consecutive literal text of a concatenation, and what its other items need."""
+    required: t.Set[str] = set()
+    run: t.List[str] = []
+    for item in node.flatten():
+        text = _text(item)
+        if text is not None:
+            run.append(text)
+            continue
+        required.add("".join(run))
+        run = []
+        required |= _required(item)
+    required.add("".join(run))
+    required.discard("")
+    return required
+
+
+def required_literals(pattern: RegexPattern, /) -> t.Tuple[str, ...]:
+    """
+    Returns pieces of text every match of the pattern contains, longest first,
+    leaving out those contained in longer ones.
+    Lookaheads and lookbehinds count, their text is in the searched text too.
+    Returns none if the pattern has regex strings that aren't plain text outside of groups,
+    or inline flags for case-insensitive, verbose or locale matching.
+    """
+    if not _case_sensitive(pattern.node):
+        return ()
+    try:
+        found = _required(pattern.node)
+    except _Opaque:
+        return ()
+    literals: t.List[str] = []
+    for literal in sorted(found, key=len, reverse=True):
+        if not any(literal in longer for longer in literals):
+            literals.append(literal)
+    return tuple(literals)
+
+
+def _readable(node: nodes.Node) -> bool:
+    """Returns whether the tree has no regex strings that may change how the regex around them reads."""
+    try:
+        _required(node)
+    except _Opaque:
+        return False
+    return True
+
+
+# The characters matches of a node may start with, and whether it can match the empty string,
+# or None if they may start with too many.
+_First = t.Optional[t.Tuple[t.FrozenSet[str], bool]]
+
+_EMPTY: _First = (frozenset(), True)
+
+
+def _class_chars(node: nodes.CharClass) -> t.Optional[t.FrozenSet[str]]:
+    """Returns the characters of a class, if it lists few enough."""
+    charset = node.charset
+    if charset.negated or charset.escapes or charset.raw:
+        return None
+    if sum(high - low + 1 for low, high in charset.intervals) > MAX_FIRST_CHARS:
+        return None
+    return frozenset(
+        chr(code) for low, high in charset.intervals for code in range(low, high + 1)
+    )
+
+
+def _first(  # pylint: disable=too-many-return-statements,too-many-branches
+    node: nodes.Node,
+) -> _First:
+    """Returns the characters matches of the node may start with, and whether it can match nothing."""
+    text = _text(node)
+    if text is not None:
+        return (frozenset(text[:1]), False) if text else _EMPTY
+    if isinstance(node, nodes.Raw):
+        raise _Opaque
+    if isinstance(node, nodes.CharClass):
+        chars = _class_chars(node)
+        return None if chars is None else (chars, False)
+    if isinstance(node, (nodes.Anchor, nodes.Lookaround, nodes.Comment)):
+        return _EMPTY
+    if isinstance(node, nodes.Concat):
+        found: t.Set[str] = set()
+        for item in node.flatten():
+            first = _first(item)
+            if first is None:
+                return None
+            found |= first[0]
+            if not first[1]:
+                return frozenset(found), False
+        return frozenset(found), True
+    if isinstance(node, nodes.Alternation):
+        found = set()
+        nullable = not node.items
+        for item in node.items:
+            first = _first(item)
+            if first is None:
+                return None
+            found |= first[0]
+            nullable = nullable or first[1]
+        return frozenset(found), nullable
+    if isinstance(node, nodes.Repeat):
+        if isinstance(node.child, nodes.Raw) and not _plain_text(node.child.text):
+            # Regex strings aren't grouped, so the quantifier may apply to part of them,
+            # or to whatever comes before them if they are empty.
+            raise _Opaque
+        if node.max == 0:
+            return _EMPTY
+        first = _first(node.child)
+        return None if first is None else (first[0], first[1] or not node.min)
+    if isinstance(node, (nodes.Group, nodes.Extension)):
+        try:
+            return _first(node.child)
+        except _Opaque:
+            return None
+    return None
+
+
+def _leading_text(node: nodes.Node) -> str:
+    """Returns the text every match of the node starts with, which the regex engine skips to by itself."""
+    text = _text(node)
+    if text is not None:
+        return text
+    if isinstance(node, nodes.Group):
+        return _leading_text(node.child)
+    if isinstance(node, nodes.Concat):
+        return _leading_text(next(node.flatten(), nodes.Raw("")))
+    if isinstance(node, nodes.Alternation) and node.items:
+        return os.path.commonprefix([_leading_text(item) for item in node.items])
+    return ""
+
+
+def first_chars(pattern: RegexPattern, /) -> t.Optional[str]:
+    """
+    Returns the characters every match of the pattern starts with, sorted,
+    or :code:`None` if there are more than :data:`MAX_FIRST_CHARS`, if the pattern can match the empty string,
+    or if it starts with literal text, which the regex engine already skips to,
+    if it has regex strings that aren't plain text outside of groups,
+    or inline flags for case-insensitive, verbose or locale matching.
+    """
+    if not _case_sensitive(pattern.node) or not _readable(pattern.node):
+        return None
+    try:
+        first = _first(pattern.node)
+    except _Opaque:
+        return None
+    if first is None or first[1] or len(first[0]) > MAX_FIRST_CHARS:
+        return None
+    if _leading_text(pattern.node):
+        return None
+    return "".join(sorted(first[0]))
+
+
+def _anchor(node: nodes.Node) -> t.Optional[str]:
+    """Returns the anchor every match of the node starts with, :code:`\\A` or :code:`^`."""
+    if isinstance(node, nodes.Anchor):
+        return node.symbol if node.symbol in ("\\A", "^") else None
+    if isinstance(node, nodes.Group):
+        return _anchor(node.child)
+    if isinstance(node, nodes.Concat):
+        return _anchor(next(node.flatten(), nodes.Raw("")))
+    if isinstance(node, nodes.Alternation):
+        anchors = {_anchor(item) for item in node.items}
+        return anchors.pop() if len(anchors) == 1 else None
+    return None
+
+
+def leading_anchor(pattern: RegexPattern, /) -> t.Optional[str]:
+    """
+    Returns :code:`\\A` if every match of the pattern starts with it,
+    or :code:`^` if they all start with it and the pattern has no inline multiline flag,
+    so that they can only match at the start of the text unless compiled with :data:`re.MULTILINE`.
+    Returns :code:`None` for other patterns, and for those that have regex strings
+    that aren't plain text outside of groups.
+    """
+    anchor = _anchor(pattern.node)
+    if anchor is None or not _readable(pattern.node):
+        return None
+    if anchor == "^" and not _case_sensitive(pattern.node, "m"):
+        return None
+    return anchor
@@ -0,0 +1,469 @@
+"""
+Streaming
+*********
+
+Module for :meth:`RegexPattern.finditer_stream`, which finds matches in text too large to hold in memory,
+like multi-gigabyte logs, by reading it in chunks.
+
+The scanner keeps just enough of the text read so far to never miss or repeat a match:
+a match is only reported once the text after its start is long enough to hold
+everything the pattern can look at, its *reach*, computed from the pattern's structure.
+Patterns with unbounded repetitions, like :code:`Multi(DIGIT)`, can match arbitrarily long text,
+so they need a bound given with :code:`max_width`.
+Matches are :class:`OffsetMatch` objects whose offsets count from the start of the stream.
+
+.. exec_code::
+
+    import io
+    from regexfactory import DIGIT, Amount
+
+    log = io.StringIO("id=12 id=345 id=6789")
+    for match in Amount(DIGIT, 1, 4).finditer_stream(log, chunk_size=4):
+        print(match.span(), match.group())
+
+:meth:`RegexPattern.afinditer` does the same for :mod:`asyncio` readers and async iterables.
+:class:`StreamScanner` is the reading-agnostic core, for sources that aren't file objects.
+
+"""
+
+import asyncio
+import concurrent.futures
+import re
+import typing as t
+from functools import lru_cache
+from re import Match, Pattern
+
+from . import nodes
+from .parser import parse, structured_node
+from .pattern import RegexPattern
+
+# How far past their position zero-width assertions look, to tell apart the end of the text.
+_ANCHOR_REACH = {"$": 2, r"\Z": 1, r"\b": 1, r"\B": 1}
+
+
+def _add(first: t.Optional[int], second: t.Optional[int]) -> t.Optional[int]:
+    return None if first is None or second is None else first + second
+
+
+def _max(values: t.Iterable[t.Optional[int]]) -> t.Optional[int]:
+    values = list(values)
+    return None if None in values else max(t.cast(t.List[int], values), default=0)
+
+
+@lru_cache(maxsize=4096)
+def _furthest(  # pylint: disable=too-many-return-statements
+    node: nodes.Node,
+) -> t.Optional[int]:
+    """Returns the furthest character a node looks at, relative to where it starts."""
+    if isinstance(node, nodes.Anchor):
+        return _ANCHOR_REACH.get(node.symbol, 0)
+    if isinstance(node, nodes.Concat):
+        width: t.Optional[int] = 0
+        furthest: t.Optional[int] = 0
+        for item in node.flatten():
+            furthest = _max([furthest, _add(width, _furthest(item))])
+            width = _add(width, item.width()[1])
+        return furthest
+    if isinstance(node, (nodes.Alternation, nodes.Conditional)):
+        return _max(_furthest(child) for child in node.children())
+    if isinstance(node, nodes.Repeat):
+        return _repeat_furthest(node)
+    if isinstance(node, nodes.Lookaround):
+        furthest = _furthest(node.child)
+        if node.ahead:
+            return furthest
+        # Lookbehinds have a fixed width and end where they are.
+        width = node.child.width()[1]
+        return None if furthest is None or width is None else furthest - width
+    if isinstance(node, (nodes.Group, nodes.Extension)):
+        return _furthest(node.child)
+    # Everything else only looks at the text it matches.
+    return node.width()[1]
+
+
+def _repeat_furthest(node: nodes.Repeat) -> t.Optional[int]:
+    width = node.child.width()[1]
+    furthest = _furthest(node.child)
+    if node.max == 0:
+        return 0
+    if width == 0:
+        return furthest
+    if node.max is None or width is None or furthest is None:
+        return None
+    return width * (node.max - 1) + furthest
+
+
+def _lookbehind(node: nodes.Node) -> int:
+    """Returns the width of the widest lookbehind in a tree."""
+    widest = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, nodes.Lookaround) and not node.ahead:
+            widest = max(widest, node.child.width()[1] or 0)
+        stack.extend(node.children())
+    return widest
+
+
+def reach(pattern: RegexPattern, /, *, flags: int = 0) -> t.Optional[int]:
+    """
+    Returns how many characters past the start of a match the pattern can look at,
+    counting its lookaheads and what assertions like :code:`$` need to see,
+    or :code:`None` if it is unbounded.
+
+    .. exec_code::
+
+        from regexfactory import DIGIT, Amount, IfAhead, Multi
+        from regexfactory.stream import reach
+
+        print(reach(Amount(DIGIT, 2, 5) + IfAhead("px")))
+        print(reach(Multi(DIGIT)))
+
+    """
+    return _furthest(_stream_node(pattern, flags))
+
+
+def _stream_node(pattern: RegexPattern, flags: int) -> nodes.Node:
+    if flags & re.VERBOSE:
+        return parse(pattern.compile(flags=flags)).node
+    return structured_node(pattern)
+
+
+def context(
+    pattern: RegexPattern, /, *, max_width: t.Optional[int] = None, flags: int = 0
+) -> t.Tuple[int, int]:
+    """
+    Returns how many characters a scan must keep before a position, for lookbehinds and assertions,
+    and after the start of a match for the match to be final, its :func:`reach`.
+    :code:`max_width` stands in for the reach when it is unbounded.
+
+    :raises ValueError: If the reach is unbounded and no :code:`max_width` is given.
+    """
+    node = _stream_node(pattern, flags)
+    ahead = _furthest(node)
+    if ahead is None:
+        if max_width is None:
+            raise ValueError(
+                f"Matches of {pattern.regex!r} have no maximum width, pass max_width."
+            )
+        ahead = max_width
+    return _lookbehind(node) + 1, ahead
+
+
+# (text, offset of the text, position to start scanning at, last position a match may start at)
+_Task = t.Tuple[t.Any, int, int, int]
+
+
+class OffsetMatch:
+    """
+    A snapshot of a :class:`re.Match` found in part of a larger text,
+    with the same accessors but offsets that count from the start of the whole text.
+    Unlike :class:`re.Match` it can be pickled, and it doesn't keep the text it was found in.
+    """
+
+    __slots__ = ("re", "lastindex", "lastgroup", "_groups", "_spans")
+
+    #: The compiled pattern that found the match.
+    re: Pattern
+    #: See :attr:`re.Match.lastindex`.
+    lastindex: t.Optional[int]
+    #: See :attr:`re.Match.lastgroup`.
+    lastgroup: t.Optional[str]
+
+    _groups: t.Tuple[t.Any, ...]
+    _spans: t.Tuple[t.Tuple[int, int], ...]
+
+    def __init__(self, match: Match, offset: int = 0) -> None:
+        self.re = match.re
+        self.lastindex = match.lastindex
+        self.lastgroup = match.lastgroup
+        self._groups = (match.group(0),) + match.groups()
+        self._spans = tuple(
+            (start + offset, end + offset) if start >= 0 else (start, end)
+            for start, end in map(match.span, range(len(self._groups)))
+        )
+
+    def _index(self, group: t.Union[int, str]) -> int:
+        index = (
+            self.re.groupindex.get(group, group) if isinstance(group, str) else group
+        )
+        if not isinstance(index, int) or not 0 <= index < len(self._groups):
+            raise IndexError("no such group")
+        return index
+
+    def group(self, *groups: t.Union[int, str]) -> t.Any:
+        """See :meth:`re.Match.group`."""
+        if len(groups) <= 1:
+            return self._groups[self._index(groups[0] if groups else 0)]
+        return tuple(self._groups[self._index(group)] for group in groups)
+
+    def __getitem__(self, group: t.Union[int, str]) -> t.Any:
+        return self._groups[self._index(group)]
+
+    def groups(self, default: t.Any = None) -> t.Tuple[t.Any, ...]:
+        """See :meth:`re.Match.groups`."""
+        return tuple(default if group is None else group for group in self._groups[1:])
+
+    def groupdict(self, default: t.Any = None) -> t.Dict[str, t.Any]:
+        """See :meth:`re.Match.groupdict`."""
+        return {
+            name: default if self._groups[index] is None else self._groups[index]
+            for name, index in self.re.groupindex.items()
+        }
+
+    def span(self, group: t.Union[int, str] = 0) -> t.Tuple[int, int]:
+        """See :meth:`re.Match.span`."""
+        return self._spans[self._index(group)]
+
+    def start(self, group: t.Union[int, str] = 0) -> int:
+        """See :meth:`re.Match.start`."""
+        return self.span(group)[0]
+
+    def end(self, group: t.Union[int, str] = 0) -> int:
+        """See :meth:`re.Match.end`."""
+        return self.span(group)[1]
+
+    def __eq__(self, other: t.Any) -> bool:
+        if not isinstance(other, OffsetMatch):
+            return NotImplemented
+        return (self.re, self._groups, self._spans) == (
+            other.re,
+            other._groups,
+            other._spans,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.re, self._groups, self._spans))
+
+    def __repr__(self) -> str:
+        return f"<OffsetMatch object; span={self.span()!r}, match={self.group()!r}>"
+
+
+def _find(compiled: t.Optional[Pattern], task: _Task) -> t.List[OffsetMatch]:
+    """Returns the matches of a task, top-level so that it can run in other processes."""
+    assert compiled is not None
+    text, offset, position, limit = task
+    matches = []
+    for match in compiled.finditer(text, position):
+        if match.start() > limit:
+            break
+        matches.append(OffsetMatch(match, offset))
+    return matches
+
+
+class StreamScanner:  # pylint: disable=too-many-instance-attributes
+    """
+    Finds the matches of a pattern in text fed to it piece by piece,
+    the same as :meth:`re.Pattern.finditer` would on the whole text.
+    It does no reading itself, :meth:`feed` it chunks and :meth:`close` it at the end of the text.
+
+    :param pattern: The pattern to look for.
+    :param max_width: How many characters past its start a match can look at,
+        only used if the pattern's :func:`reach` is unbounded.
+        Matches longer than that may be cut short or missed.
+    :param flags: Flags to compile the pattern with.
+    :raises ValueError: If the pattern's reach is unbounded and no :code:`max_width` is given.
+    """
+
+    def __init__(
+        self,
+        pattern: RegexPattern,
+        /,
+        *,
+        max_width: t.Optional[int] = None,
+        flags: int = 0,
+    ) -> None:
+        behind, ahead = context(pattern, max_width=max_width, flags=flags)
+        #: The compiled pattern, for text or bytes depending on the first chunk.
+        self.compiled: t.Optional[Pattern] = None
+        self._pattern = pattern
+        self._flags = flags
+        #: How much text must follow a match start for the match to be final.
+        self.ahead = ahead
+        #: How much text before the scan position is kept for lookbehinds and assertions.
+        self.behind = behind
+        self._buffer: t.Any = ""
+        # The position of the buffer in the whole text, and where scanning resumes in the buffer.
+        self._offset = 0
+        self._position = 0
+        self._closed = False
+
+    def feed(self, chunk: t.Union[str, bytes], /) -> t.List[OffsetMatch]:
+        """
+        Adds the next chunk of text, and returns the matches that can't change anymore.
+        Chunks may also be bytes, or any other binary content, as long as they all are.
+        """
+        self._add(chunk)
+        return self._scan(final=False)
+
+    def close(self) -> t.List[OffsetMatch]:
+        """Marks the end of the text, and returns the remaining matches."""
+        if self._closed:
+            return []
+        self._end()
+        return self._scan(final=True)
+
+    async def afeed(
+        self,
+        chunk: t.Union[str, bytes],
+        /,
+        *,
+        executor: t.Optional[concurrent.futures.Executor] = None,
+        offload_size: int = 1 << 14,
+    ) -> t.List[OffsetMatch]:
+        """
+        Like :meth:`feed`, but scans text of at least :code:`offload_size` characters in :code:`executor`,
+        so the event loop isn't blocked while :mod:`re` works.
+        Since :mod:`re` holds the GIL, only a :class:`~concurrent.futures.ProcessPoolExecutor`
+        lets the event loop run meanwhile.
+        """
+        self._add(chunk)
+        return await self._ascan(False, executor, offload_size)
+
+    async def aclose(
+        self,
+        *,
+        executor: t.Optional[concurrent.futures.Executor] = None,
+        offload_size: int = 1 << 14,
+    ) -> t.List[OffsetMatch]:
+        """Like :meth:`close`, see :meth:`afeed`."""
+        if self._closed:
+            return []
+        self._end()
+        return await self._ascan(True, executor, offload_size)
+
+    def _add(self, chunk: t.Union[str, bytes]) -> None:
+        if self._closed:
+            raise ValueError("Can't feed a closed scanner.")
+        if self.compiled is None:
+            self._start(binary=not isinstance(chunk, str))
+        self._buffer += chunk
+
+    def _end(self) -> None:
+        self._closed = True
+        if self.compiled is None:
+            self._start(binary=False)
+
+    def _start(self, binary: bool) -> None:
+        self.compiled = self._pattern.compile(flags=self._flags, binary=binary)
+        self._buffer = b"" if binary else ""
+
+    def _task(self, final: bool) -> t.Optional[_Task]:
+        """Returns what is left to scan, unless more text is needed first."""
+        # Matches starting after the limit could still change with more text.
+        limit = len(self._buffer) if final else len(self._buffer) - self.ahead
+        if self._position > limit:
+            return None
+        return self._buffer, self._offset, self._position, limit
+
+    def _scan(self, final: bool) -> t.List[OffsetMatch]:
+        task = self._task(final)
+        if task is None:
+            return []
+        return self._advance(task, _find(self.compiled, task))
+
+    async def _ascan(
+        self,
+        final: bool,
+        executor: t.Optional[concurrent.futures.Executor],
+        offload_size: int,
+    ) -> t.List[OffsetMatch]:
+        task = self._task(final)
+        if task is None:
+            return []
+        if executor is None or len(task[0]) - task[2] < offload_size:
+            return self._advance(task, _find(self.compiled, task))
+        matches = await asyncio.get_running_loop().run_in_executor(
+            executor, _find, self.compiled, task
+        )
+        return self._advance(task, matches)
+
+    def _advance(
+        self, task: _Task, matches: t.List[OffsetMatch]
+    ) -> t.List[OffsetMatch]:
+        """Moves past the scanned text, keeping only what the next scan needs."""
+        buffer, offset, position, limit = task
+        if matches:
+            position = matches[-1].end() - offset
+        # Every position up to the limit has been tried.
+        position = max(position, limit + 1)
+        cut = position - self.behind
+        if cut > 0:
+            buffer = buffer[cut:]
+            offset += cut
+            position -= cut
+        if self._closed:
+            buffer = buffer[:0]
+        self._buffer, self._offset, self._position = buffer, offset, position
+        return matches
+
+
+def finditer_stream(
+    pattern: RegexPattern,
+    fileobj: t.Any,
+    /,
+    chunk_size: int = 1 << 16,
+    *,
+    max_width: t.Optional[int] = None,
+    flags: int = 0,
+) -> t.Iterator[OffsetMatch]:
+    """Implements :meth:`RegexPattern.finditer_stream`."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+    # Built here rather than in the generator, so errors are raised right away.
+    scanner = StreamScanner(pattern, max_width=max_width, flags=flags)
+    return _read(scanner, fileobj, chunk_size)
+
+
+def _read(
+    scanner: StreamScanner, fileobj: t.Any, chunk_size: int
+) -> t.Iterator[OffsetMatch]:
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield from scanner.feed(chunk)
+    yield from scanner.close()
+
+
+def afinditer(
+    pattern: RegexPattern,
+    source: t.Any,
+    /,
+    chunk_size: int = 1 << 16,
+    *,
+    max_width: t.Optional[int] = None,
+    flags: int = 0,
+    executor: t.Optional[concurrent.futures.Executor] = None,
+    offload_size: int = 1 << 14,
+) -> t.AsyncIterator[OffsetMatch]:
+    """Implements :meth:`RegexPattern.afinditer`."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+    scanner = StreamScanner(pattern, max_width=max_width, flags=flags)
+    if hasattr(source, "read"):
+        source = _areader(source, chunk_size)
+    return _aread(scanner, source, executor, offload_size)
+
+
+async def _areader(reader: t.Any, chunk_size: int) -> t.AsyncIterator[t.Any]:
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _aread(
+    scanner: StreamScanner,
+    chunks: t.AsyncIterable[t.Any],
+    executor: t.Optional[concurrent.futures.Executor],
+    offload_size: int,
+) -> t.AsyncIterator[OffsetMatch]:
+    async for chunk in chunks:
+        for match in await scanner.afeed(
+            chunk, executor=executor, offload_size=offload_size
+        ):
+            yield match
+    for match in await scanner.aclose(executor=executor, offload_size=offload_size):
+        yield match
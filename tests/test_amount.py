@@ -36,7 +36,9 @@ def test_amount_single_count(word, count):
         provided the regex will be of the form word{count}.
     """
     actual = Amount(word, i=count, or_more=False)
-    assert actual.regex == "{word}{{{count}}}".format(word=word, count=str(count))
+    assert actual.render(optimize=False) == "{word}{{{count}}}".format(
+        word=word, count=str(count)
+    )
 
 
 @pytest.mark.patterns
@@ -57,7 +59,7 @@ def test_amount_lower_upper(word, bound: range):
     expected = "{word}{{{lower},{upper}}}".format(
         word=word, lower=str(bound.start), upper=str(bound.stop)
     )
-    assert actual.regex == expected
+    assert actual.render(optimize=False) == expected
 
 
 @pytest.mark.patterns
@@ -68,7 +70,9 @@ def test_amount_or_more(word, count):
         provided the regex will be of the form word{count,}.
     """
     actual = Amount(word, count, or_more=True)
-    assert actual.regex == "{word}{{{count},}}".format(word=word, count=str(count))
+    assert actual.render(optimize=False) == "{word}{{{count},}}".format(
+        word=word, count=str(count)
+    )
 
 
 @pytest.mark.patterns
@@ -86,4 +90,4 @@ def test_amount_non_greedy(amt):
     """
     Test to ensure that instances of Amount with greedy as False will end with "?"
     """
-    assert amt.regex.endswith("?")
+    assert amt.render(optimize=False).endswith("?")
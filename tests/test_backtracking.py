@@ -0,0 +1,116 @@
+import re
+
+import pytest
+
+from regexfactory import (
+    DIGIT,
+    WHITESPACE,
+    WORD,
+    Amount,
+    Group,
+    Multi,
+    NotSet,
+    Optional,
+    Or,
+    Range,
+    RegexPattern,
+    Set,
+    escape,
+)
+from regexfactory.backtracking import (
+    CatastrophicBacktrackingError,
+    Severity,
+    set_strict_mode,
+    strict_mode,
+)
+
+url = (
+    Amount(Range("a", "z"), 1, or_more=True)
+    + "://"
+    + Amount(Set(WORD, DIGIT, "."), 1, or_more=True)
+    + Optional(Group(RegexPattern(":") + Amount(DIGIT, 1, or_more=True)))
+    + Amount(
+        Group(
+            RegexPattern("/")
+            + Group(Amount(NotSet("/", "#", "?", "&", WHITESPACE), 0, or_more=True))
+        ),
+        0,
+        or_more=True,
+    )
+)
+
+
+@pytest.mark.backtracking
+@pytest.mark.parametrize(
+    "pattern, severity, culprit",
+    [
+        (Multi(Multi(WORD) + Optional("-")), Severity.EXPONENTIAL, r"(?:\w+\-?)+"),
+        (
+            Amount(Or("a", "aa"), 1, or_more=True) + "b",
+            Severity.EXPONENTIAL,
+            "(?:aa??)+",
+        ),
+        (Multi(Or(WORD, DIGIT + "x")), Severity.EXPONENTIAL, r"(?:\w|\dx)+"),
+        (RegexPattern("x(a*)*b"), Severity.EXPONENTIAL, "(a*)*"),
+        (RegexPattern(r"^(\w+\s?)*$"), Severity.EXPONENTIAL, r"(\w+\s?)*"),
+        (Multi(DIGIT) + Multi(WORD), Severity.POLYNOMIAL, r"\d+\w+"),
+        (RegexPattern("a.*.*=.*"), Severity.POLYNOMIAL, "a.*=.*"),
+        (RegexPattern("(a|a)*b"), Severity.EXPONENTIAL, "(a|a)*"),
+        (RegexPattern("(a|ab|b)*c"), Severity.EXPONENTIAL, "(a|ab|b)*"),
+        (RegexPattern("(?:a{0,100})*b"), Severity.EXPONENTIAL, "(?:a{0,100})*"),
+    ],
+)
+def test_ambiguous_patterns(pattern, severity, culprit):
+    issues = pattern.analyze_backtracking()
+    assert [(issue.severity, issue.pattern.regex) for issue in issues] == [
+        (severity, culprit)
+    ]
+
+
+@pytest.mark.backtracking
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        url,
+        Multi(Multi(DIGIT) + ","),
+        Multi(DIGIT) + escape(".") + Multi(DIGIT),
+        RegexPattern(r"\s*\w+\s*$"),
+        RegexPattern("(?>a+)+b"),
+        Amount(Amount(DIGIT, 2), 3),
+        Multi(Multi(WORD)),
+        Or("Alice", "Alan", "Bob"),
+        Optional(Or(*(f"word{index}" for index in range(100)))),
+        Amount(Or(*(f"word{index}" for index in range(100))), 0, 3),
+    ],
+)
+def test_safe_patterns(pattern):
+    assert pattern.analyze_backtracking() == []
+
+
+@pytest.mark.backtracking
+def test_strict_mode():
+    Multi(Multi(WORD))
+    with strict_mode():
+        Multi(DIGIT) + Multi(WORD)
+        Multi(Multi(WORD))
+        with pytest.raises(CatastrophicBacktrackingError) as error:
+            Multi(Multi(WORD) + Optional("-"))
+        assert error.value.issues[0].severity is Severity.EXPONENTIAL
+        # Alternatives are analyzed as written, duplicates included.
+        with pytest.raises(CatastrophicBacktrackingError):
+            RegexPattern("(a|a)*b")
+        # Bounded repetitions never loop, however large.
+        Or(*(f"word{index}" for index in range(2000)))
+        # Not a valid regex on its own, so it isn't checked.
+        RegexPattern("(a+)+(")
+        # Comparing with a pattern that would be rejected doesn't build it.
+        assert Multi(DIGIT) != r"(\d+)+$"
+        assert Multi(DIGIT) == r"\d+"
+        assert Multi(DIGIT) == re.compile(r"\d+")
+    Multi(Multi(WORD))
+    previous = set_strict_mode(Severity.POLYNOMIAL)
+    try:
+        with pytest.raises(CatastrophicBacktrackingError):
+            Multi(DIGIT) + Multi(WORD)
+    finally:
+        set_strict_mode(previous)
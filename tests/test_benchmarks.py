@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+SCRIPT = os.path.join(ROOT, "benchmarks", "bench.py")
+
+
+def run(*arguments):
+    return subprocess.run(
+        [sys.executable, SCRIPT, "--quick", "--filter", "hex", *arguments],
+        capture_output=True,
+        text=True,
+        check=False,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+
+
+@pytest.mark.benchmarks
+def test_benchmarks_save_and_compare(tmp_path):
+    output = tmp_path / "results.json"
+    assert run("--output", str(output)).returncode == 0
+    document = json.loads(output.read_text())
+    assert document["environment"]["seed"] == 1234
+    results = document["results"]
+    assert set(results) == {
+        "construction.hex_codes",
+        "match.hex_findall",
+        "match.hex_dfa_search",
+    }
+    assert results["match.hex_findall"]["throughput"] > 0
+    assert results["construction.hex_codes"]["throughput"] is None
+
+    for result in results.values():
+        result["best"] *= 100
+    output.write_text(json.dumps(document))
+    assert run("--baseline", str(output)).returncode == 0
+    for result in results.values():
+        result["best"] /= 10_000
+    output.write_text(json.dumps(document))
+    slower = run("--baseline", str(output))
+    assert slower.returncode == 1 and "slower" in slower.stdout
@@ -0,0 +1,85 @@
+import io
+import mmap
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Amount,
+    Multi,
+    NotSet,
+    Optional,
+    Or,
+    PatternSet,
+    Range,
+    RegexPattern,
+    Set,
+    escape,
+)
+from regexfactory.pattern import encode_regex
+
+alphabet = "ab1 \xe9\xff.\n"
+
+leaves = st.one_of(
+    st.sampled_from([DIGIT, WORD, Range(b"a", b"f"), Set(b"\xe9", "."), NotSet("a")]),
+    st.text(alphabet=alphabet, min_size=1, max_size=3).map(escape),
+    st.binary(max_size=2).map(escape),
+)
+
+
+def extend(children):
+    return st.one_of(
+        st.lists(children, min_size=1, max_size=3).map(lambda items: Or(*items)),
+        st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+        children.map(Multi),
+        children.map(Optional),
+        children.map(lambda child: Amount(child, 1, 2)),
+    )
+
+
+@pytest.mark.pattern
+@given(st.recursive(leaves, extend, max_leaves=6), st.text(alphabet=alphabet))
+def test_bytes_match_like_text(pattern, text):
+    data = text.encode("latin-1")
+    expected = [match.span() for match in pattern.finditer(text, flags=re.ASCII)]
+    assert [match.span() for match in pattern.finditer(data)] == expected
+    assert [match.span() for match in pattern.finditer(bytearray(data))] == expected
+    assert pattern.test(memoryview(data)) == bool(expected)
+
+
+@pytest.mark.pattern
+def test_binary_content():
+    number = Multi(DIGIT)
+    assert number.compile(binary=True).pattern == rb"\d+"
+    assert number.compile() is not number.compile(binary=True)
+    with mmap.mmap(-1, 16) as mapped:
+        mapped.write(b"abc 123 def 45")
+        assert number.findall(mapped) == [b"123", b"45"]
+    assert number.sub(b"#", b"a12b3") == b"a#b#"
+    assert number.search_many([b"x", b"1"], output="mask") == bytearray([0, 1])
+    assert RegexPattern(re.compile(b"a+")) == RegexPattern("a+") == b"a+"
+    assert (b"x" + DIGIT).search(b"ax1").span() == (1, 3)
+    stream = io.BytesIO(b"id=12 id=345")
+    assert [m.group() for m in Amount(DIGIT, 1, 3).finditer_stream(stream, 4)] == [
+        b"12",
+        b"345",
+    ]
+    rules = PatternSet({"number": number, "word": Or(b"id", b"name")})
+    assert rules.matches(b"id 7") == ["number", "word"]
+
+
+@pytest.mark.pattern
+def test_encode_regex():
+    assert encode_regex(r"\d+") == rb"\d+"
+    assert encode_regex("\\u00e9[\\u0000-\\U0010ffff]") == rb"\xe9[\x00-\xff]"
+    assert encode_regex("[^\\n\\x80-\\U0010ffff]") == rb"[^\n\x80-\xff]"
+    not_a = Set(NotSet("a"))
+    assert not_a.regex.endswith("\\U0010ffff]")
+    assert [not_a.test(char) for char in (b"a", b"b", b"\xff")] == [False, True, True]
+    for regex in ("€", "\\u0100", "[-\\u0100]", "[\\u0100]"):
+        with pytest.raises(ValueError):
+            encode_regex(regex)
@@ -0,0 +1,69 @@
+import re
+import threading
+
+import pytest
+
+from regexfactory import CompileCache, RegexPattern
+from regexfactory.cache import COMPILE_CACHE
+
+
+@pytest.mark.cache
+def test_cache_hits_and_misses():
+    cache = CompileCache(maxsize=4)
+    first = cache.compile("a+")
+    assert cache.compile("a+") is first
+    assert cache.compile("a+", re.IGNORECASE) is not first
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+    assert info.compile_time >= 0
+
+
+@pytest.mark.cache
+def test_cache_evicts_least_recently_used():
+    cache = CompileCache(maxsize=2)
+    cache.compile("a")
+    cache.compile("b")
+    cache.compile("a")
+    cache.compile("c")
+    assert ("a", 0) in cache
+    assert ("b", 0) not in cache
+    assert cache.info().evictions == 1
+    cache.resize(1)
+    assert len(cache) == 1
+    assert cache.info().evictions == 2
+
+
+@pytest.mark.cache
+def test_cache_disabled():
+    cache = CompileCache(maxsize=0)
+    cache.compile("a")
+    cache.compile("a")
+    assert len(cache) == 0
+    assert cache.info().misses == 2
+
+
+@pytest.mark.cache
+def test_cache_threaded():
+    cache = CompileCache(maxsize=8)
+    results = []
+
+    def worker(i):
+        for j in range(50):
+            results.append(cache.compile(f"x{(i + j) % 12}"))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    info = cache.info()
+    assert info.hits + info.misses == 400
+    assert info.currsize <= 8
+
+
+@pytest.mark.cache
+def test_regex_pattern_uses_global_cache():
+    COMPILE_CACHE.clear()
+    RegexPattern("shared-regex").compile()
+    RegexPattern("shared-regex").compile()
+    assert COMPILE_CACHE.info().hits == 1
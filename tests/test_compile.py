@@ -0,0 +1,41 @@
+import re
+import threading
+
+import pytest
+
+from regexfactory import DIGIT, Multi, RegexPattern
+
+
+@pytest.mark.pattern
+def test_compile_is_cached_per_flags():
+    patt = Multi(DIGIT)
+    assert patt.compile() is patt.compile()
+    assert patt.compile(flags=re.ASCII) is patt.compile(flags=re.ASCII)
+    assert patt.compile() is not patt.compile(flags=re.ASCII)
+    assert patt.compile(flags=re.ASCII).flags & re.ASCII
+
+
+@pytest.mark.pattern
+def test_compile_cache_invalidated_on_regex_change():
+    patt = RegexPattern("a")
+    assert patt.match("a")
+    patt.regex = "b"
+    assert patt.compile().pattern == "b"
+    assert patt.match("a") is None
+    assert patt.match("b")
+
+
+@pytest.mark.pattern
+def test_compile_cache_threaded():
+    patt = RegexPattern("x+y")
+    results = []
+
+    def worker():
+        results.append(patt.compile())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(compiled is results[0] for compiled in results)
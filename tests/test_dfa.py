@@ -0,0 +1,118 @@
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    ANCHOR_END,
+    ANCHOR_START,
+    ANY,
+    DIGIT,
+    WHITESPACE,
+    WORD,
+    Amount,
+    Group,
+    IfAhead,
+    Multi,
+    NotSet,
+    Optional,
+    Or,
+    Range,
+    RegexPattern,
+    escape,
+)
+from regexfactory.dfa import DFAPattern
+
+alphabet = "ab1 \n"
+
+leaves = st.one_of(
+    st.sampled_from(
+        [DIGIT, WORD, WHITESPACE, ANY, NotSet("a"), Range("a", "b"), escape("")]
+    ),
+    st.text(alphabet=alphabet, min_size=1, max_size=2).map(escape),
+)
+
+
+def extend(children):
+    return st.one_of(
+        st.lists(children, min_size=1, max_size=3).map(lambda items: Or(*items)),
+        st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+        st.builds(Multi, children, match_zero=st.booleans(), greedy=st.booleans()),
+        st.builds(Optional, children, greedy=st.booleans()),
+        st.builds(Amount, children, st.integers(0, 2), st.integers(2, 3)),
+    )
+
+
+regular = st.recursive(leaves, extend, max_leaves=8)
+anchored = st.tuples(
+    st.sampled_from(["", ANCHOR_START, RegexPattern(r"\A")]),
+    regular,
+    st.sampled_from(["", ANCHOR_END, RegexPattern(r"\Z")]),
+).map(lambda parts: parts[0] + parts[1] + parts[2])
+
+
+def span(match):
+    return match and match.span()
+
+
+@pytest.mark.dfa
+@given(
+    anchored,
+    st.text(alphabet=alphabet, max_size=12),
+    st.integers(0, 12),
+    st.integers(0, 12),
+    st.booleans(),
+)
+def test_dfa_matches_like_re(pattern, text, pos, size, dotall):
+    flags = re.DOTALL if dotall else 0
+    compiled = pattern.compile(flags=flags)
+    automaton = pattern.compile(flags=flags, engine="dfa")
+    assert isinstance(automaton, DFAPattern)
+    endpos = pos + size
+    for method in ("match", "search", "fullmatch"):
+        expected = getattr(compiled, method)(text, pos, endpos)
+        actual = getattr(automaton, method)(text, pos, endpos)
+        assert span(actual) == span(expected)
+        assert (actual and actual.group()) == (expected and expected.group())
+    assert automaton.test(text, pos, endpos) == bool(compiled.search(text, pos, endpos))
+
+
+@pytest.mark.dfa
+def test_dfa_bytes_and_matches():
+    number = Multi(DIGIT) + Optional(escape(".") + Multi(DIGIT))
+    automaton = number.compile(binary=True, engine="dfa")
+    assert automaton.pattern == rb"\d+(?:\.\d+)?"
+    match = automaton.search(b"pi is 3.14!")
+    assert match.span() == (6, 10) and match.group() == match[0] == b"3.14"
+    assert match.groups() == () and match.groupdict() == {} and match.lastindex is None
+    assert automaton.search(memoryview(b"x12")).group() == b"12"
+    with pytest.raises(IndexError):
+        match.group(1)
+    with pytest.raises(TypeError):
+        automaton.search("3.14")
+    assert number.compile(engine="dfa").fullmatch("٣") is not None
+    assert number.compile(flags=re.ASCII, engine="dfa").fullmatch("٣") is None
+
+
+@pytest.mark.dfa
+def test_dfa_fallback_and_cache():
+    nested = Multi(Multi("a")) + "b"
+    automaton = nested.compile(engine="dfa")
+    assert nested.compile(engine="dfa") is automaton
+    assert automaton.fullmatch("a" * 10_000 + "c") is None
+    assert not automaton.test("a" * 10_000)
+    for pattern, flags in [
+        (Multi(IfAhead("a") + "a"), 0),
+        (Group("a"), 0),
+        (RegexPattern(r"(a)\1"), 0),
+        (RegexPattern(r"\ba"), 0),
+        (RegexPattern("a$b"), 0),
+        (RegexPattern("(?i)a"), 0),
+        (Multi("a"), re.MULTILINE),
+    ]:
+        assert isinstance(pattern.compile(flags=flags, engine="dfa"), re.Pattern)
+        with pytest.raises(ValueError):
+            DFAPattern(pattern, flags=flags)
+    with pytest.raises(ValueError):
+        nested.compile(engine="nfa")
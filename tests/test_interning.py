@@ -0,0 +1,76 @@
+import gc
+import pickle
+import weakref
+from copy import deepcopy
+
+import pytest
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Group,
+    Multi,
+    NamedGroup,
+    Or,
+    Range,
+    RegexPattern,
+    Set,
+    interning,
+    set_interning,
+)
+from regexfactory.patterns import Amount
+
+
+@pytest.mark.pattern
+def test_slots():
+    for pattern in [
+        RegexPattern("a"),
+        Range("a", "f"),
+        Set("a", DIGIT),
+        NamedGroup("word", Multi(WORD)),
+        Group(DIGIT, capturing=False),
+        Or("a", "b"),
+        Amount(DIGIT, 2, 3),
+    ]:
+        assert not hasattr(pattern, "__dict__")
+        copy = pickle.loads(pickle.dumps(pattern))
+        assert type(copy) is type(pattern) and copy == pattern
+    assert pickle.loads(pickle.dumps(Range("a", "f"))).stop == "f"
+
+
+@pytest.mark.pattern
+def test_deep_patterns_pickle():
+    pattern = Group(DIGIT, capturing=False)
+    for _ in range(2000):
+        pattern = pattern + Multi(WORD) + "-"
+    pattern.compile()
+    for copy in [pickle.loads(pickle.dumps(pattern)), deepcopy(pattern)]:
+        assert type(copy) is type(pattern) and copy == pattern
+        assert copy.node == pattern.node and copy.match("1" + "a-" * 2000) is not None
+    with interning():
+        interned = pattern + "x"
+        assert pickle.loads(pickle.dumps(interned)) == interned
+
+
+@pytest.mark.pattern
+def test_interning():
+    assert Group(DIGIT, capturing=False) is not Group(DIGIT, capturing=False)
+    with interning():
+        first = Group(DIGIT, capturing=False)
+        assert Group(DIGIT, capturing=False) is first
+        assert RegexPattern(first) is not first
+        assert Multi(first) is Multi(Group(DIGIT, capturing=False))
+        assert Range("a", "c") is Range("a", "c")
+        assert NamedGroup("x", DIGIT) is not NamedGroup("y", DIGIT)
+        assert first.compile() is Group(DIGIT, capturing=False).compile()
+        with pytest.raises(AttributeError):
+            first.regex = "x"
+        assert set_interning(False) is True
+        second = RegexPattern("x")
+        second.regex = "y"
+        assert set_interning(True) is False
+    assert set_interning(False) is False
+    with interning():
+        unused = weakref.ref(RegexPattern("z"))
+        gc.collect()
+        assert unused() is None
@@ -3,6 +3,7 @@ from hypothesis import example, given
 from hypothesis import strategies as st
 from strategies import non_escaped_text
 
+from regexfactory import ANCHOR_END, ANCHOR_START, DIGIT, Or, PatternBuilder
 from regexfactory.pattern import join
 
 
@@ -16,3 +17,29 @@ def test_join(words: list):
     """
     joined_regex = join(*words)
     assert joined_regex.regex == "".join(words)
+
+
+@pytest.mark.pattern
+def test_join_groups_by_precedence():
+    assert (
+        join(ANCHOR_START, "a", DIGIT, ANCHOR_END).render(optimize=False)
+        == r"(?:^a\d)$"
+    )
+    assert join(*["ab"] * 3, Or("c", "dd")).render(optimize=False) == "ababab(?:c|dd)"
+
+
+@pytest.mark.pattern
+def test_join_many_fragments():
+    words = [f"w{index}" for index in range(5000)]
+    assert join(*words).regex == "".join(words)
+
+
+@pytest.mark.pattern
+def test_pattern_builder():
+    builder = PatternBuilder("a")
+    builder.append(DIGIT).extend(["b", "c"])
+    assert len(builder) == 4
+    assert builder.build().regex == r"a\dbc"
+    builder.append("d")
+    assert builder.build().regex == r"a\dbcd"
+    assert PatternBuilder().build().regex == ""
@@ -0,0 +1,115 @@
+import json
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Amount,
+    Group,
+    IfAhead,
+    IfGroup,
+    Multi,
+    NamedGroup,
+    NotSet,
+    Or,
+    PatternLibrary,
+    RegexPattern,
+    Set,
+)
+from regexfactory.library import FORMAT_VERSION
+
+patterns = st.sampled_from(
+    [
+        Multi(DIGIT),
+        Or("ab", Amount(WORD, 2, 5, greedy=False)),
+        NamedGroup("key", Multi(WORD)) + "=" + IfAhead(NotSet(Set(" ", DIGIT))),
+        Group("a") + IfGroup(1, "b", "c"),
+        RegexPattern(r"(?i)x(?#comment)\b(?P<n>\d)(?P=n)"),
+        RegexPattern(b"\xff+"),
+    ]
+)
+
+
+@pytest.mark.library
+@given(st.lists(patterns, max_size=4))
+def test_round_trip(items):
+    library = PatternLibrary(
+        {f"p{index}": pattern for index, pattern in enumerate(items)},
+        flags={"p0": re.ASCII},
+        version="2",
+    )
+    loaded = PatternLibrary.loads(library.dumps(), version="2")
+    assert list(loaded) == list(library) and loaded.version == "2"
+    for name, pattern in library.items():
+        assert loaded.compile(name) == library.compile(name)
+        assert loaded[name].node == pattern.node
+        assert loaded[name].precedence == pattern.precedence
+        assert loaded.flags(name) == library.flags(name)
+    assert loaded.dumps() == library.dumps()
+
+
+@pytest.mark.library
+def test_shared_subtrees_and_laziness():
+    word = Multi(WORD)
+    library = PatternLibrary({"pair": word + "=" + word, "word": word})
+    document = json.loads(library.dumps())
+    assert document["format"] == FORMAT_VERSION
+    assert sum(entry[0] == "Repeat" for entry in document["nodes"]) == 1
+    loaded = PatternLibrary.loads(library.dumps())
+    assert loaded.compile("pair").fullmatch("a=b")
+    assert not loaded._patterns
+    assert next(loaded["pair"].node.flatten()) is loaded["word"].node
+    loaded.add("word", DIGIT, flags=re.ASCII)
+    assert loaded.compile("word").pattern == r"\d" and loaded.flags("word") == re.ASCII
+
+
+@pytest.mark.library
+def test_deep_grammars(tmp_path):
+    grammar = RegexPattern("^")
+    for index in range(2000):
+        grammar = grammar + NamedGroup(f"f{index}", Multi(DIGIT)) + ","
+    library = PatternLibrary({"grammar": grammar})
+    library.save(tmp_path / "grammar.json")
+    loaded = PatternLibrary.load(tmp_path / "grammar.json")
+    assert loaded["grammar"].node == grammar.node
+    assert loaded.compile("grammar").match("1," * 2000)
+
+
+@pytest.mark.library
+def test_cyclic_tables():
+    document = json.loads(PatternLibrary({"group": Group(DIGIT)}).dumps())
+    group = document["patterns"]["group"][0]
+    document["nodes"][group][1] = {"node": group}
+    with pytest.raises(ValueError):
+        PatternLibrary.loads(json.dumps(document))["group"]
+
+
+@pytest.mark.library
+def test_cached(tmp_path):
+    path = tmp_path / "grammar.json"
+    builds = []
+
+    def build():
+        builds.append(1)
+        return PatternLibrary({"number": Multi(DIGIT)})
+
+    for version in ("1", "1", "2"):
+        library = PatternLibrary.cached(path, build, version=version)
+        assert library.version == version and library.compile("number").match("42")
+    assert len(builds) == 2
+    path.write_text("{}")
+    PatternLibrary.cached(path, build, version="2")
+    assert len(builds) == 3
+    document = json.loads(path.read_text())
+    document["regexfactory"] = "0.0.0"
+    path.write_text(json.dumps(document))
+    with pytest.raises(ValueError):
+        PatternLibrary.load(path)
+    with pytest.raises(ValueError):
+        PatternLibrary.loads(
+            json.dumps(dict(document, regexfactory=None, nodes=[["Eval"]]))
+        )
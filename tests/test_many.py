@@ -0,0 +1,45 @@
+import types
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import DIGIT, Multi, Or
+
+lines = st.lists(st.text(alphabet="ab12 ", max_size=6), max_size=10)
+
+
+def spans(results):
+    return [result and result.span() for result in results]
+
+
+@pytest.mark.pattern
+@given(lines)
+def test_many_matches_single_calls(contents):
+    patt = Or(Multi(DIGIT), "ab")
+    for method in ("match", "fullmatch", "search"):
+        single = [getattr(patt, method)(content) for content in contents]
+        many = getattr(patt, f"{method}_many")
+        assert spans(many(contents)) == spans(single)
+        assert spans(many(iter(contents), output="iter")) == spans(single)
+        assert list(many(contents, output="mask")) == [
+            int(result is not None) for result in single
+        ]
+    assert patt.test_many(contents) == [patt.test(content) for content in contents]
+    assert list(patt.test_many(contents, output="mask")) == list(
+        map(int, patt.test_many(contents))
+    )
+
+
+@pytest.mark.pattern
+def test_many_outputs():
+    patt = Multi(DIGIT)
+    assert isinstance(patt.match_many(["1"], output="mask"), bytearray)
+    results = patt.test_many(line for line in ["1", "x"])
+    assert results == [True, False]
+    lazy = patt.search_many(["x1"], output="iter")
+    assert isinstance(lazy, types.GeneratorType) or iter(lazy) is lazy
+    with pytest.raises(ValueError):
+        patt.match_many(["1"], output="tuple")
+    with pytest.raises(ValueError):
+        patt.test_many(["1"], output="tuple")
@@ -0,0 +1,176 @@
+import pickle
+import re
+from copy import deepcopy
+
+import pytest
+from hypothesis import assume, given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    ANCHOR_END,
+    DIGIT,
+    WORD,
+    Amount,
+    Comment,
+    Extension,
+    Group,
+    IfAhead,
+    IfBehind,
+    IfGroup,
+    IfNotAhead,
+    IfNotBehind,
+    Multi,
+    NamedGroup,
+    NamedReference,
+    NumberedReference,
+    Optional,
+    Or,
+    Range,
+    RegexPattern,
+    escape,
+    nodes,
+)
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+leaves = st.one_of(
+    st.sampled_from([DIGIT, WORD, Range("a", "c"), ANCHOR_END, escape("")]),
+    st.text(alphabet="ab-", min_size=1, max_size=3).map(escape),
+    st.text(alphabet="ab", max_size=3).map(RegexPattern),
+)
+trees = st.recursive(
+    leaves,
+    lambda children: st.one_of(
+        st.lists(children, max_size=3).map(lambda items: Or(*items)),
+        st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+        st.builds(Amount, children, st.integers(0, 2), st.integers(2, 3)),
+        st.builds(Multi, children, match_zero=st.booleans()),
+        st.builds(Group, children, capturing=st.booleans()),
+        st.builds(IfAhead, children),
+        st.builds(IfGroup, st.just(1), children, children),
+    ),
+    max_leaves=8,
+)
+
+
+@pytest.mark.nodes
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (Multi(DIGIT), r"(?:\d)+"),
+        (Optional("a", greedy=False), "(?:a)??"),
+        (Amount("ab", 2), "ab{2}"),
+        (Group("a") + Group("b", capturing=False), "(a)(?:b)"),
+        (NamedGroup("x", DIGIT), r"(?P<x>\d)"),
+        (NamedReference("x"), "(?P=x)"),
+        (NumberedReference(1), r"\1"),
+        (Comment("note"), "(?#note)"),
+        (IfAhead("a") + IfNotAhead("b"), "(?=a)(?!b)"),
+        (IfBehind("a") + IfNotBehind("b"), "(?<=a)(?<!b)"),
+        (IfGroup(1, "a", "b"), "(?(1)(?:a)|(?:b))"),
+        (escape("a.b"), r"a\.b"),
+        (DIGIT * 3, r"\d\d\d"),
+    ],
+)
+def test_rendering(pattern, expected):
+    assert pattern.render(optimize=False) == expected
+
+
+@pytest.mark.nodes
+def test_structured_nodes_are_grouped_when_needed():
+    assert (Or("a", DIGIT + "b") + "c").render(optimize=False) == r"(?:(?:a)|(?:\db))c"
+    assert Amount(Or("ab", "cd"), 2).regex == "(?:ab|cd){2}"
+    assert (NumberedReference(1) + "0").regex == r"(?:\1)0"
+
+
+@pytest.mark.nodes
+def test_nodes_are_structural_values():
+    first = Multi(DIGIT) + "x"
+    second = Multi(DIGIT) + "x"
+    assert first.node == second.node
+    assert hash(first.node) == hash(second.node)
+    assert first.node != (Multi(DIGIT) + "y").node
+    assert pickle.loads(pickle.dumps(first.node)) == first.node
+
+
+@pytest.mark.nodes
+def test_rendering_is_lazy_and_memoized():
+    pattern = RegexPattern("a") + "b"
+    assert pattern.node._regex is None
+    assert pattern.regex is pattern.regex
+    assert pattern.node._regex == "ab"
+
+
+@pytest.mark.nodes
+def test_deep_concatenation():
+    pattern = RegexPattern("")
+    for _ in range(5000):
+        pattern += "a"
+    assert isinstance(pattern.node, nodes.Concat)
+    assert pattern.regex == "a" * 5000
+
+
+@pytest.mark.nodes
+def test_deep_concatenation_copies_hashes_and_compares():
+    pattern = RegexPattern("x")
+    for _ in range(2000):
+        pattern = pattern + Multi(DIGIT) + "a"
+    node = pattern.node
+    for copy in [deepcopy(node), pickle.loads(pickle.dumps(node))]:
+        assert copy == node and hash(copy) == hash(node)
+    flat = nodes.Concat(tuple(node.flatten()))
+    assert flat == node and hash(flat) == hash(node)
+    assert node != (pattern + "b").node
+
+
+@pytest.mark.nodes
+@given(trees)
+def test_width_matches_re(pattern):
+    pattern = Group("") + pattern
+    regex = pattern.regex
+    try:
+        re.compile(regex)
+    except re.error:
+        assume(False)
+    shortest, longest = sre_parse.parse(regex).getwidth()
+    expected = (shortest, None if longest >= sre_parse.MAXREPEAT else longest)
+    assert pattern.width == expected
+    pattern.compile()
+    assert pattern._shortest in (0, shortest)
+    if "Raw" not in repr(pattern.node):
+        assert pattern.node.width() == expected
+
+
+@pytest.mark.nodes
+def test_lookbehinds_need_a_fixed_width():
+    assert IfBehind(Or("ab", "cd")).width == (0, 0)
+    assert IfNotBehind(RegexPattern("[ab]c|de")).regex == "(?<![ab]c|de)"
+    assert IfBehind(Group("a") + NumberedReference(1)).regex == r"(?<=(a)\1)"
+    for child in [Multi("a"), Or("a", "bc"), RegexPattern("a|bc"), Optional("x")]:
+        with pytest.raises(ValueError, match="fixed width"):
+            IfBehind(child)
+    with pytest.raises(ValueError, match="fixed width"):
+        RegexPattern.parse("(?<=a)b") + Extension("<!", "a*")
+
+
+@pytest.mark.nodes
+def test_short_texts_are_rejected():
+    code = Amount(DIGIT, 3) + IfAhead(escape("!"))
+    assert code.search("12") is None
+    assert code.search("123!").group() == "123"
+    assert code._shortest == 3
+    assert code.match("12") is None and code.fullmatch("1") is None
+    assert not code.test("") and code.test(b"x123!")
+    code.regex = "1?"
+    assert code.match("") is not None
+
+
+@pytest.mark.nodes
+def test_node_types():
+    assert set(nodes.NODE_TYPES) == set(nodes.Node.__subclasses__())
+    for node_type in nodes.NODE_TYPES:
+        leaf = node_type.children is nodes.Node.children
+        assert leaf is (node_type in nodes.LEAF_TYPES)
@@ -0,0 +1,120 @@
+import pickle
+import re
+
+import pytest
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Multi,
+    Observer,
+    Profiler,
+    escape,
+    observing,
+    set_observer,
+)
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_compile_start(self, pattern, flags, binary, engine):
+        self.events.append(("compile", pattern.regex, flags, binary, engine))
+
+    def on_match(self, pattern, method, length, hit, elapsed):
+        assert elapsed >= 0
+        self.events.append((method, length, hit))
+
+
+@pytest.mark.observe
+def test_observer_events():
+    recorder = Recorder()
+    number = Multi(DIGIT) + escape("x")
+    with observing(recorder) as observer:
+        assert observer is recorder
+        assert number.match("12x").group() == "12x"
+        assert number.match(b"12x")
+        assert number.fullmatch("12") is None
+        assert number.search("a 3x", 1, 4).span() == (2, 4)
+        assert not number.test("none")
+        assert number.findall("1x 2x") == ["1x", "2x"]
+        assert [match.group() for match in number.finditer("1x 2x")] == ["1x", "2x"]
+        assert number.split("a1xb") == ["a", "b"]
+        assert number.sub("-", "1x2") == "-2"
+        assert number.subn("-", "12") == ("12", 0)
+        assert list(number.test_many(["1x", "x"], output="mask")) == [1, 0]
+    number.search("3x")
+    assert recorder.events == [
+        ("compile", r"\d+x", 0, False, "re"),
+        ("match", 3, True),
+        ("compile", r"\d+x", 0, True, "re"),
+        ("match", 3, True),
+        ("fullmatch", 2, False),
+        ("search", 4, True),
+        ("test", 4, False),
+        ("findall", 5, True),
+        ("finditer", 5, True),
+        ("split", 4, True),
+        ("sub", 3, True),
+        ("subn", 2, False),
+        ("test", 2, True),
+        ("test", 1, False),
+    ]
+
+
+@pytest.mark.observe
+def test_pattern_observer_takes_precedence():
+    shared, own = Recorder(), Recorder()
+    word, number = Multi(WORD), Multi(DIGIT)
+    word.compile(), number.compile()
+    number.observer = own
+    previous = set_observer(shared)
+    try:
+        word.match("a")
+        number.match("1")
+        matches = number.finditer("1 2 3")
+        next(matches)
+        matches.close()
+    finally:
+        assert set_observer(previous) is shared
+    number.match("2")
+    assert shared.events == [("match", 1, True)]
+    assert own.events == [("match", 1, True), ("finditer", 5, True), ("match", 1, True)]
+    copy = pickle.loads(pickle.dumps(number))
+    assert copy == number and copy.observer is None
+    number.observer = None
+    number.match("3")
+    assert len(own.events) == 3
+
+
+@pytest.mark.observe
+def test_profiler():
+    profiler = Profiler()
+    number, word = Multi(DIGIT), Multi(WORD)
+    with observing(profiler):
+        for _ in range(3):
+            Multi(DIGIT).search("a1")
+            word.test("  ")
+        number.compile(flags=re.IGNORECASE)
+    top = profiler.top(key="calls")
+    assert [
+        (stats.regex, stats.calls, stats.hits, stats.characters) for stats in top
+    ] == [
+        (r"\d+", 3, 3, 6),
+        (r"\w+", 3, 0, 6),
+    ]
+    assert profiler.top(1, key="hits")[0].regex == r"\d+"
+    digits = profiler.top(key="compiles")[0]
+    assert digits.regex == r"\d+" and digits.compiles >= 1
+    assert digits.total_time == digits.match_time + digits.compile_time
+    assert r"\w+" in profiler.report()
+    assert (
+        profiler.top(key="total_time")[0].total_time
+        >= profiler.top(key="total_time")[-1].total_time
+    )
+    for key in ("regex", "count", "index", "_fields"):
+        with pytest.raises(ValueError):
+            profiler.top(key=key)
+    profiler.reset()
+    assert profiler.stats() == []
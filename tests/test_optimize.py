@@ -0,0 +1,142 @@
+import re
+
+import pytest
+from hypothesis import assume, given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    ANCHOR_END,
+    ANCHOR_START,
+    DIGIT,
+    WORD,
+    Amount,
+    Group,
+    IfGroup,
+    Multi,
+    NumberedReference,
+    Optional,
+    Or,
+    RegexPattern,
+    Set,
+    escape,
+)
+from regexfactory.optimize import raw_precedence, simplify_quantifiers
+
+leaves = st.sampled_from(
+    [DIGIT, WORD, ANCHOR_START, ANCHOR_END, Set("a", "b"), "a", "ab", "a|b", "b?"]
+).map(RegexPattern)
+
+
+def extend(children):
+    return st.one_of(
+        st.lists(children, min_size=1, max_size=3).map(lambda items: Or(*items)),
+        st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+        st.tuples(children, st.booleans()).map(lambda pair: Multi(*pair)),
+        st.tuples(children, st.booleans()).map(lambda pair: Optional(*pair)),
+        st.tuples(children, st.integers(1, 2)).map(lambda pair: Amount(*pair)),
+        st.builds(
+            Amount,
+            children,
+            st.integers(0, 2),
+            st.none() | st.integers(2, 3),
+            or_more=st.booleans(),
+            greedy=st.booleans(),
+        ),
+        st.tuples(children, st.booleans()).map(lambda pair: Group(*pair)),
+    )
+
+
+@pytest.mark.optimize
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (Multi(DIGIT), r"\d+"),
+        (Optional("a", greedy=False), "a??"),
+        (Or("a+", DIGIT + "b"), r"a+|\db"),
+        (Multi(Or("Bob", DIGIT + "x")), r"(?:Bob|\dx)+"),
+        (Multi("[ab]"), "[ab]+"),
+        (Multi("ab"), "(?:ab)+"),
+        (Multi(ANCHOR_START), "(?:^)+"),
+        (Or("a|b", "cd") + "e", "(?:a|b|cd)e"),
+        (ANCHOR_START + Or("a", "bc") + ANCHOR_END, "^(?:a|bc)$"),
+        (Group(Group("a", capturing=False)), "(a)"),
+        (IfGroup(1, "a", "b|c"), "(?(1)a|(?:b|c))"),
+        (NumberedReference(1) + Optional("0") + "1", r"(?:\1)0?1"),
+    ],
+)
+def test_eliminated_groups(pattern, expected):
+    assert pattern.regex == expected
+
+
+@pytest.mark.optimize
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (Amount("x", 1), "x"),
+        (Amount("x", 0, or_more=True), "x*"),
+        (Amount("x", 1, or_more=True, greedy=False), "x+?"),
+        (Amount(DIGIT, 0, 1), r"\d?"),
+        (Multi(Multi("x")), "x+"),
+        (Multi(Multi("x"), match_zero=True), "x*"),
+        (Optional(Multi(DIGIT)), r"\d*"),
+        (Multi(Multi("x", greedy=False)), "(?:x+?)+"),
+        (Amount(Amount("x", 2), 3), "x{6}"),
+        (Amount(Amount(escape("ab"), 2), 3), "(?:ab){6}"),
+        (DIGIT + DIGIT + Amount(DIGIT, 2), r"\d{4}"),
+        (DIGIT + DIGIT, r"\d\d"),
+        (Multi(DIGIT) + Multi(DIGIT, match_zero=True) + "x", r"\d+x"),
+        (Multi(DIGIT) + Multi(DIGIT, greedy=False), r"\d+\d+?"),
+        (Amount(Or("a", "bc"), 1) + "d", "(?:a|bc)d"),
+        (Amount(Group("a"), 2) + Amount(Group("a"), 2), "(a){2}(a){2}"),
+        (Multi(Multi(Or("a", "bc"))), "(?:(?:a|bc)+)+"),
+        (Amount("ab", 1), "ab{1}"),
+    ],
+)
+def test_simplified_quantifiers(pattern, expected):
+    assert pattern.regex == expected
+
+
+@pytest.mark.optimize
+def test_simplify_quantifiers_keeps_unchanged_trees():
+    node = (Multi(DIGIT) + "x").node
+    assert simplify_quantifiers(node) is node
+
+
+@pytest.mark.optimize
+@pytest.mark.parametrize(
+    "text, precedence",
+    [
+        ("a", 3),
+        (r"\.", 3),
+        ("[]a-z]", 3),
+        ("ab", 1),
+        (r"\b", 1),
+        ("", 1),
+        ("a|b", 0),
+        ("a+", 0),
+        (r"\1", 0),
+    ],
+)
+def test_raw_precedence(text, precedence):
+    assert raw_precedence(text) == precedence
+
+
+@pytest.mark.optimize
+@given(
+    st.recursive(leaves, extend, max_leaves=8),
+    st.lists(st.text(alphabet="ab1 ", max_size=6), max_size=5),
+)
+def test_optimization_keeps_semantics(pattern, texts):
+    try:
+        reference = re.compile(pattern.render(optimize=False))
+    except re.error:
+        # Amount splices raw text as is, like "b?{2}".
+        assume(False)
+    optimized = re.compile(pattern.render())
+    assert len(pattern.render()) <= len(pattern.render(optimize=False))
+    for text in texts:
+        expected = reference.search(text)
+        actual = optimized.search(text)
+        assert (actual and (actual.span(), actual.groups())) == (
+            expected and (expected.span(), expected.groups())
+        )
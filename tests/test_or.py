@@ -5,7 +5,7 @@ from hypothesis import example, given
 from hypothesis import strategies as st
 from strategies import non_escaped_text
 
-from regexfactory import Or
+from regexfactory import DIGIT, WORD, Or, Range, Set
 
 
 @pytest.mark.patterns
@@ -24,3 +24,63 @@ def test_matching_or(arr: list):
     else:
         for value in arr:
             assert isinstance(actual.match(value), re.Match)
+
+
+def reference_or(words: list) -> str:
+    return "|".join(f"(?:{re.escape(word)})" for word in words)
+
+
+@pytest.mark.patterns
+@given(
+    st.lists(st.text(alphabet="aAb.", max_size=4), min_size=1, max_size=8),
+    st.text(alphabet="aAb.", max_size=8),
+    st.sampled_from([0, re.IGNORECASE]),
+)
+@example(words=["a", "ab"], content="ab", flags=0)
+@example(words=["ab", "Ac", "a"], content="ac", flags=re.IGNORECASE)
+def test_literal_or_preserves_semantics(words: list, content: str, flags: int):
+    """
+    Tests that factoring literal alternatives into a prefix tree
+        matches exactly what the plain alternation matches.
+    """
+    actual = Or(*map(re.escape, words)).compile(flags=flags)
+    expected = re.compile(reference_or(words), flags=flags)
+    for position in range(len(content) + 1):
+        actual_match = actual.match(content, position)
+        expected_match = expected.match(content, position)
+        assert (actual_match and actual_match.span()) == (
+            expected_match and expected_match.span()
+        )
+
+
+@pytest.mark.patterns
+def test_literal_or_is_prefix_factored():
+    assert Or("Alice", "Alan", "Bob").regex == "Al(?:ice|an)|Bob"
+
+
+@pytest.mark.patterns
+def test_single_character_alternatives_become_a_set():
+    assert Or(DIGIT, "x", Range("a", "f")).regex == r"[\da-fx]"
+    assert Or("Bob", "a", "b", WORD).regex == r"Bob|\w"
+
+
+@pytest.mark.patterns
+@given(
+    st.lists(
+        st.sampled_from(
+            ["a", "b", "ab", "1", DIGIT, WORD, Range("a", "b"), Set("1", "b")]
+        ),
+        min_size=1,
+        max_size=6,
+    ),
+    st.text(alphabet="ab1 ", max_size=6),
+)
+def test_single_character_alternatives_preserve_semantics(alternatives, content):
+    actual = Or(*alternatives).compile()
+    expected = re.compile("|".join(f"(?:{alt})" for alt in alternatives))
+    for position in range(len(content) + 1):
+        actual_match = actual.match(content, position)
+        expected_match = expected.match(content, position)
+        assert (actual_match and actual_match.span()) == (
+            expected_match and expected_match.span()
+        )
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Amount,
+    IfAhead,
+    IfBehind,
+    Multi,
+    NamedGroup,
+    Optional,
+    Or,
+    RegexPattern,
+)
+
+patterns = st.sampled_from(
+    [
+        Amount(DIGIT, 1, 4),
+        Amount(Or("ab", "b", ""), 1, 5) + Optional(DIGIT),
+        IfBehind("a") + Amount(WORD, 2, 6) + IfAhead(DIGIT),
+        RegexPattern(r"\bab?\b|\Z"),
+        RegexPattern("(?m)^a{1,3}?|b$"),
+        NamedGroup("word", Amount("a", 1, 5)) + Optional(NamedGroup("digit", DIGIT)),
+    ]
+)
+
+
+def spans(matches):
+    return [(match.span(), match.groups()) for match in matches]
+
+
+@pytest.mark.parallel
+@given(patterns, st.text(alphabet="ab1 \n", max_size=40), st.integers(1, 7))
+def test_windows_match_finditer(pattern, text, chunk_size):
+    expected = spans(pattern.finditer(text))
+    scan = pattern.finditer_parallel(text, chunk_size=chunk_size, workers=1)
+    assert spans(scan) == expected
+    findall = pattern.findall_parallel(
+        io.StringIO(text), chunk_size=chunk_size, workers=1
+    )
+    assert findall == pattern.findall(text)
+
+
+@pytest.mark.parallel
+def test_process_pool():
+    pattern = Amount(DIGIT, 1, 3)
+    text = "a1 22 b333 4444 " * 50
+    expected = spans(pattern.finditer(text))
+    assert spans(pattern.finditer_parallel(text, chunk_size=7, workers=2)) == expected
+    data = text.encode()
+    found = pattern.finditer_parallel(memoryview(data), chunk_size=7, workers=2)
+    assert spans(found) == spans(pattern.finditer(data))
+    documents = ["1 x 22", "", "no digits", "333"]
+    assert pattern.findall_parallel(documents, workers=2) == [
+        ["1", "22"],
+        [],
+        [],
+        ["333"],
+    ]
+    pairs = pattern.finditer_parallel(iter(documents), workers=2)
+    assert [(index, match.group()) for index, match in pairs] == [
+        (0, "1"),
+        (0, "22"),
+        (3, "333"),
+    ]
+    assert pattern.findall_parallel([], workers=2) == []
+
+
+@pytest.mark.parallel
+def test_unbounded_patterns():
+    with pytest.raises(ValueError):
+        Multi(DIGIT).findall_parallel("1 2", workers=1)
+    found = Multi(DIGIT).findall_parallel(
+        "12 345 6", chunk_size=2, max_width=4, workers=1
+    )
+    assert found == ["12", "345", "6"]
+    assert Multi(DIGIT).findall_parallel(["12 3"], workers=1) == [["12", "3"]]
@@ -0,0 +1,125 @@
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Amount,
+    Group,
+    IfAhead,
+    Multi,
+    NamedGroup,
+    Optional,
+    Or,
+    RegexPattern,
+    Set,
+    escape,
+    nodes,
+)
+from regexfactory.parser import structured_node
+
+texts = st.lists(st.text(alphabet="aAb1 \n-.", max_size=8), max_size=5)
+
+
+def assert_same_matches(first, second, strings):
+    for text in strings:
+        expected = first.search(text)
+        actual = second.search(text)
+        assert (actual and (actual.span(), actual.groups())) == (
+            expected and (expected.span(), expected.groups())
+        )
+
+
+@pytest.mark.parser
+@pytest.mark.parametrize(
+    "regex",
+    [
+        r"(?P<user>\w+)@(?:example|exampel)\.(?:com|org)",
+        r"abc+d{2,}?[^a-c\]]x{,3}",
+        r"(a)\1\012(?(1)x|y)(?#note)(?=a)(?<!b)",
+        r"(?i)abc|abd|Ab",
+        r"a{}{1,2|\x41\u0042\N{DIGIT ONE}",
+        r"(?s-i:a.)|[]-]|\bb\B|^a$|\Aa\Z",
+        r"(?:a|)+?|(|b)*",
+        r"[a-z]+://[\w\d.]+(?::\d+)?(?:/(?:[^/#?&\s]*))*",
+    ],
+)
+def test_parse_keeps_semantics(regex):
+    strings = ["", "a", "ab", "abc", "AbD", "a\n", "1", "x://y:80/z", "aab1"]
+    assert_same_matches(re.compile(regex), RegexPattern.parse(regex).compile(), strings)
+
+
+@pytest.mark.parser
+@pytest.mark.parametrize(
+    "regex", ["a(?#x)*", "a(?#x)(?#y){2,3}?b", "(?x)a # x\n +", "[ab](?#x)+?b"]
+)
+def test_quantifiers_after_comments(regex):
+    patt = RegexPattern.parse(regex).compile()
+    for text in ["", "a", "aa", "aaa", "aab", "aaab", "bb", "abb"]:
+        assert bool(patt.fullmatch(text)) is bool(re.fullmatch(regex, text))
+
+
+@pytest.mark.parser
+def test_parse_flags():
+    patt = RegexPattern.parse(re.compile(" a  b # comment\n | c", re.I | re.X))
+    assert patt.regex == "(?i)(?:ab|c)"
+    assert RegexPattern.parse("(?x) a b").regex == "ab"
+    assert RegexPattern.parse(r"(?x: a\ b )c d").regex == r"a\ bc\ d"
+
+
+@pytest.mark.parser
+def test_parse_builds_structure():
+    patt = RegexPattern.parse(r"(?P<x>a|bc)+(?=\d)")
+    group = patt.node.items[0].child.child
+    assert isinstance(group, nodes.Group) and group.name == "x"
+    assert isinstance(group.child, nodes.Alternation)
+    assert isinstance(patt.node.items[1], nodes.Lookaround)
+    assert (
+        RegexPattern.parse("x{2,5}?").node
+        == Amount(escape("x"), 2, 5, greedy=False).node
+    )
+    assert RegexPattern.parse("[a-cx]").node == Set("a-c", "x").node
+    assert RegexPattern.parse("a++").regex == "(?>a+)"
+
+
+@pytest.mark.parser
+def test_structured_nodes_keep_alternatives_as_written():
+    assert RegexPattern.parse("(a|a)*b").regex == "(a)*b"
+    assert RegexPattern(structured_node(RegexPattern("(a|a)*b"))).regex == "(a|a)*b"
+
+
+@pytest.mark.parser
+def test_parse_errors():
+    with pytest.raises(re.error):
+        RegexPattern.parse("(a")
+    with pytest.raises(TypeError):
+        RegexPattern.parse(re.compile(b"a"))
+
+
+leaves = st.sampled_from([DIGIT, WORD, Set("a", "b"), "a", "ab", "-"]).map(RegexPattern)
+
+
+def extend(children):
+    return st.one_of(
+        st.lists(children, min_size=1, max_size=3).map(lambda items: Or(*items)),
+        st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+        st.tuples(children, st.booleans()).map(lambda pair: Multi(*pair)),
+        st.tuples(children, st.booleans()).map(lambda pair: Optional(*pair)),
+        st.tuples(children, st.booleans()).map(lambda pair: Group(*pair)),
+        children.map(lambda child: NamedGroup("n", child)),
+        children.map(IfAhead),
+    )
+
+
+@pytest.mark.parser
+@given(st.recursive(leaves, extend, max_leaves=8), texts)
+def test_parse_round_trip(pattern, strings):
+    try:
+        expected = pattern.compile()
+    except re.error:
+        # For instance, the same group name used twice.
+        return
+    assert_same_matches(expected, RegexPattern.parse(pattern.regex).compile(), strings)
@@ -0,0 +1,95 @@
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    DIGIT,
+    WORD,
+    Multi,
+    NamedGroup,
+    Or,
+    PatternSet,
+    RegexPattern,
+    escape,
+)
+
+rules = st.lists(
+    st.sampled_from(
+        [
+            "a",
+            "ab",
+            "b+a",
+            r"^\d",
+            r"\d$",
+            r"(\w)\1",
+            "(?i)B",
+            "(?P<x>a|1)b",
+            "(?P<x>b)",
+            "(?=a)ab|1 ",
+            r"\bb\b",
+            "x?",
+            "a(?#x)*b",
+            r"\w+",
+            r"[ab]\d",
+        ]
+    ),
+    min_size=1,
+    max_size=8,
+)
+
+
+@pytest.mark.patternset
+@given(rules, st.integers(1, 4), st.text(alphabet="abAB1 \n", max_size=10))
+def test_matches_each_rule(regexes, shard_size, content):
+    named = [(f"rule{index}", regex) for index, regex in enumerate(regexes)]
+    patterns = PatternSet(named, shard_size=shard_size)
+    expected = [
+        name for name, regex in named if RegexPattern(regex).search(content) is not None
+    ]
+    assert patterns.matches(content) == expected
+    assert patterns.test(content) == bool(expected)
+
+
+@pytest.mark.patternset
+def test_sharding():
+    patterns = PatternSet(
+        {
+            "word": Multi(WORD),
+            "number": NamedGroup("value", Multi(DIGIT)),
+            "other": NamedGroup("value", Or("x", "y")),
+            "repeat": r"(.)\1",
+        },
+        shard_size=2,
+    )
+    assert len(patterns) == 4 and "repeat" in patterns and list(patterns)[0] == "word"
+    assert [shard.regex for shard in patterns.shards] == [
+        r"(?=\w+|\d+)(?=(?P<_0>\w+))?(?=(?P<_1>\d+))?",
+        r"(.)\1",
+        "(?=[xy])(?=(?P<_0>[xy]))?",
+    ]
+    assert list(patterns.matches_many(["12", "aa", ""])) == [
+        ["word", "number"],
+        ["word", "repeat"],
+        [],
+    ]
+
+
+@pytest.mark.patternset
+def test_rules_starting_with_text_are_searched_alone():
+    patterns = PatternSet(
+        {"key": escape("key=") + Multi(DIGIT), "number": Multi(DIGIT)}
+    )
+    assert [shard.regex for shard in patterns.shards] == [
+        r"key=\d+",
+        r"(?=\d+)(?=(?P<_0>\d+))?",
+    ]
+    assert patterns.matches("key=1") == ["key", "number"]
+    assert patterns.matches("no digits") == []
+
+
+@pytest.mark.patternset
+def test_invalid_sets():
+    with pytest.raises(ValueError):
+        PatternSet([("a", "a"), ("a", "b")])
+    with pytest.raises(ValueError):
+        PatternSet({"a": "a"}, shard_size=0)
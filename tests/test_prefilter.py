@@ -0,0 +1,199 @@
+import re
+
+import pytest
+from hypothesis import assume, given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    ANCHOR_START,
+    DIGIT,
+    Amount,
+    Extension,
+    Group,
+    IfAhead,
+    IfBehind,
+    IfNotAhead,
+    Multi,
+    Or,
+    Range,
+    RegexPattern,
+    Set,
+    escape,
+)
+from regexfactory.prefilter import first_chars, leading_anchor, required_literals
+
+alphabet = "ab1."
+
+leaves = st.one_of(
+    st.sampled_from([DIGIT, escape(""), RegexPattern(""), RegexPattern("[ab]")]),
+    st.text(alphabet=alphabet, min_size=1, max_size=3).map(escape),
+    st.text(alphabet="ab", min_size=1, max_size=3).map(RegexPattern),
+    st.sampled_from(["a|b", "b*", r"\.", "a{2}"]).map(RegexPattern),
+)
+start_leaves = st.one_of(
+    leaves,
+    st.sampled_from(
+        [
+            ANCHOR_START,
+            Set("a", "b"),
+            Set("1", "."),
+            RegexPattern.parse(r"\A"),
+            RegexPattern.parse(r"\b"),
+        ]
+    ),
+)
+long_texts = st.builds(
+    lambda pieces, size: ("." * size).join(pieces),
+    st.lists(st.text(alphabet=alphabet, max_size=8), min_size=2, max_size=40),
+    st.integers(0, 100),
+)
+
+
+def trees_of(leaves):
+    return st.recursive(
+        leaves,
+        lambda children: st.one_of(
+            st.lists(children, min_size=1, max_size=3).map(lambda items: Or(*items)),
+            st.tuples(children, children).map(lambda pair: pair[0] + pair[1]),
+            st.builds(Amount, children, st.integers(0, 2), st.integers(2, 3)),
+            st.builds(Amount, children, st.integers(1, 2)),
+            st.builds(Multi, children, match_zero=st.booleans()),
+            st.builds(Group, children, capturing=st.booleans()),
+            st.builds(IfAhead, children),
+            st.builds(IfNotAhead, children),
+            st.builds(IfBehind, st.text(alphabet=alphabet, min_size=1).map(escape)),
+        ),
+        max_leaves=8,
+    )
+
+
+trees = trees_of(leaves)
+
+
+@pytest.mark.prefilter
+@given(trees, st.text(alphabet=alphabet, max_size=16))
+def test_matches_contain_required_literals(pattern, text):
+    try:
+        compiled = re.compile(pattern.regex)
+    except re.error:
+        assume(False)
+    literals = required_literals(pattern)
+    if compiled.search(text):
+        assert all(literal in text for literal in literals)
+    assert pattern.search(text) == compiled.search(text) or (
+        pattern.search(text).span() == compiled.search(text).span()
+    )
+    assert pattern.findall(text) == compiled.findall(text)
+    assert pattern.test(text.encode()) == bool(compiled.search(text))
+
+
+@pytest.mark.prefilter
+def test_required_literals():
+    url = Multi(DIGIT) + "://" + Multi(DIGIT)
+    assert required_literals(url) == ("://",)
+    assert required_literals(Or("Alice", "Alan") + escape("!")) == ("Al", "!")
+    assert required_literals(Amount(escape("ab"), 2)) == ("abab",)
+    assert required_literals(Amount("ab", 2)) == ("ab",)
+    assert required_literals(escape("xyz") + Multi(DIGIT) + escape("y")) == ("xyz",)
+    assert required_literals(IfAhead("px") + IfNotAhead("em")) == ("px",)
+    assert required_literals(RegexPattern("a|b") + escape("cd")) == ()
+    assert required_literals(Group(RegexPattern("a|b")) + escape("cd")) == ("cd",)
+    assert required_literals(RegexPattern.parse("(?i)abc")) == ()
+    assert required_literals(Extension("x:", escape("a")) + escape("b")) == ()
+    assert required_literals(escape("b") + Amount(RegexPattern(""), 0, 2)) == ()
+
+
+@pytest.mark.prefilter
+def test_prefilter_skips_texts_without_literals():
+    url = Multi(DIGIT) + "://" + Multi(DIGIT)
+    assert url.search("12 :// 3") is None and url.search("12://3").group() == "12://3"
+    assert not url.test("12") and url.findall(b"1://2 3") == [b"1://2"]
+    assert url.test_many(["1://2", "12"], output="list") == [True, False]
+    assert url.search_many(["1:/2", "1://2"])[1].span() == (0, 5)
+    assert url.test(memoryview(b"1://2"))
+    shout = escape("HEY") + Multi(DIGIT)
+    assert shout.test("hey1", flags=re.IGNORECASE)
+    assert shout.search_many(["hey1"], flags=re.IGNORECASE)[0]
+    assert shout._required[str] == ("HEY",)
+    shout.regex = "x"
+    assert shout.test("x")
+
+
+@pytest.mark.prefilter
+@given(trees_of(start_leaves), long_texts, st.integers(-5, 300), st.integers(0, 400))
+def test_jumping_to_first_chars_finds_the_same_matches(pattern, text, pos, endpos):
+    try:
+        compiled = re.compile(pattern.regex)
+    except re.error:
+        assume(False)
+    chars = first_chars(pattern)
+    for match in compiled.finditer(text):
+        assert chars is None or match.group()[:1] in chars
+    expected = compiled.search(text, pos, endpos)
+    found = pattern.search(text, pos, endpos)
+    assert (found and found.span()) == (expected and expected.span())
+    assert pattern.test(text) == bool(compiled.search(text))
+    assert [match.span() for match in pattern.finditer(text)] == [
+        match.span() for match in compiled.finditer(text)
+    ]
+    binary = text.encode()
+    assert [match.span() for match in pattern.finditer(binary)] == [
+        match.span() for match in compiled.finditer(text)
+    ]
+    if pattern.search(text, flags=re.MULTILINE):
+        assert re.search(pattern.regex, text, flags=re.MULTILINE)
+
+
+@pytest.mark.prefilter
+def test_first_chars():
+    number = Multi(Set("+", "-") + Multi(DIGIT))
+    assert first_chars(number) == "+-"
+    assert first_chars(Multi(Set("x", "y")) + DIGIT) == "xy"
+    assert first_chars(IfAhead("x") + Multi("x")) == "x"
+    assert first_chars(Amount("a", 0, 1) + escape("b")) == "ab"
+    assert first_chars(Multi("a", match_zero=True)) is None
+    assert first_chars(Set(Range("a", "z")) + DIGIT) is None
+    assert first_chars(DIGIT + escape("a")) is None
+    assert first_chars(escape("#") + Multi(DIGIT)) is None
+    assert first_chars(Or(escape("ab"), escape("ac")) + DIGIT) is None
+    assert first_chars(escape("a") + RegexPattern("|b")) is None
+    assert first_chars(Extension("i:", escape("a"))) is None
+    text = "x" * 10_000 + "-12"
+    assert number.search(text).span() == (10_000, 10_003)
+    assert number.search(text.encode()).span() == (10_000, 10_003)
+    assert [match.group() for match in number.finditer(text * 2)] == ["-12"] * 2
+    assert number.test(text, flags=re.IGNORECASE)
+    assert not number.test(text[:-3])
+
+
+@pytest.mark.prefilter
+def test_jumped_matches_are_tried_where_they_start():
+    pattern = Set("x", "q") + Multi(DIGIT)
+    text = "a" * 5000 + "x12" + "a" * 5000 + "q3"
+    compiled = re.compile(pattern.regex)
+    match, expected = pattern.search(text, 10), compiled.search(text, 10)
+    assert match.span() == expected.span() and match.string is expected.string
+    assert (match.pos, expected.pos) == (5000, 10)
+    matches = list(pattern.finditer(text))
+    assert [match.span() for match in matches] == [
+        match.span() for match in compiled.finditer(text)
+    ]
+    assert [match.pos for match in matches] == [5000, 10003]
+    # Short texts are left to the regex engine.
+    assert [match.pos for match in pattern.finditer("ax1q2")] == [0, 0]
+
+
+@pytest.mark.prefilter
+def test_anchored_patterns_are_matched_at_the_start():
+    start = ANCHOR_START + escape("a")
+    assert leading_anchor(start) == "^"
+    assert (
+        leading_anchor(Or(RegexPattern.parse(r"\Ab"), RegexPattern.parse(r"\Ac")))
+        == "\\A"
+    )
+    assert leading_anchor(Or(start, escape("b"))) is None
+    assert leading_anchor(start + RegexPattern("|b")) is None
+    assert leading_anchor(RegexPattern.parse("(?m)^a")) is None
+    assert start.search("ab").span() == (0, 1) and start.search("ba") is None
+    assert start.search("ab", 1) is None and not start.test("b\na")
+    assert start.search("b\na", flags=re.MULTILINE).span() == (2, 3)
@@ -5,7 +5,7 @@ from hypothesis import given
 from hypothesis import strategies as st
 from strategies import non_escape_char
 
-from regexfactory import Set
+from regexfactory import DIGIT, WHITESPACE, WORD, NotSet, Range, Set
 
 
 @pytest.mark.patterns
@@ -14,3 +14,51 @@ def test_set(chars: list):
     actual = Set(*chars)
     for value in chars:
         assert isinstance(actual.match(value), re.Match)
+
+
+@pytest.mark.patterns
+@pytest.mark.parametrize(
+    "members, expected",
+    [
+        ((Range("a", "m"), Range("c", "z")), "[a-z]"),
+        ((Range("a", "c"), Range("d", "f"), "x", "x"), "[a-fx]"),
+        (("a",), "a"),
+        (("ab", Set("bc")), "[a-c]"),
+        ((WORD, DIGIT, "."), r"[\w.]"),
+        ((WHITESPACE,), r"\s"),
+        (("^", "-", "]"), r"[\-\]\^]"),
+        ((r"\x00-\x1f", Range(r"\x20", r"\x2f")), r"[\x00-/]"),
+    ],
+)
+def test_set_is_canonical(members, expected):
+    assert Set(*members).regex == expected
+
+
+@pytest.mark.patterns
+@pytest.mark.parametrize(
+    "members, expected",
+    [
+        (("a", "b", "c"), "[^a-c]"),
+        ((WHITESPACE,), r"\S"),
+        ((Set("x", "y"), Range("a", "b")), "[^abxy]"),
+    ],
+)
+def test_notset_is_canonical(members, expected):
+    assert NotSet(*members).regex == expected
+
+
+@pytest.mark.patterns
+@given(st.lists(elements=st.characters(), min_size=1), st.characters())
+def test_set_membership(chars: list, other: str):
+    actual = Set(*map(re.escape, chars)).compile()
+    negated = NotSet(*map(re.escape, chars)).compile()
+    assert bool(actual.fullmatch(other)) is (other in chars)
+    assert bool(negated.fullmatch(other)) is (other not in chars)
+
+
+@pytest.mark.patterns
+@given(st.characters())
+def test_single_char_set_under_verbose(char: str):
+    actual = Set(re.escape(char)).compile(flags=re.VERBOSE)
+    assert actual.fullmatch(char)
+    assert not actual.fullmatch("")
@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+import io
+import pickle
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from regexfactory import (
+    ANCHOR_END,
+    ANCHOR_START,
+    DIGIT,
+    WORD,
+    Amount,
+    IfAhead,
+    IfBehind,
+    Multi,
+    Optional,
+    Or,
+    RegexPattern,
+)
+from regexfactory.stream import OffsetMatch, StreamScanner, reach
+
+bounded = st.sampled_from(
+    [
+        Amount(DIGIT, 1, 3),
+        Or("ab", "b", "") + Optional(DIGIT),
+        IfBehind("a") + Amount(WORD, 2) + IfAhead(DIGIT),
+        ANCHOR_START + "a",
+        RegexPattern("b$"),
+        RegexPattern(r"\bab?\b|\Z"),
+        RegexPattern("(?m)^a|b$"),
+        RegexPattern(r"(?P<first>a)(\d)?"),
+    ]
+)
+
+
+def spans(matches):
+    return [(match.span(), match.groups()) for match in matches]
+
+
+@pytest.mark.stream
+@given(bounded, st.text(alphabet="ab1 \n", max_size=30), st.integers(1, 6))
+def test_stream_matches_finditer(pattern, text, chunk_size):
+    expected = spans(pattern.finditer(text))
+    actual = spans(pattern.finditer_stream(io.StringIO(text), chunk_size))
+    assert actual == expected
+
+
+@pytest.mark.stream
+@given(st.text(alphabet="a1 ", max_size=30), st.integers(1, 6))
+def test_stream_with_max_width(text, chunk_size):
+    pattern = Or(Multi(DIGIT), Multi("a", greedy=False))
+    expected = spans(pattern.finditer(text))
+    actual = pattern.finditer_stream(io.StringIO(text), chunk_size, max_width=31)
+    assert spans(actual) == expected
+
+
+@pytest.mark.stream
+def test_reach():
+    assert reach(Amount(DIGIT, 2, 5)) == 5
+    assert reach(RegexPattern("ab$")) == 4
+    assert reach(IfBehind("ab") + "c") == 1
+    assert reach(Amount(Or("ab", IfAhead("abc")), 2)) == 5
+    assert reach(Multi(WORD)) is None
+    assert reach(RegexPattern(r"(a)\1")) is None
+    assert reach(RegexPattern("a b # comment"), flags=re.VERBOSE) == 2
+    with pytest.raises(ValueError):
+        StreamScanner(Multi(WORD))
+
+
+@pytest.mark.stream
+def test_scanner_and_matches():
+    scanner = StreamScanner(RegexPattern(r"(?P<key>\w)=(\d)?"))
+    found = scanner.feed("a=1 b") + scanner.feed("= c=2") + scanner.close()
+    assert [match.span() for match in found] == [(0, 3), (4, 6), (7, 10)]
+    match = found[1]
+    assert match.group() == "b=" and match["key"] == "b" and match[2] is None
+    assert match.group("key", 2) == ("b", None)
+    assert match.groups("-") == ("b", "-") and match.groupdict() == {"key": "b"}
+    assert match.span(2) == (-1, -1) and match.start("key") == 4 and match.end() == 6
+    assert match.lastindex == 1 and match.lastgroup == "key"
+    assert pickle.loads(pickle.dumps(match)) == match
+    assert match == OffsetMatch(match.re.search("xb="), 3)
+    with pytest.raises(IndexError):
+        match.group(3)
+    with pytest.raises(ValueError):
+        scanner.feed("a=1")
+
+
+async def collect(matches):
+    return [match async for match in matches]
+
+
+async def chunks(text, size):
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+@pytest.mark.stream
+@given(bounded, st.text(alphabet="ab1 \n", max_size=30), st.integers(1, 6))
+def test_afinditer_matches_finditer(pattern, text, chunk_size):
+    found = asyncio.run(collect(pattern.afinditer(chunks(text, chunk_size))))
+    assert spans(found) == spans(pattern.finditer(text))
+
+
+@pytest.mark.stream
+def test_afinditer_reader_and_executor():
+    pattern = Amount(DIGIT, 1, 3)
+    data = b"a1 22 b333 4444 " * 20
+
+    async def scan(executor):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        matches = pattern.afinditer(reader, 16, executor=executor, offload_size=8)
+        return await collect(matches)
+
+    expected = spans(pattern.finditer(data))
+    assert spans(asyncio.run(scan(None))) == expected
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        assert spans(asyncio.run(scan(executor))) == expected
+    with pytest.raises(ValueError):
+        Multi(DIGIT).afinditer(chunks("1", 1))